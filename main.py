@@ -11,39 +11,68 @@ import argparse
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
-from src.core.audio_summarizer import main as cli_main, enter_config_mode
-from src.gui.main_gui import main as gui_main
-from src.core.batch_process import main as batch_main
+# 各模式依赖的模块（tkinter、torch、whisper等）较重，只在选中对应模式时才导入，
+# 配置模式和帮助信息无需加载它们即可快速启动
 
 def main():
     """主程序入口"""
-    # 解析命令行参数
-    parser = argparse.ArgumentParser(description='音频转录与总结工具')
+    # 解析命令行参数，未识别的参数原样交给所选模式自己的解析器
+    parser = argparse.ArgumentParser(description='音频转录与总结工具', add_help=False)
+    parser.add_argument('-h', '--help', action='store_true',
+                        help='显示帮助信息，与 --cli 或 --batch 一起使用时显示对应模式的参数')
     parser.add_argument('--cli', action='store_true',
                         help='启动命令行界面')
     parser.add_argument('--output', type=str, default=None,
                         help='指定输出文件夹路径')
     parser.add_argument('--batch', action='store_true',
-                        help='批量处理模式')
+                        help='批量处理模式，其余参数见 --batch --help')
     parser.add_argument('--config', action='store_true',
                         help='进入配置模式')
-    args = parser.parse_args()
-    
-    # 根据参数选择启动模式，默认启动图形化界面
+    parser.add_argument('--import_time', action='store_true',
+                        help='退出时输出各模块的导入耗时，用于排查启动慢的问题')
+    args, remaining = parser.parse_known_args()
+
+    if args.help:
+        if not (args.cli or args.batch):
+            parser.print_help()
+            return
+        remaining = remaining + ['--help']
+
+    timer = None
+    if args.import_time:
+        from src.utils.import_timer import ImportTimer
+        timer = ImportTimer()
+        timer.install()
+
+    try:
+        run_mode(args, remaining)
+    finally:
+        if timer is not None:
+            timer.uninstall()
+            timer.report()
+
+def run_mode(args, remaining):
+    """根据参数选择启动模式，默认启动图形化界面"""
     if args.cli:
         print("启动命令行界面...")
-        cli_main(args.output)
+        from src.core.audio_summarizer import main as cli_main
+        cli_main(args.output, remaining)
     elif args.batch:
         print("启动批量处理模式...")
-        batch_main()
+        from src.core.batch_process import main as batch_main
+        if args.output is not None:
+            remaining = remaining + ['--output', args.output]
+        batch_main(remaining)
     elif args.config:
         print("进入配置模式...")
         from src.config.config_manager import ConfigManager
+        from src.core.audio_summarizer import enter_config_mode
         config = ConfigManager()
         enter_config_mode(config)
     else:
         print("正在启动图形化界面...")
+        from src.gui.main_gui import main as gui_main
         gui_main()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
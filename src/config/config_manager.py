@@ -147,6 +147,414 @@ class ConfigManager:
         self.config.set('settings', 'output_folder', folder)
         self.save_config()
     
+    def get_model_idle_timeout(self):
+        """
+        获取模型空闲卸载时间
+
+        Returns:
+            float: 空闲模型保留的秒数，默认为600秒
+        """
+        try:
+            return self.config.getfloat('settings', 'model_idle_timeout')
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return 600.0
+
+    def get_model_memory_budget(self):
+        """
+        获取模型缓存的内存预算
+
+        Returns:
+            float: 内存预算（MB），未设置时返回None表示不限制
+        """
+        try:
+            value = self.config.get('settings', 'model_memory_budget_mb').strip()
+            return float(value) if value else None
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return None
+    
+    def get_audio_cache_dir(self):
+        """
+        获取解码音频缓存目录
+
+        Returns:
+            str: 缓存目录，默认为cache/audio
+        """
+        try:
+            return self.config.get('settings', 'audio_cache_dir').strip() or os.path.join('cache', 'audio')
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return os.path.join('cache', 'audio')
+
+    def get_audio_cache_size_mb(self):
+        """
+        获取解码音频缓存的大小上限
+
+        Returns:
+            float: 大小上限（MB），0表示不启用缓存
+        """
+        try:
+            return self.config.getfloat('settings', 'audio_cache_size_mb')
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return 0.0
+
+    def get_cache_mel(self):
+        """
+        获取是否同时缓存log-mel特征
+
+        Returns:
+            bool: 默认为False
+        """
+        try:
+            return self.config.getboolean('settings', 'audio_cache_mel')
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return False
+    
+    def get_metadata_index_file(self):
+        """
+        获取音频元数据索引文件路径
+
+        Returns:
+            str: 索引文件路径，默认为cache/audio_metadata.json
+        """
+        try:
+            return self.config.get('settings', 'metadata_index_file').strip() or os.path.join('cache', 'audio_metadata.json')
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return os.path.join('cache', 'audio_metadata.json')
+    
+    def get_transcript_cache_dir(self):
+        """
+        获取转录结果缓存目录
+
+        Returns:
+            str: 缓存目录，默认为cache/transcripts
+        """
+        try:
+            return self.config.get('settings', 'transcript_cache_dir').strip() or os.path.join('cache', 'transcripts')
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return os.path.join('cache', 'transcripts')
+
+    def get_transcript_cache_size_mb(self):
+        """
+        获取转录结果缓存的大小上限
+
+        Returns:
+            float: 大小上限（MB），0表示不启用缓存，默认为256
+        """
+        try:
+            return self.config.getfloat('settings', 'transcript_cache_size_mb')
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return 256.0
+    
+    def get_compute_type(self):
+        """
+        获取Whisper推理的计算精度
+
+        Returns:
+            str: fp32/fp16/bf16/int8，未设置时返回None（GPU上为fp16，CPU上为fp32）
+        """
+        try:
+            return self.config.get('settings', 'compute_type').strip() or None
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return None
+
+    def get_quantized_model_dir(self):
+        """
+        获取量化模型的保存目录
+
+        Returns:
+            str: 目录路径，默认为cache/models
+        """
+        try:
+            return self.config.get('settings', 'quantized_model_dir').strip() or os.path.join('cache', 'models')
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return os.path.join('cache', 'models')
+
+    def get_prefetch_depth(self):
+        """
+        获取后台预取的文件数
+
+        Returns:
+            int: 转录当前文件时提前解码和计算特征的文件数，0表示不预取，默认为2
+        """
+        try:
+            return max(0, self.config.getint('settings', 'prefetch_depth'))
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return 2
+    
+    def get_model_warmup(self):
+        """
+        获取图形界面启动时是否在后台预加载模型
+
+        Returns:
+            bool: 是否预加载并预热模型，默认为True
+        """
+        try:
+            return self.config.getboolean('settings', 'model_warmup')
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return True
+    
+    def get_checkpoint_dir(self):
+        """
+        获取转录检查点目录
+
+        Returns:
+            str: 目录路径，默认为cache/checkpoints
+        """
+        try:
+            return self.config.get('settings', 'checkpoint_dir').strip() or os.path.join('cache', 'checkpoints')
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return os.path.join('cache', 'checkpoints')
+
+    def get_checkpoint_windows(self):
+        """
+        获取写入转录检查点的间隔
+
+        Returns:
+            int: 每解码多少个30秒窗口写一次检查点，0表示不保存检查点，默认为10
+        """
+        try:
+            return max(0, self.config.getint('settings', 'checkpoint_windows'))
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return 10
+    
+    def get_segment_formats(self):
+        """
+        获取随转录文本一起增量写入的带时间戳格式
+
+        Returns:
+            list: 格式列表，可选 srt, vtt, jsonl，默认为 srt 和 jsonl
+        """
+        try:
+            value = self.config.get('settings', 'segment_formats')
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return ['srt', 'jsonl']
+        formats = [fmt.strip().lower() for fmt in value.split(',') if fmt.strip()]
+        return [fmt for fmt in formats if fmt in ('srt', 'vtt', 'jsonl')]
+    
+    def get_cascade_model(self):
+        """
+        获取级联转录中重新解码低置信度窗口的大模型
+
+        Returns:
+            str: 模型名称，未设置时返回None（不使用级联）
+        """
+        try:
+            return self.config.get('settings', 'cascade_model').strip() or None
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return None
+
+    def get_cascade_thresholds(self):
+        """
+        获取级联转录中窗口升级到大模型的阈值
+
+        Returns:
+            dict: cascade_logprob_threshold（默认-0.7）、cascade_compression_ratio_threshold（默认2.0）、
+                cascade_no_speech_threshold（默认0.5），可直接作为 WhisperTranscriber 的参数
+        """
+        thresholds = {
+            'cascade_logprob_threshold': -0.7,
+            'cascade_compression_ratio_threshold': 2.0,
+            'cascade_no_speech_threshold': 0.5
+        }
+        for key in thresholds:
+            try:
+                thresholds[key] = self.config.getfloat('settings', key)
+            except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+                pass
+        return thresholds
+
+    def get_max_fallbacks(self):
+        """
+        获取每个窗口温度回退最多重新解码的次数
+
+        Returns:
+            int: 次数，留空时返回None（尝试完整的温度序列），默认为3
+        """
+        try:
+            value = self.config.get('settings', 'max_fallbacks').strip()
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return 3
+        try:
+            return max(0, int(value)) if value else None
+        except ValueError:
+            return 3
+
+    def get_repetition_limit(self):
+        """
+        获取中止重复循环的重复次数
+
+        Returns:
+            int: 同一段文本连续重复的次数，留空或0时返回None（不检测），默认为5
+        """
+        try:
+            value = self.config.get('settings', 'repetition_limit').strip()
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return 5
+        try:
+            return int(value) if value and int(value) > 1 else None
+        except ValueError:
+            return 5
+
+    def get_api_url(self):
+        """
+        获取总结接口地址
+
+        Returns:
+            str: 接口地址，未设置时返回None（使用DeepSeek的对话补全接口）
+        """
+        try:
+            return self.config.get('settings', 'api_url').strip() or None
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return None
+
+    def get_api_http2(self):
+        """
+        获取调用总结接口时是否启用HTTP/2
+
+        Returns:
+            bool: 是否启用，默认为True（未安装h2时自动使用HTTP/1.1）
+        """
+        try:
+            return self.config.getboolean('settings', 'api_http2')
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return True
+
+    def get_summary_concurrency(self):
+        """
+        获取同时进行的总结请求数上限
+
+        Returns:
+            int: 上限，默认为256
+        """
+        try:
+            return max(1, self.config.getint('settings', 'summary_concurrency'))
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return 256
+
+    def get_summary_stream(self):
+        """
+        获取总结时是否使用流式响应
+
+        Returns:
+            bool: 是否启用，默认为True
+        """
+        try:
+            return self.config.getboolean('settings', 'summary_stream')
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return True
+
+    def get_summary_max_input_tokens(self):
+        """
+        获取总结提示词的token预算，超出时分段总结
+
+        Returns:
+            int: token数，留空或0时返回None（不检查长度），默认为48000
+        """
+        try:
+            value = self.config.get('settings', 'summary_max_input_tokens').strip()
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return 48000
+        try:
+            return int(value) if value and int(value) > 0 else None
+        except ValueError:
+            return 48000
+
+    def get_summary_chunk_tokens(self):
+        """
+        获取分段总结时每段转录的token预算
+
+        Returns:
+            int: token数，默认为12000
+        """
+        try:
+            return max(1000, self.config.getint('settings', 'summary_chunk_tokens'))
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return 12000
+
+    def get_summary_cache_dir(self):
+        """
+        获取总结结果缓存目录
+
+        Returns:
+            str: 缓存目录，默认为cache/summaries
+        """
+        try:
+            return self.config.get('settings', 'summary_cache_dir').strip() or os.path.join('cache', 'summaries')
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return os.path.join('cache', 'summaries')
+
+    def get_summary_cache_size_mb(self):
+        """
+        获取总结结果缓存的大小上限
+
+        Returns:
+            float: 大小上限（MB），0表示不启用缓存，默认为64
+        """
+        try:
+            return self.config.getfloat('settings', 'summary_cache_size_mb')
+        except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+            return 64.0
+
+    def get_summary_cache_ttl(self):
+        """
+        获取总结结果缓存的存活时间
+
+        Returns:
+            float: 存活时间（秒），配置项以天为单位，留空或0时返回None（永不过期），默认为30天
+        """
+        try:
+            value = self.config.get('settings', 'summary_cache_ttl_days').strip()
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return 30 * 86400.0
+        try:
+            return float(value) * 86400 if value and float(value) > 0 else None
+        except ValueError:
+            return 30 * 86400.0
+
+    def get_summarizer_options(self):
+        """
+        获取总结器的连接、流式、分段和缓存设置
+
+        Returns:
+            dict: 可直接作为 DeepSeekSummarizer 的参数（不含连接池大小）
+        """
+        cache_size_mb = self.get_summary_cache_size_mb()
+        return {
+            'http2': self.get_api_http2(),
+            'api_url': self.get_api_url(),
+            'max_concurrency': self.get_summary_concurrency(),
+            'stream': self.get_summary_stream(),
+            'max_input_tokens': self.get_summary_max_input_tokens(),
+            'chunk_tokens': self.get_summary_chunk_tokens(),
+            'cache_dir': self.get_summary_cache_dir() if cache_size_mb > 0 else None,
+            'cache_size_mb': cache_size_mb,
+            'cache_ttl': self.get_summary_cache_ttl()
+        }
+
+    def get_deadline_models(self):
+        """
+        获取截止时间模式的候选模型
+
+        Returns:
+            list: 模型名称列表，默认为全部模型
+        """
+        try:
+            value = self.config.get('settings', 'deadline_models')
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return ['tiny', 'base', 'small', 'medium', 'large']
+        return [model.strip() for model in value.split(',') if model.strip()]
+
+    def get_model_rtf_file(self):
+        """
+        获取各模型实测实时率的保存文件
+
+        Returns:
+            str: 文件路径，默认为cache/model_rtf.json
+        """
+        try:
+            return self.config.get('settings', 'model_rtf_file').strip() or os.path.join('cache', 'model_rtf.json')
+        except (configparser.NoOptionError, configparser.NoSectionError):
+            return os.path.join('cache', 'model_rtf.json')
+    
     def save_config(self):
         """保存配置到文件"""
         with open(self.config_file, 'w', encoding='utf-8') as f:
@@ -5,13 +5,17 @@ import os
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from src.core.whisper_transcriber import WhisperTranscriber
-from src.core.deepseek_summarizer import DeepSeekSummarizer
-from src.utils.file_utils import FileUtils
+from src.utils.file_utils import FileUtils, NO_SPEECH_SUMMARY
 from src.config.config_manager import ConfigManager
 
-def main(output_folder=None):
-    """主程序"""
+def main(output_folder=None, argv=None):
+    """
+    主程序
+
+    Args:
+        output_folder (str): 输出文件夹路径，命令行中的 --output 优先
+        argv (list): 命令行参数，默认为 sys.argv[1:]
+    """
     # 初始化配置管理器
     config = ConfigManager()
     
@@ -47,13 +51,24 @@ def main(output_folder=None):
                         help='指定输出文件夹路径')
     parser.add_argument('--config', action='store_true',
                         help='进入配置模式，设置API密钥和默认选项')
-    args = parser.parse_args()
+    parser.add_argument('--vad', action='store_true',
+                        help='解码前检测语音区间，跳过静音和非语音片段')
+    parser.add_argument('--compute_type', type=str, default=None, choices=['fp32', 'fp16', 'bf16', 'int8'],
+                        help='推理精度，int8为线性层动态量化（仅CPU），默认读取配置文件')
+    parser.add_argument('--cascade_model', type=str, default=None,
+                        choices=['tiny', 'base', 'small', 'medium', 'large'],
+                        help='级联转录的大模型：所选模型作为草稿模型快速转录全文，低置信度的窗口再由该模型重新解码，默认读取配置文件')
+    args = parser.parse_args(argv)
     
     # 如果是配置模式，则进入配置界面
     if args.config:
         enter_config_mode(config)
         return
 
+    # 转录和总结模块依赖torch、whisper等较重的库，确定需要转录时才导入
+    from src.core.whisper_transcriber import WhisperTranscriber
+    from src.core.deepseek_summarizer import DeepSeekSummarizer
+
     # 如果没有提供模型参数，则使用配置中的默认值或交互式选择
     if args.model is None:
         # 尝试从配置中获取默认模型
@@ -108,7 +123,18 @@ def main(output_folder=None):
         return
 
     # 初始化Whisper转录器
-    transcriber = WhisperTranscriber(model_path)
+    transcriber = WhisperTranscriber(
+        model_path,
+        use_vad=args.vad,
+        compute_type=args.compute_type or config.get_compute_type(),
+        quantized_model_dir=config.get_quantized_model_dir(),
+        checkpoint_dir=config.get_checkpoint_dir() if config.get_checkpoint_windows() > 0 else None,
+        checkpoint_windows=config.get_checkpoint_windows(),
+        cascade_model=args.cascade_model or config.get_cascade_model(),
+        max_fallbacks=config.get_max_fallbacks(),
+        repetition_limit=config.get_repetition_limit(),
+        **config.get_cascade_thresholds()
+    )
     
     # 初始化DeepSeek总结器
     # 如果prompts_dir是相对路径，则转换为绝对路径
@@ -118,7 +144,9 @@ def main(output_folder=None):
     else:
         prompts_dir = args.prompts_dir
     
-    summarizer = DeepSeekSummarizer(api_key, prompts_dir)
+    # 超长转录分段时各段并发请求，保留几个长连接
+    summarizer = DeepSeekSummarizer(api_key, prompts_dir, max_connections=4,
+                                    **config.get_summarizer_options())
     
     # 获取音频标题
     audio_title = FileUtils.get_audio_title(audio_file)
@@ -158,25 +186,50 @@ def main(output_folder=None):
             if progress >= 100:
                 print()
         
-        # 使用进度回调进行转录
-        transcription = transcriber.transcribe(audio_file, progress_callback=progress_callback)
-        
-        # 步骤2: 内容总结
-        print("\n=== 开始内容总结 ===")
-        summary = summarizer.summarize(transcription, audio_title, args.template)
-        
-        # 步骤3: 保存结果
-        print("\n=== 保存结果 ===")
-        
         # 确定输出文件夹
         final_output_folder = args.output if args.output else output_folder
         if not final_output_folder:
             # 如果命令行和函数参数都没有提供，则使用配置中的默认值
             final_output_folder = config.get_output_folder()
         
+        # 使用进度回调进行转录，转录文本和字幕随片段解码增量写入
+        writer = FileUtils.create_transcript_writer(audio_file, final_output_folder, rel_path,
+                                                    config.get_segment_formats())
+        try:
+            transcription = transcriber.transcribe(audio_file, progress_callback=progress_callback,
+                                                   segment_callback=lambda segment, _: writer.write_segment(segment))
+        finally:
+            writer.close()
+        transcript_file = writer.finalize()
+        
+        # 步骤2: 内容总结
+        if not transcription.strip():
+            # 没有检测到语音时不调用总结接口，总结文件中写明未检测到语音
+            print("\n未检测到语音，跳过内容总结")
+            summary = NO_SPEECH_SUMMARY
+            summary_writer = None
+        else:
+            print("\n=== 开始内容总结 ===")
+            # 流式总结时边生成边输出到终端并追加写入总结文件
+            summary_writer = FileUtils.create_summary_writer(audio_file, final_output_folder, rel_path)
+
+            def on_token(text):
+                summary_writer.write(text)
+                print(text, end='', flush=True)
+
+            try:
+                summary = summarizer.summarize(transcription, audio_title, args.template, on_token=on_token)
+            except Exception:
+                summary_writer.close()
+                raise
+        
+        # 步骤3: 保存结果
+        print("\n=== 保存结果 ===")
+        
         # 使用相对路径保存结果，以保持源文件夹结构
         transcript_file, summary_file = FileUtils.save_results(
-            transcription, summary, audio_file, final_output_folder, rel_path
+            transcription, summary, audio_file, final_output_folder, rel_path, transcript_file,
+            summary_writer=summary_writer
         )
         
         print("\n处理完成！")
@@ -0,0 +1,100 @@
+import time
+
+import torch
+from whisper.audio import N_FRAMES, N_SAMPLES, log_mel_spectrogram, pad_or_trim
+
+from src.core.window_decoder import WindowDecoder, split_window_segments, DECODE_COUNTERS
+
+
+class BatchDecoder:
+    """跨文件批量解码短音频
+
+    每个不超过30秒的音频只有一个mel窗口。把多个文件的窗口堆叠成一个批次，
+    编码器和解码器一次处理整批，再把解码结果按顺序分发回各个文件。
+    温度回退也按批进行：只有需要回退的条目会以更高的温度再组成一个批次重新解码。
+    """
+
+    def __init__(self, model, batch_size=16, **decoder_options):
+        """
+        初始化批量解码器
+
+        Args:
+            model: 已加载的Whisper模型
+            batch_size (int): 每批解码的窗口数
+            **decoder_options: 传给 WindowDecoder 的解码参数，如 language, initial_prompt, fp16
+        """
+        self.batch_size = batch_size
+        # 借用窗口解码器的解码参数、回退判断和静音判断，保证与逐文件转录的结果一致
+        self.window_decoder = WindowDecoder(model, **decoder_options)
+        # 最近一批中每个条目的解码计数（回退次数、是否因重复循环中止），批次耗时按条目数平摊
+        self.last_counters = []
+
+    @staticmethod
+    def fits(audio):
+        """音频是否只有一个窗口，可以参与批量解码"""
+        return len(audio) <= N_SAMPLES
+
+    def decode_batch(self, audios):
+        """
+        批量解码
+
+        Args:
+            audios (list): 16kHz单声道音频列表，每个不超过30秒，长度不超过batch_size
+
+        Returns:
+            list: 与audios一一对应的片段列表
+        """
+        decoder = self.window_decoder
+        model = decoder.model
+        content_frames = []
+        windows = []
+        for audio in audios:
+            mel = log_mel_spectrogram(audio, model.dims.n_mels, padding=N_SAMPLES)
+            content_frames.append(min(N_FRAMES, mel.shape[-1] - N_FRAMES))
+            windows.append(pad_or_trim(mel[:, :N_FRAMES], N_FRAMES))
+        mel_batch = torch.stack(windows).to(model.device).to(decoder.dtype)
+
+        tokenizer = decoder._get_tokenizer()
+        prompt = decoder._initial_prompt_tokens(tokenizer)
+        input_stride, time_precision = decoder._time_grid()
+
+        # 按温度序列逐轮解码，每轮只重新解码上一轮需要回退的条目
+        results = [None] * len(audios)
+        counters = [{key: 0 for key in DECODE_COUNTERS} for _ in audios]
+        self.last_counters = counters
+        pending = [i for i, frames in enumerate(content_frames) if frames > 0]
+        audio_features = decoder._encode(mel_batch) if pending else None
+        for round_index, temperature in enumerate(decoder._temperatures()):
+            if not pending:
+                break
+            pass_start = time.time()
+            decoded = decoder._decode(audio_features[pending], decoder._decoding_options(temperature, prompt),
+                                      fallback=round_index > 0)
+            # 陷入重复循环的条目不再回退，按无结果处理
+            aborted = {pending[row] for row in decoder.last_aborted}
+            seconds = (time.time() - pass_start) / len(pending)
+            for index in pending:
+                counters[index]['decode_passes'] += 1
+                if round_index > 0:
+                    counters[index]['fallback_decodes'] += 1
+                if index in aborted:
+                    counters[index]['aborted_windows'] += 1
+                    counters[index]['aborted_seconds'] += seconds
+                elif round_index > 0:
+                    counters[index]['fallback_seconds'] += seconds
+            for index, result in zip(pending, decoded):
+                results[index] = None if index in aborted else result
+            pending = [index for index in pending
+                       if index not in aborted and decoder._needs_fallback(results[index])]
+
+        all_segments = []
+        for result, frames in zip(results, content_frames):
+            if result is None or decoder._should_skip(result):
+                all_segments.append([])
+                continue
+            segments, _ = split_window_segments(result, tokenizer, 0, 0.0, frames, input_stride, time_precision)
+            segments = [segment for segment in segments if segment['text']]
+            for segment_id, segment in enumerate(segments):
+                segment['id'] = segment_id
+            all_segments.append(segments)
+        return all_segments
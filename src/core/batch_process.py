@@ -9,14 +9,17 @@ import argparse
 import threading
 import queue
 import time
+import multiprocessing
 from datetime import datetime
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.core.whisper_transcriber import WhisperTranscriber
-from src.core.deepseek_summarizer import DeepSeekSummarizer
-from src.utils.file_utils import FileUtils
+from src.core.prefetcher import Prefetcher
+from src.core.cancellation import CancellationToken
+from src.core.model_scheduler import DeadlineScheduler, parse_deadline
+from src.utils.file_utils import FileUtils, NO_SPEECH_SUMMARY
+from src.utils.audio_metadata import get_audio_metadata
 from src.config.config_manager import ConfigManager
 
 def scan_audio_files(source_folder):
@@ -40,40 +43,197 @@ def scan_audio_files(source_folder):
     
     return audio_files
 
-def process_audio_file(audio_file_tuple, transcriber, summarizer, output_folder, template, source_folder, progress_queue):
-    """处理单个音频文件"""
+def iter_prefetched(audio_files, transcriber, prefetch=2):
+    """
+    依次产出待处理的文件，启用预取时后续文件的解码和特征计算在后台提前进行
+
+    Args:
+        audio_files (iterable): (完整路径, 相对路径) 元组，可以是惰性迭代器
+        transcriber (WhisperTranscriber): 转录器
+        prefetch (int): 提前准备的文件数，0表示不预取
+
+    Yields:
+        tuple: (文件元组, 准备结果, 准备时的异常, 预取指标)
+    """
+    if prefetch <= 0:
+        for audio_file_tuple in audio_files:
+            yield audio_file_tuple, None, None, {}
+        return
+
+    prefetcher = Prefetcher(audio_files, lambda item: transcriber.prepare(item[0]),
+                            depth=prefetch, workers=min(prefetch, 2))
+    for audio_file_tuple, prepared, error in prefetcher:
+        metrics = {
+            'prefetch_wait_seconds': prefetcher.last_stall_seconds,
+            'prefetch_queue_depth': prefetcher.last_depth
+        }
+        yield audio_file_tuple, prepared, error, metrics
+
+class ScheduledTranscribers:
+    """截止时间模式下按模型名称懒加载的转录器，各工作线程共享"""
+
+    def __init__(self, transcriber_options):
+        """
+        Args:
+            transcriber_options (dict): 除模型名称外的转录器参数
+        """
+        self.transcriber_options = transcriber_options
+        self._transcribers = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name):
+        """获取指定模型的转录器，首次使用时创建"""
+        from src.core.whisper_transcriber import WhisperTranscriber
+
+        with self._lock:
+            if model_name not in self._transcribers:
+                self._transcribers[model_name] = WhisperTranscriber(
+                    **dict(self.transcriber_options, model_name=model_name)
+                )
+            return self._transcribers[model_name]
+
+    def all(self):
+        """已创建的转录器"""
+        with self._lock:
+            return list(self._transcribers.values())
+
+    def close(self):
+        """释放所有转录器"""
+        for transcriber in self.all():
+            transcriber.close()
+
+def iter_scheduled(audio_files, scheduler, transcribers, prefetch=2):
+    """
+    截止时间模式：为每个文件选择模型后依次产出，启用预取时在预取时选定模型并提前准备输入
+
+    Args:
+        audio_files (iterable): (完整路径, 相对路径) 元组
+        scheduler (DeadlineScheduler): 模型调度器
+        transcribers (ScheduledTranscribers): 按模型名称获取转录器
+        prefetch (int): 提前准备的文件数，0表示不预取
+
+    Yields:
+        tuple: (文件元组, 调度决定, 转录器, 准备结果, 准备时的异常, 预取指标)
+    """
+    def select(item):
+        decision = scheduler.choose(item[0])
+        transcriber = transcribers.get(decision['model'])
+        prepared = None
+        error = None
+        if prefetch > 0:
+            try:
+                prepared = transcriber.prepare(item[0])
+            except Exception as e:
+                error = e
+        return decision, transcriber, prepared, error
+
+    if prefetch <= 0:
+        for audio_file_tuple in audio_files:
+            yield (audio_file_tuple,) + select(audio_file_tuple) + ({},)
+        return
+
+    prefetcher = Prefetcher(audio_files, select, depth=prefetch, workers=min(prefetch, 2))
+    for audio_file_tuple, result, error in prefetcher:
+        metrics = {
+            'prefetch_wait_seconds': prefetcher.last_stall_seconds,
+            'prefetch_queue_depth': prefetcher.last_depth
+        }
+        if result is None:
+            # 选择模型或创建转录器失败
+            yield audio_file_tuple, None, None, None, error, metrics
+            continue
+        yield (audio_file_tuple,) + result + (metrics,)
+
+def save_no_speech(full_path, rel_path, transcription, output_folder, transcript_file, stats, progress_queue):
+    """没有检测到语音的文件不做总结，总结文件中写明未检测到语音"""
+    stats['no_speech'] = True
+    transcript_file, summary_file = FileUtils.save_results(
+        transcription, NO_SPEECH_SUMMARY, full_path, output_folder, rel_path, transcript_file
+    )
+    progress_queue.put({'file': full_path, 'rel_path': rel_path, 'status': '完成', 'progress': 100,
+                        'transcript_file': transcript_file, 'summary_file': summary_file,
+                        'stats': stats})
+    return stats
+
+def process_audio_file(audio_file_tuple, transcriber, summarizer, output_folder, template, source_folder, progress_queue,
+                       prepared=None, prepare_error=None, prefetch_metrics=None, cancel_token=None, formats=()):
+    """处理单个音频文件，成功时返回转录统计信息"""
     full_path, rel_path = audio_file_tuple
     
     try:
+        # 后台预取时的解码错误在这里按单个文件失败处理
+        if prepare_error is not None:
+            raise prepare_error
+        
         # 更新状态：开始处理
         progress_queue.put({'file': full_path, 'rel_path': rel_path, 'status': '开始转录', 'progress': 0})
         
-        # 转录音频
-        transcription = transcriber.transcribe(full_path)
+        # 转录音频，片段解码出来后立即追加到转录文件，中途失败时保留部分结果
+        stats = dict(prefetch_metrics or {})
+        writer = FileUtils.create_transcript_writer(full_path, output_folder, rel_path, formats)
+        texts = []
+        try:
+            for segment in transcriber.transcribe_iter(full_path, stats=stats, prepared=prepared,
+                                                       cancel_token=cancel_token):
+                writer.write_segment(segment)
+                texts.append(segment['text'])
+        finally:
+            writer.close()
+        if stats.get('stopped'):
+            # 被中断的文件保留 .part 文件中的部分转录，不做总结
+            progress_queue.put({'file': full_path, 'rel_path': rel_path, 'progress': 0,
+                                'status': f"错误: 已停止，部分转录保存在 {writer.part_path}"})
+            return
+        transcription = "".join(texts)
+        transcript_file = writer.finalize()
+        if 'resumed_from' in stats:
+            # 检查点中的片段已写入新的转录文件，之前中断留下的 .part 文件不再需要
+            FileUtils.remove_stale_parts(transcript_file)
+        
+        if not transcription.strip():
+            return save_no_speech(full_path, rel_path, transcription, output_folder, transcript_file, stats,
+                                  progress_queue)
         
         # 更新状态：转录完成，开始总结
         progress_queue.put({'file': full_path, 'rel_path': rel_path, 'status': '转录完成，开始总结', 'progress': 50})
         
-        # 生成总结
+        # 生成总结，流式总结时边生成边追加写入总结文件
         audio_title = FileUtils.get_audio_title(full_path)
-        summary = summarizer.summarize(transcription, audio_title, template)
+        summary_writer = FileUtils.create_summary_writer(full_path, output_folder, rel_path)
+        try:
+            summary = summarizer.summarize(transcription, audio_title, template,
+                                           on_token=summary_writer.write, metrics=stats)
+        except Exception:
+            summary_writer.close()
+            raise
         
         # 保存结果，保持源文件夹结构
         transcript_file, summary_file = FileUtils.save_results(
-            transcription, summary, full_path, output_folder, rel_path
+            transcription, summary, full_path, output_folder, rel_path, transcript_file,
+            summary_writer=summary_writer
         )
         
         # 更新状态：完成
         progress_queue.put({'file': full_path, 'rel_path': rel_path, 'status': '完成', 'progress': 100, 
-                           'transcript_file': transcript_file, 'summary_file': summary_file})
+                           'transcript_file': transcript_file, 'summary_file': summary_file,
+                           'stats': stats})
+        return stats
         
     except Exception as e:
         # 更新状态：错误
         progress_queue.put({'file': full_path, 'rel_path': rel_path, 'status': f'错误: {str(e)}', 'progress': 0})
         print(f"处理文件 {rel_path} 时出错: {str(e)}")
 
-def main():
-    """主程序"""
+# 转录器（torch、whisper）和总结器（requests）在实际处理时才导入：
+# 查看帮助、扫描和探测文件无需加载它们，多进程模式的主进程也始终不加载模型相关的库
+
+def main(argv=None):
+    """
+    主程序
+
+    Args:
+        argv (list): 命令行参数，默认为 sys.argv[1:]
+    """
     # 初始化配置管理器
     config = ConfigManager()
     
@@ -94,7 +254,45 @@ def main():
                         help='提示词模板目录，默认为prompts')
     parser.add_argument('--threads', type=int, default=1,
                         help='并发处理的线程数，默认为1')
-    args = parser.parse_args()
+    parser.add_argument('--workers', type=int, default=0,
+                        help='并发处理的进程数，每个进程独立加载模型；大于0时代替--threads，默认为0')
+    parser.add_argument('--torch_threads', type=int, default=None,
+                        help='每个工作进程使用的PyTorch线程数，默认为CPU核心数除以进程数')
+    parser.add_argument('--vad', action='store_true',
+                        help='解码前检测语音区间，跳过静音和非语音片段')
+    parser.add_argument('--long_audio_threshold', type=float, default=1800,
+                        help='超过该时长（秒）的音频切块并行转录，0表示禁用，默认为1800')
+    parser.add_argument('--chunk_seconds', type=float, default=600,
+                        help='长音频模式的分块长度（秒），默认为600')
+    parser.add_argument('--chunk_workers', type=int, default=None,
+                        help='长音频模式的工作进程数，默认为CPU核心数的一半')
+    parser.add_argument('--compute_type', type=str, default=None, choices=['fp32', 'fp16', 'bf16', 'int8'],
+                        help='推理精度，int8为线性层动态量化（仅CPU），默认读取配置文件，未配置时GPU用fp16、CPU用fp32')
+    parser.add_argument('--cascade_model', type=str, default=None,
+                        choices=['tiny', 'base', 'small', 'medium', 'large'],
+                        help='级联转录的大模型：所选模型作为草稿模型快速转录全文，低置信度的窗口再由该模型重新解码，默认读取配置文件')
+    parser.add_argument('--max_fallbacks', type=int, default=None,
+                        help='每个窗口温度回退最多重新解码的次数，默认读取配置文件')
+    parser.add_argument('--repetition_limit', type=int, default=None,
+                        help='同一段文本连续重复多少次时中止并跳过该窗口，0表示不检测，默认读取配置文件')
+    parser.add_argument('--batch_size', type=int, default=0,
+                        help='跨文件批量解码的批大小，大于1时把多个短音频（30秒以内）合并成一批解码，默认为0（不启用）')
+    parser.add_argument('--audio_cache_mb', type=float, default=None,
+                        help='解码音频缓存的大小上限（MB），0表示不缓存，默认读取配置文件')
+    parser.add_argument('--transcript_cache_mb', type=float, default=None,
+                        help='转录结果缓存的大小上限（MB），0表示不缓存，默认读取配置文件')
+    parser.add_argument('--deadline', type=parse_deadline, default=None,
+                        help='截止时间模式：所有文件需在该时刻（如 07:00，已过去时为次日）前处理完，'
+                             '按剩余时间为每个文件选择能按时完成的最准确的模型，代替--model')
+    parser.add_argument('--time_budget', type=float, default=None,
+                        help='截止时间模式：所有文件需在多少小时内处理完，与--deadline二选一')
+    parser.add_argument('--deadline_models', type=str, default=None,
+                        help='截止时间模式的候选模型，逗号分隔，默认读取配置文件')
+    parser.add_argument('--formats', type=str, default=None,
+                        help='随转录文本一起写入的带时间戳格式，逗号分隔，可选 srt,vtt,jsonl，空字符串表示只保存文本，默认读取配置文件')
+    parser.add_argument('--prefetch', type=int, default=None,
+                        help='转录当前文件时在后台提前解码和计算特征的文件数，0表示不预取，默认读取配置文件')
+    args = parser.parse_args(argv)
     
     # 检查源文件夹是否存在
     if not os.path.exists(args.source_folder):
@@ -132,10 +330,6 @@ def main():
                 print("错误：未提供API密钥。")
                 return
     
-    # 初始化转录器和总结器
-    print(f"初始化Whisper转录器，模型: {model_path}")
-    transcriber = WhisperTranscriber(model_path)
-    
     # 如果prompts_dir是相对路径，则转换为绝对路径
     if not os.path.isabs(args.prompts_dir):
         project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -143,9 +337,6 @@ def main():
     else:
         prompts_dir = args.prompts_dir
     
-    print(f"初始化DeepSeek总结器，模板: {args.template}")
-    summarizer = DeepSeekSummarizer(api_key, prompts_dir)
-    
     # 扫描音频文件
     print(f"扫描源文件夹: {args.source_folder}")
     audio_files = scan_audio_files(args.source_folder)
@@ -155,13 +346,135 @@ def main():
         return
     
     print(f"找到 {len(audio_files)} 个音频文件")
+
+    # 预先并行探测所有文件的元数据，转录时直接命中缓存
+    probe_start = time.time()
+    metadata = get_audio_metadata()
+    metadata.configure(config.get_metadata_index_file())
+    probed = metadata.probe_folder([full_path for full_path, _ in audio_files])
+    total_duration = sum(info['duration'] for info in probed.values() if info)
+    print(f"元数据探测耗时: {time.time() - probe_start:.2f}秒，音频总时长: {total_duration / 3600:.2f}小时"
+          f"（文件头解析{metadata.native_count}个，ffprobe{metadata.ffprobe_count}个，"
+          f"librosa{metadata.librosa_count}个）")
+
+    # 解码音频缓存：重复处理同一批文件（如更换模型或模板）时跳过ffmpeg解码
+    audio_cache_mb = args.audio_cache_mb if args.audio_cache_mb is not None else config.get_audio_cache_size_mb()
+    # 转录结果缓存：内容相同的音频（副本、重新上传）只转录一次
+    transcript_cache_mb = (args.transcript_cache_mb if args.transcript_cache_mb is not None
+                           else config.get_transcript_cache_size_mb())
+
+    # 转录器参数，多线程模式和多进程模式共用
+    transcriber_options = {
+        'model_name': model_path,
+        'use_vad': args.vad,
+        'long_audio_threshold': args.long_audio_threshold or None,
+        'chunk_seconds': args.chunk_seconds,
+        'chunk_workers': args.chunk_workers,
+        'audio_cache_dir': config.get_audio_cache_dir() if audio_cache_mb > 0 else None,
+        'audio_cache_size_mb': audio_cache_mb,
+        'cache_mel': config.get_cache_mel(),
+        'metadata_index': config.get_metadata_index_file(),
+        'transcript_cache_dir': config.get_transcript_cache_dir() if transcript_cache_mb > 0 else None,
+        'transcript_cache_size_mb': transcript_cache_mb,
+        'compute_type': args.compute_type or config.get_compute_type(),
+        'quantized_model_dir': config.get_quantized_model_dir(),
+        'checkpoint_dir': config.get_checkpoint_dir() if config.get_checkpoint_windows() > 0 else None,
+        'checkpoint_windows': config.get_checkpoint_windows(),
+        'cascade_model': args.cascade_model or config.get_cascade_model(),
+        'max_fallbacks': args.max_fallbacks if args.max_fallbacks is not None else config.get_max_fallbacks(),
+        'repetition_limit': (args.repetition_limit or None) if args.repetition_limit is not None
+                            else config.get_repetition_limit(),
+        **config.get_cascade_thresholds()
+    }
+
+    # 后台预取：模型转录当前文件时，后续文件的解码和特征计算提前进行
+    prefetch = args.prefetch if args.prefetch is not None else config.get_prefetch_depth()
+    # 随转录文本一起增量写入的字幕和片段格式
+    if args.formats is not None:
+        formats = [fmt.strip().lower() for fmt in args.formats.split(',') if fmt.strip()]
+    else:
+        formats = config.get_segment_formats()
+
+    # 截止时间模式：按剩余时间和各模型的实测实时率为每个文件选择模型
+    scheduler = None
+    deadline = args.deadline
+    if deadline is None and args.time_budget is not None:
+        deadline = time.time() + args.time_budget * 3600
+    if deadline is not None:
+        if args.deadline_models is not None:
+            candidates = [model.strip() for model in args.deadline_models.split(',') if model.strip()]
+        else:
+            candidates = config.get_deadline_models()
+        if args.batch_size > 1 or args.workers > 0:
+            print("截止时间模式使用多线程处理，忽略 --batch_size 和 --workers")
+        scheduler = DeadlineScheduler(
+            deadline,
+            {full_path: info['duration'] if info else None for full_path, info in probed.items()},
+            models=candidates,
+            parallelism=min(args.threads, len(audio_files)),
+            precision=transcriber_options['compute_type'],
+            rtf_file=config.get_model_rtf_file()
+        )
+        completed, failed = run_thread_pool(
+            audio_files, transcriber_options, api_key, prompts_dir, args.output,
+            args.template, args.source_folder, args.threads, config, prefetch, formats, scheduler
+        )
+    elif args.batch_size > 1:
+        # 批量解码模式：大量短音频合并成批次解码，总结仍由多个线程并发完成
+        completed, failed = run_batched(
+            audio_files, transcriber_options, api_key, prompts_dir, args.output,
+            args.template, args.source_folder, args.threads, args.batch_size, config, formats
+        )
+    elif args.workers > 0:
+        # 多进程模式：每个进程拥有独立的模型和受限的PyTorch线程数
+        completed, failed = run_process_pool(
+            audio_files, transcriber_options, api_key, prompts_dir, args.output,
+            args.template, args.source_folder, args.workers, args.torch_threads, prefetch, formats
+        )
+    else:
+        completed, failed = run_thread_pool(
+            audio_files, transcriber_options, api_key, prompts_dir, args.output,
+            args.template, args.source_folder, args.threads, config, prefetch, formats
+        )
+    
+    print(f"\n\n处理完成！")
+    print(f"成功: {completed} 个文件")
+    print(f"失败: {failed} 个文件")
+    print(f"输出文件夹: {args.output}")
+
+def run_thread_pool(audio_files, transcriber_options, api_key, prompts_dir, output_folder, template,
+                    source_folder, num_threads, config, prefetch=2, formats=(), scheduler=None):
+    """多线程模式：所有线程共享同一个转录器，截止时间模式下共享按模型懒加载的一组转录器"""
+    from src.core.whisper_transcriber import WhisperTranscriber
+    from src.core.model_registry import get_model_registry
+    from src.core.deepseek_summarizer import DeepSeekSummarizer
+
+    # 初始化转录器和总结器
+    get_model_registry().configure(
+        idle_timeout=config.get_model_idle_timeout(),
+        memory_budget_mb=config.get_model_memory_budget()
+    )
+    if scheduler is None:
+        print(f"初始化Whisper转录器，模型: {transcriber_options['model_name']}")
+        transcriber = WhisperTranscriber(**transcriber_options)
+        transcribers = [transcriber]
+    else:
+        print(f"截止时间模式，候选模型: {', '.join(scheduler.models)}")
+        transcriber = ScheduledTranscribers(transcriber_options)
+        transcribers = None
+    
+    print(f"初始化DeepSeek总结器，模板: {template}")
+    summarizer = DeepSeekSummarizer(api_key, prompts_dir, max_connections=num_threads,
+                                    **config.get_summarizer_options())
     
     # 创建进度队列
     progress_queue = queue.Queue()
+    # 按Ctrl+C时取消，各线程在当前窗口解码完后停止
+    cancel_token = CancellationToken()
     
     # 创建并启动工作线程
     threads = []
-    max_threads = min(args.threads, len(audio_files))
+    max_threads = min(num_threads, len(audio_files))
     
     print(f"使用 {max_threads} 个线程进行并发处理")
     
@@ -173,14 +486,221 @@ def main():
         # 创建线程
         thread = threading.Thread(
             target=process_files_thread,
-            args=(thread_files, transcriber, summarizer, args.output, 
-                  args.template, args.source_folder, progress_queue)
+            args=(thread_files, transcriber, summarizer, output_folder, 
+                  template, source_folder, progress_queue, prefetch, cancel_token, formats, scheduler)
         )
         thread.daemon = True
         thread.start()
         threads.append(thread)
     
-    # 监控进度
+    try:
+        completed, failed = monitor_progress(progress_queue, audio_files)
+    except KeyboardInterrupt:
+        print("\n收到中断信号，正在停止（等待当前窗口解码完成）...")
+        cancel_token.cancel()
+        for thread in threads:
+            thread.join()
+        transcriber.close()
+        raise
+    
+    # 等待所有线程完成
+    for thread in threads:
+        thread.join()
+
+    if transcribers is None:
+        transcribers = transcriber.all()
+    for item in transcribers:
+        if item.transcript_cache is not None:
+            cache_stats = item.transcript_cache.stats()
+            print(f"\n转录缓存({item.model_name}): 命中{cache_stats['hits']}次，未命中{cache_stats['misses']}次，"
+                  f"命中率{cache_stats['hit_rate']:.1%}")
+    if scheduler is not None:
+        scheduler.report()
+    close_summarizer(summarizer)
+    transcriber.close()
+    return completed, failed
+
+def run_batched(audio_files, transcriber_options, api_key, prompts_dir, output_folder, template,
+                source_folder, num_threads, batch_size, config, formats=()):
+    """批量解码模式：一个线程负责批量转录，转录完成的文件直接提交给总结器并发总结"""
+    from src.core.whisper_transcriber import WhisperTranscriber
+    from src.core.model_registry import get_model_registry
+    from src.core.deepseek_summarizer import DeepSeekSummarizer
+
+    get_model_registry().configure(
+        idle_timeout=config.get_model_idle_timeout(),
+        memory_budget_mb=config.get_model_memory_budget()
+    )
+    print(f"初始化Whisper转录器，模型: {transcriber_options['model_name']}，批大小: {batch_size}")
+    transcriber = WhisperTranscriber(**transcriber_options)
+    
+    print(f"初始化DeepSeek总结器，模板: {template}")
+    summarizer = DeepSeekSummarizer(api_key, prompts_dir, max_connections=num_threads,
+                                    **config.get_summarizer_options())
+    
+    progress_queue = queue.Queue()
+    rel_paths = dict(audio_files)
+    
+    def save_summary(future, full_path, transcription, transcript_file, stats, summary_writer):
+        # 在总结器的事件循环线程中回调，只做写文件这类很快的操作
+        rel_path = rel_paths[full_path]
+        try:
+            summary = future.result()
+            transcript_file, summary_file = FileUtils.save_results(
+                transcription, summary, full_path, output_folder, rel_path, transcript_file,
+                summary_writer=summary_writer
+            )
+            progress_queue.put({'file': full_path, 'rel_path': rel_path, 'status': '完成', 'progress': 100,
+                                'transcript_file': transcript_file, 'summary_file': summary_file,
+                                'stats': stats})
+        except Exception as e:
+            summary_writer.close()
+            progress_queue.put({'file': full_path, 'rel_path': rel_path, 'status': f'错误: {str(e)}', 'progress': 0})
+    
+    def transcribe_all():
+        transcribed = set()
+        try:
+            for full_path, segments, stats in transcriber.transcribe_batch(
+                    [full_path for full_path, _ in audio_files], batch_size=batch_size):
+                transcribed.add(full_path)
+                try:
+                    transcribe_one(full_path, segments, stats)
+                except Exception as e:
+                    progress_queue.put({'file': full_path, 'rel_path': rel_paths[full_path],
+                                        'status': f'错误: {str(e)}', 'progress': 0})
+        except Exception as e:
+            # 转录器整体失败（如模型加载失败），其余文件全部标记为错误
+            for full_path, rel_path in audio_files:
+                if full_path not in transcribed:
+                    progress_queue.put({'file': full_path, 'rel_path': rel_path, 'status': f'错误: {str(e)}',
+                                        'progress': 0})
+    
+    def transcribe_one(full_path, segments, stats):
+        rel_path = rel_paths[full_path]
+        if segments is None:
+            progress_queue.put({'file': full_path, 'rel_path': rel_path,
+                                'status': f"错误: {stats.get('error')}", 'progress': 0})
+            return
+        writer = FileUtils.create_transcript_writer(full_path, output_folder, rel_path, formats)
+        try:
+            for segment in segments:
+                writer.write_segment(segment)
+        finally:
+            writer.close()
+        transcript_file = writer.finalize()
+        transcription = "".join(segment['text'] for segment in segments)
+        if not transcription.strip():
+            save_no_speech(full_path, rel_path, transcription, output_folder, transcript_file, stats, progress_queue)
+            return
+        progress_queue.put({'file': full_path, 'rel_path': rel_path, 'status': '转录完成，开始总结', 'progress': 50})
+        summary_writer = FileUtils.create_summary_writer(full_path, output_folder, rel_path)
+        future = summarizer.submit(transcription, FileUtils.get_audio_title(full_path), template,
+                                   on_token=summary_writer.write, metrics=stats)
+        future.add_done_callback(
+            lambda done: save_summary(done, full_path, transcription, transcript_file, stats, summary_writer))
+    
+    thread = threading.Thread(target=transcribe_all, daemon=True)
+    thread.start()
+    completed, failed = monitor_progress(progress_queue, audio_files)
+    thread.join()
+    
+    close_summarizer(summarizer)
+    transcriber.close()
+    return completed, failed
+
+def run_process_pool(audio_files, transcriber_options, api_key, prompts_dir, output_folder, template,
+                     source_folder, num_workers, torch_threads=None, prefetch=2, formats=()):
+    """多进程模式：文件通过共享队列分发给工作进程，进度通过队列回传给主进程"""
+    num_workers = min(num_workers, len(audio_files))
+    if torch_threads is None:
+        torch_threads = max(1, (os.cpu_count() or 1) // num_workers)
+    
+    print(f"使用 {num_workers} 个进程进行并发处理，每个进程 {torch_threads} 个PyTorch线程")
+    
+    # 使用spawn启动方式，避免fork时复制PyTorch线程池的状态
+    ctx = multiprocessing.get_context("spawn")
+    task_queue = ctx.Queue()
+    progress_queue = ctx.Queue()
+    
+    for audio_file_tuple in audio_files:
+        task_queue.put(audio_file_tuple)
+    # 每个进程一个结束标记
+    for _ in range(num_workers):
+        task_queue.put(None)
+    
+    workers = []
+    for _ in range(num_workers):
+        worker = ctx.Process(
+            target=process_worker_main,
+            args=(task_queue, progress_queue, transcriber_options, api_key, prompts_dir,
+                  output_folder, template, source_folder, torch_threads, prefetch, formats),
+            daemon=True
+        )
+        worker.start()
+        workers.append(worker)
+    
+    completed, failed = monitor_progress(progress_queue, audio_files, workers)
+    
+    for worker in workers:
+        worker.join()
+    return completed, failed
+
+def process_worker_main(task_queue, progress_queue, transcriber_options, api_key, prompts_dir,
+                        output_folder, template, source_folder, torch_threads, prefetch=2, formats=()):
+    """工作进程入口：加载自己的模型，从共享队列中依次取出文件处理"""
+    import torch
+    from src.core.whisper_transcriber import WhisperTranscriber
+    from src.core.deepseek_summarizer import DeepSeekSummarizer
+    torch.set_num_threads(torch_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # 进程内已经执行过并行操作时无法再修改
+        pass
+    
+    config = ConfigManager()
+    transcriber = WhisperTranscriber(**transcriber_options)
+    # 每个进程同时只总结一个文件，超长转录分段时各段并发请求，保留几个长连接
+    summarizer = DeepSeekSummarizer(api_key, prompts_dir, max_connections=4,
+                                    **config.get_summarizer_options())
+    try:
+        # 预取时会提前从任务队列中取出后续的文件
+        tasks = iter(task_queue.get, None)
+        for audio_file_tuple, prepared, error, metrics in iter_prefetched(tasks, transcriber, prefetch):
+            process_audio_file(audio_file_tuple, transcriber, summarizer, output_folder,
+                               template, source_folder, progress_queue, prepared, error, metrics, formats=formats)
+    finally:
+        summarizer.close()
+        transcriber.close()
+
+def close_summarizer(summarizer):
+    """输出总结接口的连接复用情况、生成速度和缓存命中率并关闭连接池"""
+    http_stats = summarizer.connection_stats()
+    if http_stats['requests']:
+        print(f"\n总结接口: {http_stats['requests']}次请求，复用连接{http_stats['reused']}次，"
+              f"新建连接{http_stats['new_connections']}个，平均握手{http_stats['avg_handshake_seconds'] * 1000:.0f}毫秒")
+    summary_stats = summarizer.summary_stats()
+    if summary_stats['summaries']:
+        print(f"总结生成: {summary_stats['summaries']}个，平均首个token {summary_stats['avg_ttft_seconds']:.2f}秒，"
+              f"平均{summary_stats['tokens_per_second']:.1f} token/秒")
+    if summarizer.cache is not None:
+        cache_stats = summarizer.cache_stats()
+        print(f"总结缓存: 命中{cache_stats['hits']}次，未命中{cache_stats['misses']}次，命中率{cache_stats['hit_rate']:.1%}，"
+              f"合并相同请求{cache_stats['coalesced']}次，占用{cache_stats['size_mb']}MB")
+    summarizer.close()
+
+def monitor_progress(progress_queue, audio_files, workers=None):
+    """
+    在主进程中汇总并显示处理进度
+    
+    Args:
+        progress_queue: 进度队列（线程队列或进程队列）
+        audio_files (list): 待处理的文件列表
+        workers (list): 工作进程列表，用于检测进程异常退出
+        
+    Returns:
+        tuple: (成功数, 失败数)
+    """
     completed = 0
     failed = 0
     file_status = {}
@@ -212,6 +732,34 @@ def main():
                 print(f"\n完成 ({completed}/{len(audio_files)}): {rel_path}")
                 print(f"  转录文件: {transcript_file}")
                 print(f"  总结文件: {summary_file}")
+                stats = update.get('stats') or {}
+                if stats.get('transcript_cache_hit'):
+                    print("  转录缓存命中")
+                if stats.get('prefetch_wait_seconds', 0) >= 0.1:
+                    print(f"  等待预取: {stats['prefetch_wait_seconds']:.2f}秒，"
+                          f"缓冲区就绪{stats.get('prefetch_queue_depth', 0)}个文件")
+                if 'rtf' in stats:
+                    print(f"  计算精度: {stats['compute_type']}，实时率(RTF): {stats['rtf']:.3f}")
+                if stats.get('no_speech'):
+                    print("  未检测到语音，未生成总结")
+                if 'skipped_seconds' in stats:
+                    print(f"  语音检测跳过: {stats['skipped_seconds']:.1f}秒 ({stats['skipped_ratio']:.1%})")
+                if stats.get('fallback_decodes') or stats.get('aborted_windows'):
+                    print(f"  解码保护: 回退重新解码{stats['fallback_decodes']}次，中止重复循环窗口{stats['aborted_windows']}个，"
+                          f"耗时{stats['fallback_seconds'] + stats['aborted_seconds']:.2f}秒")
+                if 'cascade_windows' in stats:
+                    line = (f"  级联转录: {stats['cascade_escalated_ratio']:.1%}的音频升级到{stats['cascade_model']}"
+                            f"（{stats['cascade_escalated_windows']}/{stats['cascade_windows']}个窗口）")
+                    if 'cascade_speedup' in stats:
+                        line += f"，相对全程使用大模型约加速{stats['cascade_speedup']:.2f}倍"
+                    print(line)
+                if stats.get('summary_cache_hit') or stats.get('summary_coalesced'):
+                    print("  总结缓存命中" if stats.get('summary_cache_hit') else "  总结与相同的请求合并")
+                if 'summary_chunks' in stats:
+                    print(f"  分段总结: {stats['summary_chunks']}段并发提取要点，耗时{stats['summary_map_seconds']:.2f}秒")
+                if 'summary_ttft_seconds' in stats:
+                    print(f"  总结: 首个token {stats['summary_ttft_seconds']:.2f}秒，"
+                          f"{stats['summary_tokens']}个token，{stats['summary_tokens_per_second']:.1f} token/秒")
             elif status.startswith('错误'):
                 failed += 1
                 # 获取相对路径用于显示
@@ -223,21 +771,39 @@ def main():
             print(f"\r总体进度: {total_progress:.1f}% ({completed+failed}/{len(audio_files)}) ", end='', flush=True)
             
         except queue.Empty:
+            # 所有工作进程都已退出但仍有文件未完成，说明进程异常终止
+            if workers and not any(worker.is_alive() for worker in workers):
+                unfinished = len(audio_files) - completed - failed
+                print(f"\n所有工作进程已退出，{unfinished} 个文件未完成")
+                failed += unfinished
+                break
             continue
     
-    # 等待所有线程完成
-    for thread in threads:
-        thread.join()
-    
-    print(f"\n\n处理完成！")
-    print(f"成功: {completed} 个文件")
-    print(f"失败: {failed} 个文件")
-    print(f"输出文件夹: {args.output}")
+    return completed, failed
+
+def process_files_thread(files, transcriber, summarizer, output_folder, template, source_folder, progress_queue,
+                         prefetch=2, cancel_token=None, formats=(), scheduler=None):
+    """工作线程函数，处理分配给它的文件；截止时间模式下transcriber为ScheduledTranscribers"""
+    if scheduler is None:
+        for file_tuple, prepared, error, metrics in iter_prefetched(files, transcriber, prefetch):
+            if cancel_token is not None and cancel_token.is_cancelled():
+                break
+            process_audio_file(file_tuple, transcriber, summarizer, output_folder, template, source_folder,
+                               progress_queue, prepared, error, metrics, cancel_token, formats)
+        return
 
-def process_files_thread(files, transcriber, summarizer, output_folder, template, source_folder, progress_queue):
-    """工作线程函数，处理分配给它的文件"""
-    for file_tuple in files:
-        process_audio_file(file_tuple, transcriber, summarizer, output_folder, template, source_folder, progress_queue)
+    for file_tuple, decision, file_transcriber, prepared, error, metrics in iter_scheduled(
+        files, scheduler, transcriber, prefetch
+    ):
+        if cancel_token is not None and cancel_token.is_cancelled():
+            if decision is not None:
+                scheduler.complete(decision)
+            break
+        start_time = time.time()
+        stats = process_audio_file(file_tuple, file_transcriber, summarizer, output_folder, template, source_folder,
+                                   progress_queue, prepared, error, metrics, cancel_token, formats)
+        if decision is not None:
+            scheduler.complete(decision, stats, time.time() - start_time)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
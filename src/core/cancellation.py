@@ -0,0 +1,61 @@
+import threading
+
+
+class CancellationToken:
+    """协作式取消令牌
+
+    转录在每个30秒窗口（或长音频分块）之间检查令牌，取消后当前窗口解码完即停止，
+    已解码的片段保留给调用方。每次运行使用一个新的令牌，停止旧任务时不会误伤之后开始的任务。
+    异步任务可以注册回调，在取消时立即中断等待中的请求，而不必轮询令牌。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = set()
+
+    def cancel(self):
+        """请求取消，并调用已注册的回调（每个回调只调用一次）"""
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, set()
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        """
+        注册取消时调用的回调，回调在调用 cancel() 的线程中执行
+
+        Args:
+            callback (callable): 无参数的回调；令牌已被取消时立即调用
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.add(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        """注销回调，任务正常结束时调用"""
+        with self._lock:
+            self._callbacks.discard(callback)
+
+    def reset(self):
+        """清除取消状态，令牌可以再次使用"""
+        self._event.clear()
+
+    def is_cancelled(self):
+        """是否已请求取消"""
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """
+        等待取消请求
+
+        Args:
+            timeout (float): 超时时间（秒），None表示一直等待
+
+        Returns:
+            bool: 超时前是否已被取消
+        """
+        return self._event.wait(timeout)
@@ -0,0 +1,138 @@
+import time
+
+import numpy as np
+from whisper.audio import SAMPLE_RATE
+
+from src.core.window_decoder import WindowDecoder
+
+# 低于该时长（秒）的窗口不值得用大模型重新解码
+MIN_REFINE_SECONDS = 0.2
+
+
+class CascadeRefiner:
+    """两遍级联转录中的第二遍：用较大的模型重新解码低置信度的窗口
+
+    快速的草稿模型逐窗口解码，某个窗口的平均对数概率偏低、压缩比偏高（重复）或无语音概率偏高
+    （静音中的幻觉）时，把草稿模型在该窗口实际消耗的那段音频交给大模型重新解码，
+    并用大模型的片段替换草稿片段。阈值比解码时的温度回退更严格：回退只处理明显失败的结果，
+    这里处理的是可用但不可靠的部分。每个音频文件使用一个实例，同时统计升级比例和耗时。
+    """
+
+    def __init__(self, model, audio, language, decode_params, logprob_threshold=-0.7,
+                 compression_ratio_threshold=2.0, no_speech_threshold=0.5):
+        """
+        初始化级联重解码器
+
+        Args:
+            model: 已加载的大模型
+            audio (np.ndarray): 草稿模型解码的16kHz音频（启用语音检测时为拼接后的语音）
+            language (str): 语言代码，None表示由大模型自动检测
+            decode_params (dict): 解码参数，与草稿模型一致
+            logprob_threshold (float): 平均对数概率低于此值时升级
+            compression_ratio_threshold (float): 压缩比高于此值时升级
+            no_speech_threshold (float): 无语音概率高于此值时升级
+        """
+        self.model = model
+        self.audio = audio
+        self.language = language
+        self.decode_params = decode_params
+        self.logprob_threshold = logprob_threshold
+        self.compression_ratio_threshold = compression_ratio_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.windows = 0
+        self.escalated_windows = 0
+        self.total_seconds = 0.0
+        self.escalated_seconds = 0.0
+        self.refine_seconds = 0.0
+
+    def needs_refine(self, segments):
+        """
+        判断窗口是否需要升级
+
+        同一窗口的片段来自同一次解码，共享置信度指标，任一指标越过阈值即升级
+
+        Args:
+            segments (list): 草稿模型在该窗口产出的片段
+
+        Returns:
+            bool: 是否需要用大模型重新解码
+        """
+        for segment in segments:
+            if not segment['text']:
+                continue
+            if self.logprob_threshold is not None and segment['avg_logprob'] < self.logprob_threshold:
+                return True
+            if (self.compression_ratio_threshold is not None
+                    and segment['compression_ratio'] > self.compression_ratio_threshold):
+                return True
+            if self.no_speech_threshold is not None and segment['no_speech_prob'] > self.no_speech_threshold:
+                return True
+        return False
+
+    def refine_window(self, segments, start, end):
+        """
+        需要时用大模型重新解码窗口，作为 WindowDecoder.iter_segments 的 refine 参数
+
+        Args:
+            segments (list): 草稿模型在该窗口产出的片段
+            start (float): 窗口起始时间（秒）
+            end (float): 草稿模型在该窗口消耗到的时间（秒）
+
+        Returns:
+            list: 替换后的片段；大模型判断为无语音时返回空列表
+        """
+        self.windows += 1
+        self.total_seconds += end - start
+        if end - start < MIN_REFINE_SECONDS or not self.needs_refine(segments):
+            return segments
+
+        refine_start = time.time()
+        window_audio = np.array(self.audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)], dtype=np.float32)
+        decoder = WindowDecoder(self.model, language=self.language, task="transcribe", **self.decode_params)
+        refined = []
+        for segment in decoder.iter_segments(window_audio):
+            segment['start'] += start
+            segment['end'] += start
+            segment['seek'] = segments[0]['seek'] if segments else segment['seek']
+            segment['refined'] = True
+            refined.append(segment)
+
+        self.escalated_windows += 1
+        self.escalated_seconds += end - start
+        self.refine_seconds += time.time() - refine_start
+        return refined
+
+    def record_stats(self, stats, decode_seconds, window_seconds=None):
+        """
+        记录升级比例和相对于全程使用大模型的加速比
+
+        全程使用大模型的耗时按大模型每个窗口的平均耗时乘以窗口总数估算：
+        每个窗口都会补齐到30秒再编码，窗口数比音频时长更能反映大模型的开销。
+
+        Args:
+            stats (dict): 统计信息
+            decode_seconds (float): 两遍解码的总耗时（秒）
+            window_seconds (float): 之前的文件中大模型每个窗口的平均耗时，本文件没有升级的窗口时用于估算
+
+        Returns:
+            float: 本文件中大模型每个窗口的平均耗时，没有升级的窗口时返回None
+        """
+        stats['cascade_windows'] = self.windows
+        stats['cascade_escalated_windows'] = self.escalated_windows
+        stats['cascade_escalated_seconds'] = self.escalated_seconds
+        stats['cascade_escalated_ratio'] = (self.escalated_seconds / self.total_seconds
+                                            if self.total_seconds > 0 else 0.0)
+        stats['cascade_refine_seconds'] = self.refine_seconds
+        stats['cascade_draft_seconds'] = max(0.0, decode_seconds - self.refine_seconds)
+        current = self.refine_seconds / self.escalated_windows if self.escalated_windows else None
+        if current is not None:
+            window_seconds = current
+        if window_seconds is not None and decode_seconds > 0:
+            stats['cascade_full_estimate_seconds'] = window_seconds * self.windows
+            stats['cascade_speedup'] = stats['cascade_full_estimate_seconds'] / decode_seconds
+        line = (f"级联转录: 升级{self.escalated_windows}/{self.windows}个窗口"
+                f"（{stats['cascade_escalated_ratio']:.1%}的音频），大模型耗时{self.refine_seconds:.2f}秒")
+        if 'cascade_speedup' in stats:
+            line += f"，相对全程使用大模型约加速{stats['cascade_speedup']:.2f}倍"
+        print(line)
+        return current
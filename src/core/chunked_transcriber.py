@@ -0,0 +1,357 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from src.core.model_registry import get_model_registry
+from src.core.window_decoder import WindowDecoder, merge_decode_counters
+from src.utils.vad_utils import EnergyVAD, SAMPLE_RATE
+
+# 工作进程内的模型，由进程初始化函数加载
+_worker_model = None
+# 主进程与工作进程共享的取消事件，置位后正在转录的分块在当前窗口结束后停止
+_worker_cancel_event = None
+
+
+def _init_chunk_worker(model_name, device, precision, torch_threads, quantized_cache_dir=None, cancel_event=None):
+    """分块转录工作进程初始化：限制线程数并加载模型"""
+    global _worker_model, _worker_cancel_event
+    _worker_cancel_event = cancel_event
+    import torch
+    torch.set_num_threads(torch_threads)
+    registry = get_model_registry()
+    registry.configure(quantized_cache_dir=quantized_cache_dir)
+    _worker_model = registry.acquire(model_name, device, precision)
+
+
+def _transcribe_chunk(audio, offset, language, decode_params):
+    """
+    在工作进程中转录单个分块
+
+    Args:
+        audio (np.ndarray): 分块音频
+        offset (float): 分块在整段音频中的起始时间（秒）
+        language (str): 语言代码
+        decode_params (dict): 传给 WindowDecoder 的解码参数
+
+    Returns:
+        tuple: (时间戳已加上偏移的片段列表, 解码计数)
+    """
+    should_stop = _worker_cancel_event.is_set if _worker_cancel_event is not None else None
+    counters = {}
+    segments = transcribe_chunk_with_model(_worker_model, audio, offset, language, decode_params, should_stop,
+                                           counters)
+    return segments, counters
+
+
+def transcribe_chunk_with_model(model, audio, offset, language, decode_params, should_stop=None, counters=None):
+    """
+    用指定模型转录一个分块，返回加上时间偏移的片段；should_stop返回True时在窗口之间停止，
+    提供counters时把回退和重复循环中止的计数累加到其中
+    """
+    decoder = WindowDecoder(model, language=language, task="transcribe", **(decode_params or {}))
+    segments = []
+    for segment in decoder.iter_segments(audio, should_stop=should_stop):
+        segments.append({
+            'start': segment['start'] + offset,
+            'end': segment['end'] + offset,
+            'text': segment['text'],
+            'avg_logprob': segment.get('avg_logprob'),
+            'no_speech_prob': segment.get('no_speech_prob'),
+            'compression_ratio': segment.get('compression_ratio')
+        })
+    if counters is not None:
+        merge_decode_counters(counters, decoder.counters)
+    return segments
+
+
+def plan_chunks(audio, chunk_seconds=600, overlap_seconds=5, search_seconds=15, vad=None):
+    """
+    在低能量位置切分长音频
+
+    Args:
+        audio (np.ndarray): 16kHz单声道音频
+        chunk_seconds (float): 目标分块长度（秒）
+        overlap_seconds (float): 每个分块向前重叠的长度（秒），为解码器提供上下文
+        search_seconds (float): 在目标切点前后搜索能量最低帧的范围（秒）
+        vad (EnergyVAD): 用于计算帧能量的检测器
+
+    Returns:
+        list: [(切点起始采样点, 切点结束采样点, 实际解码起始采样点), ...]
+    """
+    total = len(audio)
+    chunk_length = int(chunk_seconds * SAMPLE_RATE)
+    if total <= chunk_length:
+        return [(0, total, 0)]
+
+    vad = vad or EnergyVAD()
+    energy_db, _ = vad.frame_features(audio)
+    frame_length = vad.frame_length
+    search_frames = int(search_seconds * SAMPLE_RATE / frame_length)
+
+    cuts = [0]
+    target = chunk_length
+    while target < total - chunk_length // 4:
+        center = target // frame_length
+        lo = max(0, center - search_frames)
+        hi = min(len(energy_db), center + search_frames + 1)
+        if hi > lo:
+            cut = (lo + int(np.argmin(energy_db[lo:hi]))) * frame_length
+        else:
+            cut = target
+        if cut <= cuts[-1]:
+            cut = target
+        cuts.append(cut)
+        target = cut + chunk_length
+    cuts.append(total)
+
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    return [(start, end, max(0, start - overlap) if i > 0 else 0)
+            for i, (start, end) in enumerate(zip(cuts[:-1], cuts[1:]))]
+
+
+def _dedupe_overlap_text(previous_text, next_text, min_length=4):
+    """去掉next_text开头与previous_text结尾重复的部分"""
+    max_length = min(len(previous_text), len(next_text))
+    for length in range(max_length, min_length - 1, -1):
+        if previous_text.endswith(next_text[:length]):
+            return next_text[length:]
+    return next_text
+
+
+def select_chunk_segments(chunk, segments, previous_segment=None, last=False):
+    """
+    从一个分块的转录结果中选出归属于该分块的片段
+
+    重叠区域由前后两个分块各转录一次：以切点为界，中点落在切点之前的片段归前一个分块，
+    中点在切点上或之后的归后一个分块，边界处残留的重复文本再按前后缀匹配去掉。
+
+    Args:
+        chunk (tuple): plan_chunks返回的分块信息
+        segments (list): 该分块的片段列表
+        previous_segment (dict): 前一个分块保留的最后一个片段
+        last (bool): 是否为最后一个分块，最后一个分块同时保留中点恰好在音频结尾的片段
+
+    Returns:
+        list: 保留的片段
+    """
+    start, end, _ = chunk
+    cut_start = start / SAMPLE_RATE
+    cut_end = end / SAMPLE_RATE
+    selected = []
+    for segment in segments:
+        middle = (segment['start'] + segment['end']) / 2
+        if middle < cut_start or middle > cut_end or (middle == cut_end and not last):
+            continue
+        if not selected and previous_segment is not None:
+            segment = dict(segment)
+            segment['text'] = _dedupe_overlap_text(previous_segment['text'], segment['text'])
+            if not segment['text'].strip():
+                continue
+        selected.append(segment)
+    return selected
+
+
+def stitch_chunks(chunk_segments, chunks):
+    """
+    拼接各分块的片段
+
+    Args:
+        chunk_segments (list): 每个分块的片段列表，与chunks一一对应
+        chunks (list): plan_chunks返回的分块信息
+
+    Returns:
+        list: 按时间排序的片段列表
+    """
+    stitched = []
+    for index, (chunk, segments) in enumerate(zip(chunks, chunk_segments)):
+        stitched.extend(select_chunk_segments(chunk, segments, stitched[-1] if stitched else None,
+                                              last=index == len(chunks) - 1))
+    return stitched
+
+
+class ChunkedTranscriber:
+    """长音频分块并行转录
+
+    在低能量位置把长音频切成带重叠的分块，由多个工作进程并行转录，
+    再按时间偏移拼接成一份转录结果。工作进程池在多个文件之间复用，
+    每个进程只加载一次模型。
+    """
+
+    def __init__(self, model_name, device, chunk_seconds=600, overlap_seconds=5, max_workers=None, precision=None):
+        """
+        初始化分块转录器
+
+        Args:
+            model_name (str): 模型名称
+            device (str): 设备
+            chunk_seconds (float): 分块长度（秒）
+            overlap_seconds (float): 分块重叠长度（秒）
+            max_workers (int): 工作进程数，默认为CPU核心数的一半
+            precision (str): 计算精度，默认GPU上为fp16、CPU上为fp32
+        """
+        self.model_name = model_name
+        self.device = device
+        self.precision = precision or ("fp16" if device == "cuda" else "fp32")
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.max_workers = max_workers or max(2, (os.cpu_count() or 2) // 2)
+        self._executor = None
+        self._cancel_event = None
+
+    @staticmethod
+    def can_use_processes():
+        """守护进程（如批处理的工作进程）不能再创建子进程"""
+        return not multiprocessing.current_process().daemon
+
+    def _get_executor(self):
+        """按需创建并复用工作进程池"""
+        if self._executor is None:
+            torch_threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+            ctx = multiprocessing.get_context("spawn")
+            self._cancel_event = ctx.Event()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=ctx,
+                initializer=_init_chunk_worker,
+                initargs=(self.model_name, self.device, self.precision, torch_threads,
+                          get_model_registry().quantized_cache_dir, self._cancel_event)
+            )
+        return self._executor
+
+    def iter_segments(self, audio, language="zh", decode_params=None, progress_callback=None,
+                      should_stop=None, model=None, start_chunk=0, previous_segment=None, chunk_callback=None,
+                      counters=None):
+        """
+        分块并行转录，按时间顺序产出拼接后的片段
+
+        分块可能乱序完成，某个分块之前的分块全部完成后才产出它的片段。
+
+        Args:
+            audio (np.ndarray): 16kHz单声道音频
+            language (str): 语言代码
+            decode_params (dict): 传给 WindowDecoder 的解码参数，如 initial_prompt, fp16
+            progress_callback (callable): 进度回调，接收0-1之间的完成比例
+            should_stop (callable): 返回True时取消尚未开始的分块，正在转录的分块在当前窗口结束后停止
+            model: 无法使用多进程时在当前进程中顺序转录所用的模型
+            start_chunk (int): 从检查点恢复时的起始分块序号，之前的分块不再转录
+            previous_segment (dict): 从检查点恢复时已产出的最后一个片段，用于去除重叠区域的重复
+            chunk_callback (callable): 每个分块的片段全部产出后调用，接收下一个分块的序号
+            counters (dict): 可选，累加各分块的解码计数（温度回退、重复循环中止）
+
+        Yields:
+            dict: 片段，时间相对于audio起点
+        """
+        chunks = plan_chunks(audio, self.chunk_seconds, self.overlap_seconds)
+        total_samples = max(1, len(audio))
+        print(f"长音频分块转录: {len(chunks)}个分块，每块约{self.chunk_seconds}秒")
+        start_time = time.time()
+        if start_chunk:
+            print(f"从检查点继续，跳过前{start_chunk}个分块")
+        done_samples = sum(end - start for start, end, _ in chunks[:start_chunk])
+
+        if not self.can_use_processes():
+            # 已在工作进程中，退化为当前进程内顺序转录
+            for index in range(start_chunk, len(chunks)):
+                chunk = chunks[index]
+                if should_stop and should_stop():
+                    return
+                start, end, decode_start = chunk
+                segments = transcribe_chunk_with_model(
+                    model, audio[decode_start:end], decode_start / SAMPLE_RATE, language, decode_params, should_stop,
+                    counters
+                )
+                done_samples += end - start
+                if progress_callback:
+                    progress_callback(done_samples / total_samples)
+                # 中途停止的分块只含停止前解码的窗口，这些片段仍然有效
+                for segment in select_chunk_segments(chunk, segments, previous_segment,
+                                                     last=index == len(chunks) - 1):
+                    previous_segment = segment
+                    yield segment
+                if should_stop and should_stop():
+                    # 中途停止的分块不完整，不记为已完成
+                    return
+                if chunk_callback:
+                    chunk_callback(index + 1)
+        else:
+            try:
+                executor = self._get_executor()
+                futures = {}
+                for index, (start, end, decode_start) in enumerate(chunks):
+                    if index < start_chunk:
+                        continue
+                    future = executor.submit(
+                        _transcribe_chunk, audio[decode_start:end], decode_start / SAMPLE_RATE, language, decode_params
+                    )
+                    futures[future] = index
+
+                chunk_segments = [None] * len(chunks)
+                next_index = start_chunk
+                pending = set(futures)
+                try:
+                    while pending:
+                        done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            index = futures[future]
+                            chunk_segments[index], chunk_counters = future.result()
+                            if counters is not None:
+                                merge_decode_counters(counters, chunk_counters)
+                            start, end, _ = chunks[index]
+                            done_samples += end - start
+                            if progress_callback:
+                                progress_callback(done_samples / total_samples)
+
+                        # 按顺序产出已连续完成的分块
+                        while next_index < len(chunks) and chunk_segments[next_index] is not None:
+                            for segment in select_chunk_segments(chunks[next_index], chunk_segments[next_index],
+                                                                 previous_segment,
+                                                                 last=next_index == len(chunks) - 1):
+                                previous_segment = segment
+                                yield segment
+                            chunk_segments[next_index] = []  # 已产出，释放内存
+                            next_index += 1
+                            if chunk_callback:
+                                chunk_callback(next_index)
+                        # 停止时先产出上面已完成的分块，让它们写入检查点，再放弃其余分块
+                        if should_stop and should_stop():
+                            return
+                finally:
+                    # 提前结束（停止或调用方不再迭代）时取消尚未开始的分块，
+                    # 并通知正在转录的分块在当前窗口结束后返回，等它们退出后工作进程即可处理下一个文件
+                    if pending:
+                        self._cancel_event.set()
+                        for future in pending:
+                            future.cancel()
+                        wait(pending)
+                        self._cancel_event.clear()
+            except BrokenProcessPool as e:
+                # 工作进程异常退出（内存不足、ffmpeg崩溃等）后进程池不能再用，
+                # 丢弃它，只让当前文件失败，下一个文件重新创建进程池
+                self.close()
+                raise RuntimeError(f"分块转录的工作进程异常退出: {e}") from e
+
+        print(f"分块转录耗时: {time.time() - start_time:.2f}秒")
+
+    def transcribe(self, audio, language="zh", decode_params=None, progress_callback=None,
+                   should_stop=None, model=None, start_chunk=0, previous_segment=None, chunk_callback=None):
+        """
+        分块并行转录
+
+        Args:
+            同 iter_segments
+
+        Returns:
+            list: 按时间排序的片段列表，时间相对于audio起点
+        """
+        return list(self.iter_segments(audio, language, decode_params, progress_callback, should_stop, model,
+                                       start_chunk, previous_segment, chunk_callback))
+
+    def close(self):
+        """关闭工作进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
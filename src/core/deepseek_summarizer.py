@@ -1,39 +1,332 @@
-import requests
+import asyncio
+import httpx
 import json
 import time
 import os
 import threading
-import uuid
 
-class DeepSeekSummarizer:
-    """DeepSeek API总结类"""
+from src.core.cancellation import CancellationToken
+from src.utils.result_cache import ResultCache
+from src.utils.token_utils import count_tokens, split_by_tokens
+
+# DeepSeek对话补全接口
+DEFAULT_API_URL = "https://api.deepseek.com/chat/completions"
+
+# 生成参数，同时作为总结缓存键的一部分
+MODEL = "deepseek-chat"
+MAX_TOKENS = 4096
+TEMPERATURE = 1
+
+# 请求过程中记录TCP连接和TLS握手的trace事件
+_HANDSHAKE_EVENTS = {
+    'connection.connect_tcp.started': 'connection.connect_tcp.complete',
+    'connection.start_tls.started': 'connection.start_tls.complete'
+}
+
+# 超长转录分段总结（map阶段）的提示词，各段要点合并后再交给所选模板做最终总结
+CHUNK_PROMPT = """你正在分段处理一份很长的音频转录，【音频标题】：{audio_title}
+
+下面是其中的第{index}部分（共{total}部分）。请按出现顺序，用分级要点列出这一部分的全部核心观点、
+重要细节、论据、案例、数据和结论，不要遗漏，也不要加入原文没有的内容。只输出要点，不要开场白和结束语。
+
+【第{index}部分内容】：
+{content}"""
 
-    def __init__(self, api_key, prompts_dir="prompts"):
+# 合并后的要点仍然超出预算时最多再分段压缩的轮数
+MAX_MAP_ROUNDS = 3
+
+
+class SummaryRequestError(Exception):
+    """总结请求在重试后仍然失败"""
+
+
+class DeepSeekSummarizer:
+    """DeepSeek API总结类
+
+    所有总结请求作为协程运行在同一个后台线程的asyncio事件循环上，共享一个异步HTTP连接池，
+    同时进行的请求数由 max_concurrency 限制，不再为每个请求创建线程。连接保持长连接复用，
+    可选启用HTTP/2，多个请求复用同一个连接。submit() 立即返回 concurrent.futures.Future，
+    summarize() 是阻塞等待结果的同步封装。取消通过 CancellationToken 的回调直接中断请求。
+    流式模式下逐个解析服务端事件（SSE），文本增量一到达就交给回调，不必等待完整的回答；
+    每个请求都记录首个token耗时(TTFT)和生成速度。
+    提示词超出输入预算的超长转录按句子边界分段，各段并发提取要点（map），
+    再把合并的要点交给所选模板做最终总结（reduce），耗时取决于最慢的一段而不是整篇的长度。
+    每个请求的回答按提示词和生成参数缓存到磁盘，重新运行或换模板对比时未变的请求不再发送；
+    同时进行的相同请求只发送一次，其余调用等待同一个结果。
+    """
+
+    def __init__(self, api_key, prompts_dir="prompts", max_connections=4, http2=False, api_url=None,
+                 max_concurrency=256, stream=False, max_input_tokens=48000, chunk_tokens=12000,
+                 cache_dir=None, cache_size_mb=64, cache_ttl=None):
         """
         初始化DeepSeek总结器
 
         Args:
             api_key (str): DeepSeek API密钥
             prompts_dir (str): 提示词模板目录，默认为"prompts"
+            max_connections (int): 连接池大小，超出的请求在池中排队等待空闲连接
+            http2 (bool): 是否启用HTTP/2，需要安装h2，未安装时使用HTTP/1.1
+            api_url (str): 接口地址，默认为DeepSeek的对话补全接口，可指向本地的替代服务做测试
+            max_concurrency (int): 同时进行的总结请求数上限
+            stream (bool): 是否使用流式响应
+            max_input_tokens (int): 提示词的token预算，超出时分段总结，None表示不检查长度
+            chunk_tokens (int): 分段总结时每段转录的token预算
+            cache_dir (str): 总结结果缓存目录，None表示不缓存
+            cache_size_mb (float): 总结结果缓存的大小上限（MB）
+            cache_ttl (float): 缓存条目的存活时间（秒），None表示永不过期
         """
         self.api_key = api_key
-        self.api_url = "https://api.deepseek.com/chat/completions"
+        self.api_url = api_url or DEFAULT_API_URL
         self.prompts_dir = prompts_dir
         self._lock = threading.Lock()
-        # 用于停止标志的全局控制 - 使用uuid作为键，列表存储实际标志
-        self._stop_flags = {}  # {uuid: [False]}
+        # stop() 取消当前令牌，reset_stop_flags() 换成新令牌，之后提交的请求不受影响
+        self._cancel_token = CancellationToken()
+        self.max_connections = max(1, max_connections)
+        self.max_concurrency = max(1, max_concurrency)
+        self.http2 = http2
+        self.stream = stream
+        self.max_input_tokens = max_input_tokens
+        self.chunk_tokens = max(1000, chunk_tokens)
+        self.cache = ResultCache(cache_dir, cache_size_mb, cache_ttl) if cache_dir else None
+        # 正在进行的请求 {缓存键: 共享状态}，只在事件循环线程中访问
+        self._inflight = {}
+        self._coalesced = 0
+        # 事件循环、连接池和信号量在第一次提交请求时于后台线程中创建
+        self._loop = None
+        self._loop_thread = None
+        self.client = None
+        self._semaphore = None
+        # 连接统计：请求数、新建连接数和握手总耗时
+        self._http_stats = {'requests': 0, 'new_connections': 0, 'handshake_seconds': 0.0}
+        # 生成统计：成功的总结数、首个token总耗时、输出token数和生成耗时
+        self._summary_stats = {'summaries': 0, 'ttft_seconds': 0.0, 'tokens': 0, 'generate_seconds': 0.0}
+
+    def _create_client(self, http2):
+        """创建共享的异步连接池，h2未安装时退回HTTP/1.1"""
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+            keepalive_expiry=60
+        )
+        # 默认超时，各请求会按重试次数另行指定
+        timeout = httpx.Timeout(120, connect=15)
+        if http2:
+            try:
+                return httpx.AsyncClient(http2=True, limits=limits, timeout=timeout)
+            except ImportError:
+                print("未安装h2，使用HTTP/1.1连接")
+        return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    def _ensure_loop(self):
+        """返回后台事件循环，尚未启动时启动"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._loop_thread = threading.Thread(target=self._run_loop, args=(loop, ready),
+                                                     name="summary-loop", daemon=True)
+                self._loop_thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def _run_loop(self, loop, ready):
+        """事件循环线程"""
+        asyncio.set_event_loop(loop)
+        self.client = self._create_client(self.http2)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def close(self):
+        """取消未完成的请求，关闭连接池并停止事件循环"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+            thread, self._loop_thread = self._loop_thread, None
+        if loop is None:
+            return
+
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.client.aclose()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=10)
+        except Exception as e:
+            print(f"关闭总结连接池时出错: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+
+    def connection_stats(self):
+        """
+        获取连接统计
+
+        Returns:
+            dict: requests（请求数）、new_connections（新建连接数）、reused（复用连接的请求数）、
+                handshake_seconds（TCP+TLS握手总耗时）、avg_handshake_seconds（每个新连接的平均握手耗时）
+        """
+        with self._lock:
+            stats = dict(self._http_stats)
+        stats['reused'] = stats['requests'] - stats['new_connections']
+        stats['avg_handshake_seconds'] = (stats['handshake_seconds'] / stats['new_connections']
+                                          if stats['new_connections'] else 0.0)
+        return stats
+
+    def summary_stats(self):
+        """
+        获取生成统计
+
+        Returns:
+            dict: summaries（成功的总结数）、tokens（输出token数）、avg_ttft_seconds（平均首个token耗时）、
+                tokens_per_second（从首个token到结束的平均生成速度）
+        """
+        with self._lock:
+            stats = dict(self._summary_stats)
+        stats['avg_ttft_seconds'] = stats['ttft_seconds'] / stats['summaries'] if stats['summaries'] else 0.0
+        stats['tokens_per_second'] = (stats['tokens'] / stats['generate_seconds']
+                                      if stats['generate_seconds'] > 0 else 0.0)
+        return stats
+
+    def cache_stats(self):
+        """
+        获取总结缓存统计
+
+        Returns:
+            dict: hits、misses、hit_rate、size_mb（未启用缓存时均为0），
+                coalesced（合并到进行中的相同请求而未重复发送的次数）
+        """
+        if self.cache is not None:
+            stats = self.cache.stats()
+        else:
+            stats = {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'size_mb': 0.0}
+        with self._lock:
+            stats['coalesced'] = self._coalesced
+        return stats
+
+    @staticmethod
+    def _handshake_trace(timing):
+        """返回httpx的trace回调，记录本次请求建立连接（TCP连接和TLS握手）的耗时"""
+        started = {}
+
+        # 异步客户端的trace回调必须是协程函数
+        async def trace(event_name, info):
+            if event_name in _HANDSHAKE_EVENTS:
+                started[_HANDSHAKE_EVENTS[event_name]] = time.perf_counter()
+            elif event_name in started:
+                timing['handshake_seconds'] += time.perf_counter() - started.pop(event_name)
+                timing['new_connection'] = True
+
+        return trace
+
+    async def _post(self, payload, headers, timeout, stream=False):
+        """
+        通过连接池发送请求，并记录是否新建了连接以及握手耗时
+
+        Args:
+            stream (bool): 是否只读取响应头，响应体由调用方逐步读取并关闭响应
+
+        Returns:
+            tuple: (响应, 握手耗时)，复用连接时握手耗时为None
+        """
+        timing = {'handshake_seconds': 0.0, 'new_connection': False}
+        # 并发请求数可能远多于连接数，在池中等待空闲连接不计入超时
+        request = self.client.build_request("POST", self.api_url, headers=headers, content=payload,
+                                            timeout=httpx.Timeout(timeout, pool=None),
+                                            extensions={'trace': self._handshake_trace(timing)})
+        response = await self.client.send(request, stream=stream)
+        with self._lock:
+            self._http_stats['requests'] += 1
+            if timing['new_connection']:
+                self._http_stats['new_connections'] += 1
+                self._http_stats['handshake_seconds'] += timing['handshake_seconds']
+        return response, timing['handshake_seconds'] if timing['new_connection'] else None
+
+    @staticmethod
+    async def _read_stream(response, on_token=None):
+        """
+        逐行解析服务端事件流（SSE），把文本增量交给 on_token
+
+        Returns:
+            tuple: (完整文本, 用量统计, 收到第一个文本增量的时间戳)，服务端未返回用量时用量为None
+        """
+        parts = []
+        usage = None
+        first_token = None
+        async for line in response.aiter_lines():
+            # 空行分隔事件，冒号开头的是保活注释，只处理data行
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            # 开启include_usage时，最后一个事件的choices为空，只携带用量
+            usage = chunk.get("usage") or usage
+            for choice in chunk.get("choices") or []:
+                content = (choice.get("delta") or {}).get("content")
+                if not content:
+                    continue
+                if first_token is None:
+                    first_token = time.time()
+                parts.append(content)
+                if on_token is not None:
+                    on_token(content)
+        if usage is None and parts:
+            # 服务端未返回用量时，每个事件大致对应一个token
+            usage = {'completion_tokens': len(parts)}
+        return "".join(parts), usage, first_token
+
+    def _record_metrics(self, metrics, start_time, first_token, end_time, usage):
+        """
+        记录首个token耗时和生成速度
+
+        非流式请求的首个token随完整回答一起到达，首个token耗时即总耗时，生成速度按总耗时计算
+
+        Returns:
+            tuple: (首个token耗时, 输出token数, 每秒token数)
+        """
+        if first_token is None:
+            first_token = end_time
+            generate_start = start_time
+        else:
+            generate_start = first_token
+        ttft = first_token - start_time
+        generate_seconds = end_time - generate_start
+        tokens = (usage or {}).get('completion_tokens') or 0
+        tokens_per_second = tokens / generate_seconds if tokens and generate_seconds > 0 else 0.0
+        with self._lock:
+            self._summary_stats['summaries'] += 1
+            self._summary_stats['ttft_seconds'] += ttft
+            if tokens:
+                self._summary_stats['tokens'] += tokens
+                self._summary_stats['generate_seconds'] += generate_seconds
+        if metrics is not None:
+            metrics.update({
+                'summary_streamed': self.stream,
+                'summary_seconds': end_time - start_time,
+                'summary_ttft_seconds': ttft,
+                'summary_tokens': tokens,
+                'summary_tokens_per_second': tokens_per_second
+            })
+        return ttft, tokens, tokens_per_second
 
     def stop(self):
-        """设置停止标志，用于中断所有长时间运行的总结"""
+        """取消当前令牌，中断所有正在进行和排队中的总结"""
         with self._lock:
-            for flag in self._stop_flags.values():
-                flag[0] = True
+            token = self._cancel_token
+        token.cancel()
         print("收到停止信号，正在中断所有总结...")
 
     def reset_stop_flags(self):
-        """重置所有停止标志"""
+        """换用新的取消令牌，之后提交的总结不受之前 stop() 的影响"""
         with self._lock:
-            self._stop_flags.clear()
+            self._cancel_token = CancellationToken()
 
     def load_prompt_template(self, template_name):
         """
@@ -72,171 +365,303 @@ class DeepSeekSummarizer:
         )
         return prompt
 
-    def _summarize_worker(self, text, audio_title, template_name, stop_flag_id, result_container):
-        """总结工作线程，用于在后台执行总结以便快速停止"""
-        try:
-            prompt = self.create_prompt(text, audio_title, template_name)
-
-            payload = json.dumps({
-                "messages": [
-                    {
-                        "content": prompt,
-                        "role": "user"
-                    }
-                ],
-                "model": "deepseek-chat",
-                "frequency_penalty": 0,
-                "max_tokens": 4096,
-                "presence_penalty": 0,
-                "response_format": {
-                    "type": "text"
-                },
-                "stop": None,
-                "stream": False,
-                "stream_options": None,
-                "temperature": 1,
-                "top_p": 1,
-                "tools": None,
-                "tool_choice": "none",
-                "logprobs": False,
-                "top_logprobs": None
-            })
-
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Authorization': f'Bearer {self.api_key}'
-            }
-
-            print("正在调用DeepSeek API进行内容总结...")
-            start_time = time.time()
+    async def _summarize_text(self, text, audio_title, template_name, on_token=None, metrics=None):
+        """总结文本，提示词超出输入预算时先分段提取要点，直到合并的要点能放进所选模板"""
+        content = text
+        for map_round in range(MAX_MAP_ROUNDS + 1):
+            prompt = self.create_prompt(content, audio_title, template_name)
+            if self.max_input_tokens is None or map_round == MAX_MAP_ROUNDS:
+                break
+            # 长文本的分词较耗时，放到线程中执行，不阻塞其他请求
+            prompt_tokens = await asyncio.to_thread(count_tokens, prompt)
+            if prompt_tokens <= self.max_input_tokens:
+                break
+            print(f"提示词约{prompt_tokens}个token，超出{self.max_input_tokens}的预算，分段总结")
+            content = await self._map_chunks(content, audio_title, metrics)
+        return await self._complete(prompt, on_token, metrics)
 
-            # 使用合理的超时时间并增加重试机制
-            max_retries = 3
-            retry_count = 0
-            timeout = 120  # 初始超时时间设为120秒
+    async def _map_chunks(self, text, audio_title, metrics=None):
+        """
+        把文本按句子边界分段，并发提取各段要点
 
-            while retry_count < max_retries:
-                # 检查停止标志
-                with self._lock:
-                    stop_flag = self._stop_flags.get(stop_flag_id, [False])
-                    should_stop = stop_flag[0]
+        Returns:
+            str: 按顺序合并的各段要点
 
-                if should_stop:
-                    print("总结被用户中断")
-                    result_container['result'] = ""
-                    return
+        Raises:
+            SummaryRequestError: 任一段提取失败，不用缺段的要点做最终总结
+        """
+        chunks = await asyncio.to_thread(split_by_tokens, text, self.chunk_tokens)
+        print(f"分成{len(chunks)}段并发提取要点...")
+        start_time = time.time()
+        tasks = [
+            asyncio.ensure_future(self._map_chunk(chunk, audio_title, index, len(chunks)))
+            for index, chunk in enumerate(chunks, 1)
+        ]
+        try:
+            notes = await asyncio.gather(*tasks)
+        except BaseException:
+            # 任一段失败或整个总结被取消时，取消其余各段
+            for task in tasks:
+                task.cancel()
+            raise
+        map_seconds = time.time() - start_time
+        print(f"{len(chunks)}段要点提取完成，耗时{map_seconds:.2f}秒")
+        if metrics is not None:
+            metrics['summary_chunks'] = metrics.get('summary_chunks', 0) + len(chunks)
+            metrics['summary_map_seconds'] = metrics.get('summary_map_seconds', 0.0) + map_seconds
+        return "\n\n".join(f"【第{index}部分（共{len(notes)}部分）要点】\n{note}"
+                           for index, note in enumerate(notes, 1))
+
+    async def _map_chunk(self, chunk, audio_title, index, total):
+        """提取一段的要点，失败或回答为空时抛出 SummaryRequestError"""
+        prompt = CHUNK_PROMPT.format(audio_title=audio_title, index=index, total=total, content=chunk)
+        try:
+            note = await self._complete(prompt)
+        except SummaryRequestError as e:
+            raise SummaryRequestError(f"第{index}段（共{total}段）要点提取失败: {e}") from e
+        if not note or not note.strip():
+            raise SummaryRequestError(f"第{index}段（共{total}段）要点提取失败: 回答为空")
+        return note
+
+    async def _complete(self, prompt, on_token=None, metrics=None):
+        """
+        获取一次对话补全的回答，重试后仍失败时抛出 SummaryRequestError
 
+        依次尝试：合并到进行中的相同请求、读取缓存、发送新请求。
+        缓存命中或合并时没有流式过程，完整的回答一次交给 on_token；共享的请求失败时所有合并的调用方都抛出异常，
+        失败的回答不写入缓存。
+        """
+        key = ResultCache.make_key('summary', self.api_url, MODEL, TEMPERATURE, MAX_TOKENS, prompt)
+        shared = self._inflight.get(key)
+        if shared is None and self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                print("总结缓存命中，跳过API调用")
+                return self._reuse_result(cached, on_token, metrics, 'summary_cache_hit')
+            # 读取缓存期间可能已有相同的请求开始
+            shared = self._inflight.get(key)
+        if shared is not None:
+            with self._lock:
+                self._coalesced += 1
+            try:
+                summary = await self._wait_shared(shared)
+            except SummaryRequestError as e:
+                # 共享的请求失败时每个合并的调用方各自得到一个异常，按失败处理
+                raise SummaryRequestError(str(e)) from e
+            return self._reuse_result(summary, on_token, metrics, 'summary_coalesced')
+
+        shared = {'key': key, 'waiters': 0, 'on_token': on_token}
+        shared['task'] = asyncio.ensure_future(self._shared_completion(key, prompt, shared, metrics))
+        shared['task'].add_done_callback(lambda task: self._forget_shared(shared))
+        self._inflight[key] = shared
+        return await self._wait_shared(shared, owner=True)
+
+    def _forget_shared(self, shared):
+        """请求结束或被取消后，之后的相同请求不再合并到它"""
+        if self._inflight.get(shared['key']) is shared:
+            del self._inflight[shared['key']]
+
+    async def _wait_shared(self, shared, owner=False):
+        """等待共享的请求，所有等待者都被取消时才取消请求本身"""
+        shared['waiters'] += 1
+        try:
+            return await asyncio.shield(shared['task'])
+        finally:
+            shared['waiters'] -= 1
+            if owner:
+                # 发起者离开后不再向它的回调输出增量
+                shared['on_token'] = None
+            if shared['waiters'] == 0 and not shared['task'].done():
+                self._forget_shared(shared)
+                shared['task'].cancel()
+
+    async def _shared_completion(self, key, prompt, shared, metrics):
+        """在并发上限内发送请求，成功的回答写入缓存"""
+        def on_token(text):
+            if shared['on_token'] is not None:
+                shared['on_token'](text)
+
+        async with self._semaphore:
+            summary = await self._request_completion(prompt, on_token, metrics)
+        if summary and self.cache is not None:
+            await asyncio.to_thread(self.cache.put, key, summary)
+        return summary
+
+    @staticmethod
+    def _reuse_result(summary, on_token, metrics, flag):
+        """缓存命中或合并请求时，把完整的回答一次交给回调并记录来源"""
+        if summary and on_token is not None:
+            on_token(summary)
+        if metrics is not None:
+            metrics[flag] = True
+        return summary
+
+    async def _request_completion(self, prompt, on_token=None, metrics=None):
+        """发送请求并处理重试"""
+        payload = json.dumps({
+            "messages": [
+                {
+                    "content": prompt,
+                    "role": "user"
+                }
+            ],
+            "model": MODEL,
+            "frequency_penalty": 0,
+            "max_tokens": MAX_TOKENS,
+            "presence_penalty": 0,
+            "response_format": {
+                "type": "text"
+            },
+            "stop": None,
+            "stream": self.stream,
+            "stream_options": {"include_usage": True} if self.stream else None,
+            "temperature": TEMPERATURE,
+            "top_p": 1,
+            "tools": None,
+            "tool_choice": "none",
+            "logprobs": False,
+            "top_logprobs": None
+        })
+
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream' if self.stream else 'application/json',
+            'Authorization': f'Bearer {self.api_key}'
+        }
+
+        print("正在调用DeepSeek API进行内容总结...")
+        start_time = time.time()
+
+        # 使用合理的超时时间并增加重试机制
+        max_retries = 3
+        retry_count = 0
+        timeout = 120  # 初始超时时间设为120秒
+
+        while retry_count < max_retries:
+            try:
+                response, handshake_seconds = await self._post(payload, headers, timeout, self.stream)
                 try:
-                    response = requests.post(self.api_url, headers=headers, data=payload, timeout=timeout)
                     response.raise_for_status()
-
-                    # 检查是否在请求过程中被中断
-                    with self._lock:
-                        stop_flag = self._stop_flags.get(stop_flag_id, [False])
-                        should_stop = stop_flag[0]
-
-                    if should_stop:
-                        print("总结被用户中断")
-                        result_container['result'] = ""
-                        return
-
-                    print(f"API调用耗时: {time.time() - start_time:.2f}秒")
-
-                    result = response.json()
-                    result_container['result'] = result["choices"][0]["message"]["content"]
-                    return
-
-                except requests.exceptions.Timeout:
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        print(f"API调用超时，正在重试 ({retry_count}/{max_retries})...")
-                        # 检查停止标志
-                        with self._lock:
-                            stop_flag = self._stop_flags.get(stop_flag_id, [False])
-                            should_stop = stop_flag[0]
-
-                        if should_stop:
-                            print("总结被用户中断")
-                            result_container['result'] = ""
-                            return
-                        # 增加超时时间后重试
-                        timeout = 180
-                        continue
+                    if self.stream:
+                        summary, usage, first_token = await self._read_stream(response, on_token)
                     else:
-                        print(f"API调用超时，已重试{max_retries}次，放弃")
-                        result_container['error'] = "总结生成失败: API调用超时，请检查网络连接或稍后重试"
-                        return
-
-                except requests.exceptions.RequestException as e:
-                    retry_count += 1
-                    if retry_count < max_retries and isinstance(e, requests.exceptions.ConnectionError):
-                        print(f"API调用网络错误，正在重试 ({retry_count}/{max_retries})...")
-                        # 检查停止标志
-                        with self._lock:
-                            stop_flag = self._stop_flags.get(stop_flag_id, [False])
-                            should_stop = stop_flag[0]
-
-                        if should_stop:
-                            print("总结被用户中断")
-                            result_container['result'] = ""
-                            return
-                        time.sleep(2)  # 等待2秒后重试
-                        continue
-                    else:
-                        print(f"API调用失败: {e}")
-                        result_container['error'] = f"总结生成失败: {str(e)}"
-                        return
+                        result = response.json()
+                        summary = result["choices"][0]["message"]["content"]
+                        usage, first_token = result.get("usage"), None
+                finally:
+                    await response.aclose()
+                end_time = time.time()
+
+                if handshake_seconds is None:
+                    connection = "复用连接"
+                else:
+                    connection = f"新建连接，握手{handshake_seconds * 1000:.0f}毫秒"
+                ttft, tokens, tokens_per_second = self._record_metrics(metrics, start_time, first_token,
+                                                                       end_time, usage)
+                print(f"API调用耗时: {end_time - start_time:.2f}秒（{response.http_version}，{connection}），"
+                      f"首个token {ttft:.2f}秒，{tokens}个token，{tokens_per_second:.1f} token/秒")
+                return summary
+
+            except httpx.TimeoutException:
+                retry_count += 1
+                if retry_count < max_retries:
+                    print(f"API调用超时，正在重试 ({retry_count}/{max_retries})...")
+                    # 增加超时时间后重试
+                    timeout = 180
+                    continue
+                else:
+                    print(f"API调用超时，已重试{max_retries}次，放弃")
+                    raise SummaryRequestError("总结生成失败: API调用超时，请检查网络连接或稍后重试")
+
+            except httpx.HTTPError as e:
+                retry_count += 1
+                # 网络错误或服务端关闭了长连接时重试，连接池会换一个连接
+                if retry_count < max_retries and isinstance(e, (httpx.NetworkError, httpx.RemoteProtocolError)):
+                    # 流式输出中途断开时重新生成完整的回答，已输出的增量由调用方以最终结果为准
+                    print(f"API调用网络错误，正在重试 ({retry_count}/{max_retries})...")
+                    await asyncio.sleep(2)  # 等待2秒后重试
+                    continue
+                else:
+                    print(f"API调用失败: {e}")
+                    raise SummaryRequestError(f"总结生成失败: {str(e)}")
+
+    async def _summarize_async(self, text, audio_title, template_name, tokens, on_token=None, metrics=None):
+        """
+        在事件循环上执行一次总结，任一令牌被取消时立即中断
 
+        Returns:
+            str: 总结结果，被取消时返回空字符串
+
+        Raises:
+            SummaryRequestError: 请求重试后仍失败或总结过程中出错
+        """
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+
+        def cancel():
+            # 令牌在其他线程中被取消，转到事件循环线程中取消任务
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(task.cancel)
+
+        for token in tokens:
+            token.add_callback(cancel)
+        try:
+            return await self._summarize_text(text, audio_title, template_name, on_token, metrics) or ""
+        except asyncio.CancelledError:
+            print("总结被用户中断")
+            return ""
+        except SummaryRequestError:
+            raise
         except Exception as e:
+            # 错误信息不能当作总结保存，统一以 SummaryRequestError 交给调用方按失败处理
             print(f"总结过程中出错: {e}")
-            result_container['error'] = str(e)
+            raise SummaryRequestError(f"总结生成失败: {e}") from e
         finally:
-            # 清理停止标志
-            with self._lock:
-                if stop_flag_id in self._stop_flags:
-                    del self._stop_flags[stop_flag_id]
+            for token in tokens:
+                token.remove_callback(cancel)
 
-    def summarize(self, text, audio_title="音频内容", template_name="audio_content_analysis"):
+    def submit(self, text, audio_title="音频内容", template_name="audio_content_analysis", cancel_token=None,
+               on_token=None, metrics=None):
         """
-        使用DeepSeek API进行内容总结
+        提交总结请求，立即返回
 
         Args:
             text (str): 需要总结的文本
             audio_title (str): 音频标题
             template_name (str): 使用的模板名称
+            cancel_token (CancellationToken): 可选，取消单个请求的令牌；stop() 会取消所有请求
+            on_token (callable): 可选，流式模式下每收到一段文本调用 on_token(文本)，在事件循环线程中执行，
+                不应阻塞
+            metrics (dict): 可选，成功时写入 summary_ttft_seconds、summary_tokens、summary_tokens_per_second 等
 
         Returns:
-            str: 总结结果
+            concurrent.futures.Future: 结果为总结文本，被取消时为空字符串；出错时 result() 抛出 SummaryRequestError
         """
-        # 为此总结任务创建独立的停止标志ID和结果容器
-        stop_flag_id = uuid.uuid4()
-        result_container = {'result': None, 'error': None}
-
-        # 注册停止标志
+        loop = self._ensure_loop()
         with self._lock:
-            self._stop_flags[stop_flag_id] = [False]
+            tokens = [self._cancel_token]
+        if cancel_token is not None:
+            tokens.append(cancel_token)
+        return asyncio.run_coroutine_threadsafe(
+            self._summarize_async(text, audio_title, template_name, tokens, on_token, metrics), loop)
+
+    def summarize(self, text, audio_title="音频内容", template_name="audio_content_analysis", cancel_token=None,
+                  on_token=None, metrics=None):
+        """
+        使用DeepSeek API进行内容总结，阻塞直到得到结果
 
-        # 创建并启动总结线程
-        summarize_thread = threading.Thread(
-            target=self._summarize_worker,
-            args=(text, audio_title, template_name, stop_flag_id, result_container),
-            daemon=True
-        )
-        summarize_thread.start()
+        Args:
+            text (str): 需要总结的文本
+            audio_title (str): 音频标题
+            template_name (str): 使用的模板名称
+            cancel_token (CancellationToken): 可选，取消本次总结的令牌
+            on_token (callable): 可选，流式模式下接收文本增量的回调
+            metrics (dict): 可选，写入本次请求的首个token耗时和生成速度
 
-        # 等待线程完成（使用轮询方式，可以被 stop() 中断）
-        while True:
-            if not summarize_thread.is_alive():
-                break
-            # 检查停止标志
-            with self._lock:
-                should_stop = self._stop_flags.get(stop_flag_id, [False])[0]
-            if should_stop:
-                return ""
-            time.sleep(0.1)
-
-        # 返回结果或抛出异常
-        if result_container['error']:
-            return result_container['error']
-        return result_container['result'] or ""
+        Returns:
+            str: 总结结果
+
+        Raises:
+            SummaryRequestError: 请求重试后仍失败或总结过程中出错
+        """
+        return self.submit(text, audio_title, template_name, cancel_token, on_token, metrics).result()
@@ -0,0 +1,311 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import torch
+import whisper
+
+# 支持的计算精度：fp16仅用于GPU，int8为线性层动态量化，仅用于CPU
+COMPUTE_TYPES = ("fp32", "fp16", "bf16", "int8")
+
+
+class ModelRegistry:
+    """进程级Whisper模型注册表
+
+    按 (模型名称, 设备, 精度) 缓存已加载的模型，并对使用者进行引用计数。
+    引用计数归零的模型在空闲超时或超出内存预算时按LRU顺序被淘汰，
+    同一进程内重复的转录任务因此不会重复支付模型加载的开销。
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, idle_timeout=600, memory_budget_mb=None, quantized_cache_dir=None):
+        """
+        初始化模型注册表
+
+        Args:
+            idle_timeout (float): 空闲模型的保留时间（秒），None表示不按时间淘汰
+            memory_budget_mb (float): 模型占用内存上限（MB），None表示不限制
+            quantized_cache_dir (str): 量化后模型的保存目录，None表示每次启动重新量化
+        """
+        self.idle_timeout = idle_timeout
+        self.memory_budget_mb = memory_budget_mb
+        self.quantized_cache_dir = quantized_cache_dir
+        self._lock = threading.RLock()
+        # {key: {'model': 模型, 'refcount': 引用数, 'last_used': 时间, 'size_mb': 内存}}
+        self._entries = OrderedDict()
+        # 正在加载中的模型，避免多个线程同时加载同一个模型
+        self._loading = {}  # {key: threading.Event}
+        self._janitor = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def instance(cls):
+        """获取进程级共享的注册表实例"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def configure(self, idle_timeout=None, memory_budget_mb=None, quantized_cache_dir=None):
+        """
+        更新淘汰策略
+
+        Args:
+            idle_timeout (float): 空闲模型的保留时间（秒）
+            memory_budget_mb (float): 模型占用内存上限（MB）
+            quantized_cache_dir (str): 量化后模型的保存目录
+        """
+        with self._lock:
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+            if memory_budget_mb is not None:
+                self.memory_budget_mb = memory_budget_mb
+            if quantized_cache_dir is not None:
+                self.quantized_cache_dir = quantized_cache_dir
+            self._evict()
+
+    @staticmethod
+    def make_key(model_name, device, precision):
+        """生成注册表键"""
+        return (model_name, str(device), precision)
+
+    @staticmethod
+    def _estimate_size_mb(model):
+        """估算模型参数和缓冲区占用的内存（MB），包括量化线性层的打包权重"""
+        total = 0
+        for tensor in list(model.parameters()) + list(model.buffers()):
+            total += tensor.numel() * tensor.element_size()
+        for module in model.modules():
+            if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+                weight, bias = module._weight_bias()
+                total += weight.numel() * weight.element_size()
+                if bias is not None:
+                    total += bias.numel() * bias.element_size()
+        return total / (1024 * 1024)
+
+    @staticmethod
+    def _quantize_int8(model):
+        """
+        对线性层做int8动态量化
+
+        Whisper自定义的Linear子类不会被quantize_dynamic识别，先替换为同权重的nn.Linear。
+        """
+        for module in list(model.modules()):
+            for name, child in list(module.named_children()):
+                if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                    linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                    linear.weight = child.weight
+                    if child.bias is not None:
+                        linear.bias = child.bias
+                    setattr(module, name, linear)
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def _load(self, model_name, device, precision):
+        """实际加载模型，int8模型优先从量化缓存读取"""
+        if precision != "int8":
+            return whisper.load_model(model_name, device=device)
+
+        cache_file = None
+        if self.quantized_cache_dir:
+            cache_file = os.path.join(self.quantized_cache_dir, f"{model_name}-int8.pt")
+            if os.path.exists(cache_file):
+                print(f"读取已量化的模型: {cache_file}")
+                return torch.load(cache_file, map_location="cpu", weights_only=False)
+
+        model = self._quantize_int8(whisper.load_model(model_name, device="cpu"))
+        if cache_file:
+            os.makedirs(self.quantized_cache_dir, exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            torch.save(model, tmp_file)
+            os.replace(tmp_file, cache_file)
+            print(f"量化模型已保存: {cache_file}")
+        return model
+
+    def acquire(self, model_name, device, precision, status_callback=None):
+        """
+        获取模型，必要时加载，并增加引用计数
+
+        Args:
+            model_name (str): 模型名称
+            device (str): 设备，如 cpu 或 cuda
+            precision (str): 精度标识，如 fp32 或 fp16
+            status_callback (callable): 状态回调函数，接收状态文本作为参数
+
+        Returns:
+            whisper.model.Whisper: 已加载的模型
+        """
+        key = self.make_key(model_name, device, precision)
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry['refcount'] += 1
+                    entry['last_used'] = time.time()
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    print(f"复用已加载的模型: {model_name} ({device}, {precision})")
+                    return entry['model']
+
+                loading_event = self._loading.get(key)
+                if loading_event is None:
+                    # 由当前线程负责加载
+                    loading_event = threading.Event()
+                    self._loading[key] = loading_event
+                    self.misses += 1
+                    break
+
+            # 其他线程正在加载同一个模型，等待其完成后重新查找
+            loading_event.wait()
+
+        try:
+            print(f"正在加载模型: {model_name}")
+            if status_callback:
+                status_callback(f"正在加载Whisper模型({model_name})...")
+            start_time = time.time()
+            model = self._load(model_name, device, precision)
+            load_time = time.time() - start_time
+            print(f"模型加载耗时: {load_time:.2f}秒")
+            if status_callback:
+                status_callback(f"模型加载完成，耗时{load_time:.2f}秒")
+
+            with self._lock:
+                self._entries[key] = {
+                    'model': model,
+                    'refcount': 1,
+                    'last_used': time.time(),
+                    'size_mb': self._estimate_size_mb(model),
+                    'load_time': load_time
+                }
+                self._evict()
+                self._ensure_janitor()
+            return model
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            loading_event.set()
+
+    def release(self, model_name, device, precision):
+        """
+        释放一次对模型的引用
+
+        Args:
+            model_name (str): 模型名称
+            device (str): 设备
+            precision (str): 精度标识
+        """
+        key = self.make_key(model_name, device, precision)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry['refcount'] = max(0, entry['refcount'] - 1)
+            entry['last_used'] = time.time()
+            self._evict()
+
+    def _evict(self):
+        """淘汰空闲超时或超出内存预算的模型（调用方需持有锁）"""
+        now = time.time()
+
+        if self.idle_timeout is not None:
+            for key in list(self._entries.keys()):
+                entry = self._entries[key]
+                if entry['refcount'] == 0 and now - entry['last_used'] >= self.idle_timeout:
+                    self._remove(key, "空闲超时")
+
+        if self.memory_budget_mb is not None:
+            # OrderedDict按最近使用排序，从最久未使用的开始淘汰
+            for key in list(self._entries.keys()):
+                if self.memory_usage_mb() <= self.memory_budget_mb:
+                    break
+                if self._entries[key]['refcount'] == 0:
+                    self._remove(key, "超出内存预算")
+
+    def _remove(self, key, reason):
+        """从注册表中移除模型（调用方需持有锁）"""
+        entry = self._entries.pop(key)
+        print(f"卸载模型 {key[0]} ({key[1]}, {key[2]})，原因: {reason}")
+        del entry['model']
+        if key[1].startswith("cuda"):
+            import torch
+            torch.cuda.empty_cache()
+
+    def _ensure_janitor(self):
+        """启动后台线程定期清理空闲模型（调用方需持有锁）"""
+        if self.idle_timeout is None or (self._janitor and self._janitor.is_alive()):
+            return
+
+        def janitor():
+            while True:
+                interval = self.idle_timeout
+                time.sleep(max(1.0, min(60.0, (interval or 60.0) / 2)))
+                with self._lock:
+                    self._evict()
+                    if not self._entries:
+                        self._janitor = None
+                        return
+
+        self._janitor = threading.Thread(target=janitor, daemon=True)
+        self._janitor.start()
+
+    def model_info(self, model_name, device, precision):
+        """
+        获取已加载模型的加载耗时和内存占用
+
+        Returns:
+            dict: {'load_time': 秒, 'size_mb': MB}，模型未加载时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(self.make_key(model_name, device, precision))
+            if entry is None:
+                return None
+            return {'load_time': entry['load_time'], 'size_mb': entry['size_mb']}
+
+    def memory_usage_mb(self):
+        """当前已缓存模型的内存估算总和（MB）"""
+        with self._lock:
+            return sum(entry['size_mb'] for entry in self._entries.values())
+
+    def is_loaded(self, model_name, device, precision):
+        """检查模型是否已在注册表中"""
+        with self._lock:
+            return self.make_key(model_name, device, precision) in self._entries
+
+    def clear(self):
+        """卸载所有未被引用的模型"""
+        with self._lock:
+            for key in list(self._entries.keys()):
+                if self._entries[key]['refcount'] == 0:
+                    self._remove(key, "手动清理")
+
+    def stats(self):
+        """
+        获取注册表统计信息
+
+        Returns:
+            dict: 命中/未命中次数、内存占用和各模型的引用计数
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'memory_mb': self.memory_usage_mb(),
+                'models': {
+                    f"{key[0]}:{key[1]}:{key[2]}": {
+                        'refcount': entry['refcount'],
+                        'size_mb': round(entry['size_mb'], 1),
+                        'idle_seconds': round(time.time() - entry['last_used'], 1)
+                    }
+                    for key, entry in self._entries.items()
+                }
+            }
+
+
+def get_model_registry():
+    """获取进程级共享的模型注册表"""
+    return ModelRegistry.instance()
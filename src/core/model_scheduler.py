@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta
+
+# 按准确度从低到高排列的模型
+MODEL_ORDER = ('tiny', 'base', 'small', 'medium', 'large')
+
+# 尚未实测时使用的实时率(RTF)初始估计，按CPU上fp32推理的经验值偏保守地设定
+DEFAULT_RTF = {'tiny': 0.05, 'base': 0.1, 'small': 0.3, 'medium': 0.8, 'large': 1.6}
+
+# 每个文件除转录外的固定开销（总结、写文件）的初始估计（秒）
+DEFAULT_OVERHEAD = 30.0
+
+
+def parse_deadline(value):
+    """
+    解析截止时间
+
+    Args:
+        value (str): 当天的时刻，如 07:00；已过去时表示次日的该时刻
+
+    Returns:
+        float: 截止时间的时间戳
+    """
+    clock = datetime.strptime(value.strip(), "%H:%M")
+    now = datetime.now()
+    deadline = now.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+    if deadline <= now:
+        deadline += timedelta(days=1)
+    return deadline.timestamp()
+
+
+class DeadlineScheduler:
+    """截止时间模式下为每个文件选择模型
+
+    每个文件的转录耗时按 时长 × 模型实时率 估算，再加上每个文件的固定开销。剩余时间（乘以并发数，
+    减去已分配但尚未完成的文件的预计耗时）按时长比例分给当前文件，在分到的时间内选择最准确的模型；
+    所有模型都超出时使用最快的模型。文件完成后用实测的耗时在线更新该模型的实时率和固定开销，
+    实时率保存到文件中，下次运行直接使用上次的实测值。
+    """
+
+    def __init__(self, deadline, durations, models=MODEL_ORDER, parallelism=1, precision=None,
+                 rtf_file=None, smoothing=0.3):
+        """
+        初始化调度器
+
+        Args:
+            deadline (float): 截止时间的时间戳
+            durations (dict): 音频文件路径 -> 时长（秒），探测失败的文件为None
+            models (iterable): 候选模型，按准确度从低到高排序
+            parallelism (int): 同时转录的文件数
+            precision (str): 计算精度，实时率按模型和精度分别记录
+            rtf_file (str): 实测实时率的保存文件，None表示不保存
+            smoothing (float): 在线更新时新测量值的权重
+        """
+        self.deadline = deadline
+        self.models = [model for model in MODEL_ORDER if model in models]
+        if not self.models:
+            raise ValueError(f"没有可用的候选模型，可选: {', '.join(MODEL_ORDER)}")
+        self.parallelism = max(1, parallelism)
+        self.precision = precision or 'auto'
+        self.rtf_file = rtf_file
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+
+        known = [duration for duration in durations.values() if duration]
+        # 时长未知的文件按已知文件的平均时长估计
+        self._default_duration = sum(known) / len(known) if known else 600.0
+        self._durations = {path: duration or self._default_duration for path, duration in durations.items()}
+        self._pending_duration = sum(self._durations.values())
+        self._reserved = {}
+        self._next_id = 0
+        self.overhead = DEFAULT_OVERHEAD
+        self.rtf = {model: DEFAULT_RTF[model] for model in self.models}
+        self._load_rtf()
+        self.choices = {model: 0 for model in self.models}
+        self.over_budget = 0
+
+    def _rtf_key(self, model):
+        return f"{model}:{self.precision}"
+
+    def _load_rtf(self):
+        """读取之前运行中实测的实时率"""
+        if not self.rtf_file:
+            return
+        try:
+            with open(self.rtf_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for model in self.models:
+            value = saved.get(self._rtf_key(model))
+            if isinstance(value, (int, float)) and value > 0:
+                self.rtf[model] = float(value)
+        if isinstance(saved.get('overhead'), (int, float)):
+            self.overhead = float(saved['overhead'])
+
+    def _save_rtf(self):
+        """原子写入实测的实时率，保留其他精度的记录"""
+        if not self.rtf_file:
+            return
+        try:
+            with open(self.rtf_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        with self._lock:
+            saved.update({self._rtf_key(model): rtf for model, rtf in self.rtf.items()})
+            saved['overhead'] = self.overhead
+
+        rtf_dir = os.path.dirname(self.rtf_file)
+        if rtf_dir:
+            os.makedirs(rtf_dir, exist_ok=True)
+        tmp_file = f"{self.rtf_file}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.rtf_file)
+        except OSError as e:
+            print(f"保存模型实时率失败: {e}")
+
+    def remaining_seconds(self):
+        """距截止时间的剩余秒数"""
+        return max(0.0, self.deadline - time.time())
+
+    def choose(self, audio_file):
+        """
+        为文件选择模型，并为其预留预计耗时
+
+        Args:
+            audio_file (str): 音频文件路径
+
+        Returns:
+            dict: 调度决定，包含 model, duration, estimate, budget，完成后传给 complete()
+        """
+        with self._lock:
+            duration = self._durations.pop(audio_file, self._default_duration)
+            available = self.remaining_seconds() * self.parallelism - sum(self._reserved.values())
+            # 按时长比例分配剩余时间，空出来的时间在后续文件选择时自然分给它们
+            share = max(0.0, available) * duration / max(duration, self._pending_duration)
+            self._pending_duration = max(0.0, self._pending_duration - duration)
+
+            model = self.models[0]
+            for candidate in self.models:
+                if duration * self.rtf[candidate] + self.overhead <= share:
+                    model = candidate
+            estimate = duration * self.rtf[model] + self.overhead
+            if estimate > share:
+                self.over_budget += 1
+            self.choices[model] += 1
+
+            decision_id = self._next_id
+            self._next_id += 1
+            self._reserved[decision_id] = estimate
+
+        print(f"{os.path.basename(audio_file)}: 时长{duration / 60:.1f}分钟，分配{share / 60:.1f}分钟，"
+              f"选择模型 {model}（预计{estimate / 60:.1f}分钟）")
+        return {'id': decision_id, 'model': model, 'duration': duration, 'estimate': estimate, 'budget': share}
+
+    def complete(self, decision, stats=None, total_seconds=None):
+        """
+        文件处理结束，释放预留时间并用实测耗时更新估计
+
+        Args:
+            decision (dict): choose() 返回的调度决定
+            stats (dict): 转录统计信息，失败或被停止时为None
+            total_seconds (float): 处理该文件的总耗时（秒）
+        """
+        updated = False
+        with self._lock:
+            self._reserved.pop(decision['id'], None)
+            if stats is None:
+                return
+            transcribe_seconds = stats.get('transcribe_seconds')
+            # 缓存命中、从检查点继续的文件不能代表模型的速度
+            measurable = (transcribe_seconds and not stats.get('transcript_cache_hit')
+                          and 'resumed_from' not in stats and decision['duration'] > 0)
+            if measurable:
+                model = decision['model']
+                measured = transcribe_seconds / decision['duration']
+                self.rtf[model] += self.smoothing * (measured - self.rtf[model])
+                updated = True
+                if total_seconds is not None:
+                    overhead = max(0.0, total_seconds - transcribe_seconds)
+                    self.overhead += self.smoothing * (overhead - self.overhead)
+        if updated:
+            self._save_rtf()
+
+    def report(self):
+        """输出各模型的选择次数和当前的实时率估计"""
+        print("\n=== 截止时间调度 ===")
+        deadline = datetime.fromtimestamp(self.deadline).strftime('%Y-%m-%d %H:%M')
+        remaining = self.deadline - time.time()
+        if remaining >= 0:
+            print(f"截止时间 {deadline}，剩余{remaining / 60:.1f}分钟")
+        else:
+            print(f"截止时间 {deadline}，已超出{-remaining / 60:.1f}分钟")
+        for model in self.models:
+            print(f"  {model:<8}选择{self.choices[model]}次，实时率(RTF) {self.rtf[model]:.3f}")
+        if self.over_budget:
+            print(f"  {self.over_budget}个文件即使使用最快的模型也超出了分配的时间")
@@ -0,0 +1,107 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Prefetcher:
+    """后台预取队列
+
+    由一个小的线程池提前为后续的若干个文件执行准备工作（读取、ffmpeg解码、计算log-mel特征），
+    在模型转录当前文件的同时把结果放入有界缓冲区，转录线程取下一个文件时通常无需等待。
+    ffmpeg子进程和PyTorch的特征计算都会释放GIL，线程池足以让它们与模型推理重叠。
+    """
+
+    def __init__(self, items, prepare, depth=2, workers=2):
+        """
+        初始化预取队列
+
+        Args:
+            items (iterable): 待处理的条目，可以是惰性的迭代器（如从任务队列中取文件的生成器）
+            prepare (callable): 准备函数，接收一个条目，返回准备好的结果
+            depth (int): 最多提前准备的条目数，即缓冲区大小
+            workers (int): 准备线程数
+        """
+        self._items = iter(items)
+        self._prepare = prepare
+        self.depth = max(1, depth)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="prefetch")
+        self._pending = deque()  # [(条目, future)]
+        self._lock = threading.Lock()
+        self._exhausted = False
+        # 指标
+        self.count = 0
+        self.stall_seconds = 0.0
+        self.last_stall_seconds = 0.0
+        self.last_depth = 0
+        self.prepare_seconds = 0.0
+        self._depth_total = 0
+
+    def _timed_prepare(self, item):
+        start_time = time.time()
+        try:
+            return self._prepare(item)
+        finally:
+            with self._lock:
+                self.prepare_seconds += time.time() - start_time
+
+    def _fill(self):
+        """把缓冲区补满"""
+        while not self._exhausted and len(self._pending) < self.depth:
+            try:
+                item = next(self._items)
+            except StopIteration:
+                self._exhausted = True
+                break
+            self._pending.append((item, self._executor.submit(self._timed_prepare, item)))
+
+    def __iter__(self):
+        """
+        按原顺序产出准备好的条目
+
+        Yields:
+            tuple: (条目, 准备结果, 异常)；准备失败时结果为None，异常交由调用方按单个文件处理
+        """
+        try:
+            self._fill()
+            while self._pending:
+                item, future = self._pending.popleft()
+                # 取用时缓冲区中已准备好的条目数
+                self.last_depth = sum(1 for _, f in self._pending if f.done()) + int(future.done())
+                self._depth_total += self.last_depth
+
+                wait_start = time.time()
+                try:
+                    result, error = future.result(), None
+                except Exception as e:
+                    result, error = None, e
+                self.last_stall_seconds = time.time() - wait_start
+                self.stall_seconds += self.last_stall_seconds
+                self.count += 1
+
+                # 在调用方处理当前条目之前提交下一个条目的准备工作
+                self._fill()
+                yield item, result, error
+        finally:
+            self.close()
+
+    def close(self):
+        """取消尚未开始的准备工作"""
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        """
+        获取预取指标
+
+        Returns:
+            dict: 条目数、转录线程累计等待时间、平均缓冲深度和累计准备耗时
+        """
+        return {
+            'items': self.count,
+            'stall_seconds': round(self.stall_seconds, 2),
+            'avg_queue_depth': round(self._depth_total / self.count, 2) if self.count else 0.0,
+            'prepare_seconds': round(self.prepare_seconds, 2)
+        }
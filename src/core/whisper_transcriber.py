@@ -2,189 +2,802 @@ import whisper
 import torch
 import time
 import os
-import librosa
 import threading
+import dataclasses
+
+from src.core.cancellation import CancellationToken
+from src.core.model_registry import get_model_registry, COMPUTE_TYPES
+from src.core.chunked_transcriber import ChunkedTranscriber
+from src.core.batch_decoder import BatchDecoder
+from src.core.cascade_refiner import CascadeRefiner
+from src.core.window_decoder import WindowDecoder, DEFAULT_TEMPERATURES, merge_decode_counters
+from src.utils.audio_cache import AudioCache
+from src.utils.audio_metadata import get_audio_metadata
+from src.utils.checkpoint import CheckpointStore
+from src.utils.file_utils import FileUtils
+from src.utils.result_cache import ResultCache
+from src.utils.segment_store import SegmentStore
+from src.utils.vad_utils import EnergyVAD, SpeechTimeline, SAMPLE_RATE
 
 class WhisperTranscriber:
     """Whisper语音识别类"""
 
-    def __init__(self, model_name="small"):
+    # 引导模型输出简体中文的初始提示词
+    INITIAL_PROMPT = "以下是简体中文："
+
+    def __init__(self, model_name="small", use_vad=False, long_audio_threshold=1800, chunk_seconds=600,
+                 chunk_overlap=5, chunk_workers=None, audio_cache_dir=None, audio_cache_size_mb=4096,
+                 cache_mel=False, metadata_index=None, transcript_cache_dir=None, transcript_cache_size_mb=256,
+                 compute_type=None, quantized_model_dir=None, checkpoint_dir=None, checkpoint_windows=10,
+                 cascade_model=None, cascade_logprob_threshold=-0.7, cascade_compression_ratio_threshold=2.0,
+                 cascade_no_speech_threshold=0.5, max_fallbacks=None, repetition_limit=None):
         """
         初始化Whisper模型
 
         Args:
             model_name (str): 模型名称，可选: tiny, base, small, medium, large
+            use_vad (bool): 是否在解码前用语音活动检测跳过静音和非语音片段
+            long_audio_threshold (float): 超过该时长（秒）的音频自动切块并行转录，None表示禁用
+            chunk_seconds (float): 长音频模式下的分块长度（秒）
+            chunk_overlap (float): 长音频模式下相邻分块的重叠长度（秒）
+            chunk_workers (int): 长音频模式下的工作进程数，默认为CPU核心数的一半
+            audio_cache_dir (str): 解码音频缓存目录，None表示不缓存
+            audio_cache_size_mb (float): 解码音频缓存的大小上限（MB）
+            cache_mel (bool): 是否同时缓存log-mel特征
+            metadata_index (str): 音频元数据旁路索引文件，跨运行复用时长等探测结果
+            transcript_cache_dir (str): 转录结果缓存目录，None表示不缓存
+            transcript_cache_size_mb (float): 转录结果缓存的大小上限（MB）
+            compute_type (str): 计算精度 fp32/fp16/bf16/int8，默认GPU上为fp16、CPU上为fp32；
+                int8为线性层动态量化，只能在CPU上运行
+            quantized_model_dir (str): 量化模型的保存目录，量化只需进行一次
+            checkpoint_dir (str): 转录检查点目录，None表示不保存检查点
+            checkpoint_windows (int): 每解码多少个30秒窗口写一次检查点，长音频模式下每个分块完成时写入
+            cascade_model (str): 级联转录的大模型，None表示不使用级联；启用后model_name作为草稿模型转录全文，
+                低置信度的窗口再由该模型重新解码，长音频分块模式不使用级联
+            cascade_logprob_threshold (float): 平均对数概率低于此值的窗口升级到大模型
+            cascade_compression_ratio_threshold (float): 压缩比高于此值的窗口升级到大模型
+            cascade_no_speech_threshold (float): 无语音概率高于此值的窗口升级到大模型
+            max_fallbacks (int): 每个窗口温度回退最多重新解码的次数，None表示尝试完整的温度序列（最多6次解码）
+            repetition_limit (int): 解码中同一段文本连续重复该次数时中止并跳过该窗口，None表示不检测
         """
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        if compute_type is None:
+            compute_type = "fp16" if self.device == "cuda" else "fp32"
+        if compute_type not in COMPUTE_TYPES:
+            raise ValueError(f"不支持的计算精度: {compute_type}，可选: {', '.join(COMPUTE_TYPES)}")
+        if compute_type == "int8":
+            self.device = "cpu"
+        elif compute_type == "fp16" and self.device == "cpu":
+            print("CPU不支持fp16推理，改用fp32")
+            compute_type = "fp32"
+        self.precision = compute_type
+        if quantized_model_dir:
+            get_model_registry().configure(quantized_cache_dir=quantized_model_dir)
         self.model_name = model_name
         self.model = None
-        self._stop_flag = False
-        self._transcribe_thread = None
-        self._transcribe_result = None
-        self._transcribe_error = None
-        print(f"设备设置为使用 {self.device}")
+        self._model_lock = threading.Lock()
+        self.use_vad = use_vad
+        self.vad = EnergyVAD() if use_vad else None
+        self.long_audio_threshold = long_audio_threshold
+        self.chunk_seconds = chunk_seconds
+        self.chunk_overlap = chunk_overlap
+        self.chunk_workers = chunk_workers
+        self._chunked_transcriber = None
+        self.audio_cache = AudioCache(audio_cache_dir, audio_cache_size_mb, cache_mel) if audio_cache_dir else None
+        self.transcript_cache = (ResultCache(transcript_cache_dir, transcript_cache_size_mb)
+                                 if transcript_cache_dir else None)
+        if metadata_index:
+            get_audio_metadata().configure(metadata_index)
+        self.max_fallbacks = max_fallbacks
+        self.repetition_limit = repetition_limit
+        self.checkpoints = CheckpointStore(checkpoint_dir) if checkpoint_dir else None
+        self.checkpoint_windows = max(1, checkpoint_windows)
+        self.cascade_model = cascade_model if cascade_model and cascade_model != model_name else None
+        self.cascade_thresholds = {
+            'logprob_threshold': cascade_logprob_threshold,
+            'compression_ratio_threshold': cascade_compression_ratio_threshold,
+            'no_speech_threshold': cascade_no_speech_threshold
+        }
+        self._cascade_model = None
+        # 大模型每个窗口的平均耗时，某个文件没有升级的窗口时用于估算加速比
+        self._cascade_window_seconds = None
+        self.last_stats = {}
+        # 最近一次转录的片段，保存在紧凑的数组存储中，可随时导出字幕
+        self.last_segments = SegmentStore()
+        # 转录器自身的取消令牌，调用方也可以为每次转录传入单独的令牌
+        self.cancel_token = CancellationToken()
+        print(f"设备设置为使用 {self.device}，计算精度: {self.precision}")
     
     def stop(self):
-        """设置停止标志，用于中断长时间运行的转录"""
-        self._stop_flag = True
+        """请求停止，正在进行的转录在当前窗口解码完后中断"""
+        self.cancel_token.cancel()
         print("收到停止信号，正在中断转录...")
     
     def reset_stop_flag(self):
         """重置停止标志"""
-        self._stop_flag = False
+        self.cancel_token.reset()
+
+    def _should_stop(self, cancel_token=None):
+        """合并调用方传入的令牌和转录器自身的令牌，返回在窗口之间调用的检查函数"""
+        if cancel_token is None:
+            return self.cancel_token.is_cancelled
+        return lambda: cancel_token.is_cancelled() or self.cancel_token.is_cancelled()
     
     def load_model(self, status_callback=None):
-        """加载Whisper模型"""
-        if self.model is None:
-            print(f"正在加载模型: {self.model_name}")
-            if status_callback:
-                status_callback(f"正在加载Whisper模型({self.model_name})...")
-            start_time = time.time()
-            self.model = whisper.load_model(self.model_name, device=self.device)
-            print(f"模型加载耗时: {time.time() - start_time:.2f}秒")
-            if status_callback:
-                status_callback(f"模型加载完成，耗时{time.time() - start_time:.2f}秒")
-        return self.model
+        """从进程级模型注册表获取Whisper模型"""
+        # 预取线程和转录线程可能同时调用，只能持有一次引用
+        with self._model_lock:
+            if self.model is None:
+                self.model = get_model_registry().acquire(
+                    self.model_name, self.device, self.precision, status_callback
+                )
+            return self.model
+
+    def _load_cascade_model(self, status_callback=None):
+        """从进程级模型注册表获取级联转录的大模型"""
+        with self._model_lock:
+            if self._cascade_model is None:
+                self._cascade_model = get_model_registry().acquire(
+                    self.cascade_model, self.device, self.precision, status_callback
+                )
+            return self._cascade_model
+
+    def _create_refiner(self, audio, language, status_callback=None):
+        """为一个音频文件创建级联重解码器，未启用级联时返回None"""
+        if self.cascade_model is None:
+            return None
+        model = self._load_cascade_model(status_callback)
+        return CascadeRefiner(model, audio, language, self._decoding_params(), **self.cascade_thresholds)
+
+    def _record_cascade(self, refiner, stats, decode_seconds):
+        """记录级联转录的升级比例和加速比"""
+        stats['cascade_model'] = self.cascade_model
+        window_seconds = refiner.record_stats(stats, decode_seconds, self._cascade_window_seconds)
+        if window_seconds is not None:
+            self._cascade_window_seconds = window_seconds
+
+    def warm_up(self, language="zh", status_callback=None):
+        """
+        加载模型并对一个静音窗口做一次推理，预先完成计算内核和内存的初始化
+
+        Args:
+            language (str): 语言代码
+            status_callback (callable): 状态回调函数
+
+        Returns:
+            float: 预热推理的耗时（秒），不含模型加载
+        """
+        model = self.load_model(status_callback)
+        start_time = time.time()
+        decoder = self._create_decoder(model, language)
+        mel = whisper.log_mel_spectrogram(torch.zeros(whisper.audio.N_SAMPLES), model.dims.n_mels)
+        mel = mel.to(model.device).to(decoder.dtype)
+        # 只需走通编码器和少量解码步骤
+        options = dataclasses.replace(decoder._decoding_options(0.0, []), sample_len=8)
+        with torch.no_grad():
+            decoder._decode(decoder._encode(mel), options)
+        return time.time() - start_time
+
+    def close(self):
+        """释放对共享模型的引用，空闲模型由注册表按策略卸载"""
+        if self._chunked_transcriber is not None:
+            self._chunked_transcriber.close()
+            self._chunked_transcriber = None
+        if self.model is not None:
+            self.model = None
+            get_model_registry().release(self.model_name, self.device, self.precision)
+        if self._cascade_model is not None:
+            self._cascade_model = None
+            get_model_registry().release(self.cascade_model, self.device, self.precision)
+        get_audio_metadata().save()
     
-    def transcribe(self, audio_file, language="zh", verbose=True, progress_callback=None, status_callback=None):
+    @staticmethod
+    def _get_audio_duration(audio_file):
+        """获取音频时长（秒），失败时返回None"""
+        # 优先在进程内解析文件头，结果按路径、大小和修改时间缓存
+        audio_duration = get_audio_metadata().get_duration(audio_file)
+        if audio_duration is not None:
+            print(f"音频时长: {audio_duration:.2f}秒")
+        return audio_duration
+
+    def _load_audio(self, audio_file):
+        """解码音频为16kHz单声道float32数组，启用缓存时直接内存映射缓存中的数据"""
+        if self.audio_cache is not None:
+            return self.audio_cache.get_audio(audio_file, whisper.load_audio)
+        return whisper.load_audio(audio_file)
+
+    def _load_mel(self, audio_file, model):
+        """获取整段音频补齐30秒静音后的log-mel特征，未启用特征缓存时返回None"""
+        if self.audio_cache is None or not self.audio_cache.cache_mel:
+            return None
+        n_mels = model.dims.n_mels
+        return self.audio_cache.get_mel(
+            audio_file, n_mels,
+            lambda: whisper.log_mel_spectrogram(self._load_audio(audio_file), n_mels, padding=whisper.audio.N_SAMPLES).numpy()
+        )
+
+    def _detect_speech(self, audio_file, stats):
+        """
+        解码音频并检测语音区间
+
+        Args:
+            audio_file (str): 音频文件路径
+            stats (dict): 用于记录跳过音频时长的统计字典
+
+        Returns:
+            tuple: (只包含语音的音频, SpeechTimeline)
+        """
+        audio = self._load_audio(audio_file)
+        timeline = SpeechTimeline(self.vad.detect(audio))
+        duration = len(audio) / SAMPLE_RATE
+        skipped = duration - timeline.speech_duration
+
+        stats['duration'] = duration
+        stats['speech_duration'] = timeline.speech_duration
+        stats['skipped_seconds'] = skipped
+        stats['skipped_ratio'] = skipped / duration if duration > 0 else 0.0
+        stats['speech_regions'] = len(timeline.regions)
+        print(f"语音检测: 共{duration:.1f}秒，语音{timeline.speech_duration:.1f}秒，"
+              f"跳过{skipped:.1f}秒({stats['skipped_ratio']:.1%})")
+        return timeline.extract(audio), timeline
+
+    def _decoding_params(self):
+        """影响转录结果的解码参数，各种模式共用，也是转录缓存键的一部分"""
+        params = {
+            'initial_prompt': self.INITIAL_PROMPT,
+            'temperature': DEFAULT_TEMPERATURES,
+            'compression_ratio_threshold': 2.4,
+            'logprob_threshold': -1.0,
+            'no_speech_threshold': 0.6,
+            'condition_on_previous_text': True,
+            'fp16': self.precision == "fp16",
+            'bf16': self.precision == "bf16"
+        }
+        # 未启用的解码保护不加入参数，已有的转录缓存键保持不变
+        if self.max_fallbacks is not None:
+            params['max_fallbacks'] = self.max_fallbacks
+        if self.repetition_limit is not None:
+            params['repetition_limit'] = self.repetition_limit
+        return params
+
+    def _create_decoder(self, model, language, verbose=False):
+        """创建窗口解码器，转录参数在各种模式下保持一致"""
+        return WindowDecoder(
+            model,
+            language=language,
+            task="transcribe",
+            verbose=verbose,
+            **self._decoding_params()
+        )
+
+    def _transcript_cache_key(self, audio_file, language):
+        """转录缓存键：音频内容哈希 + 模型 + 语言 + 解码参数（启用级联时还包括大模型和升级阈值）"""
+        parts = [
+            FileUtils.get_content_hash(audio_file),
+            self.model_name,
+            self.precision,
+            language,
+            self.use_vad,
+            self._decoding_params()
+        ]
+        if self.cascade_model is not None:
+            parts.append({'cascade_model': self.cascade_model, **self.cascade_thresholds})
+        return ResultCache.make_key(*parts)
+
+    def _load_checkpoint(self, checkpoint_key, long_mode):
+        """读取与当前转录模式和分块参数一致的检查点"""
+        checkpoint = self.checkpoints.load(checkpoint_key)
+        if checkpoint is None:
+            return None
+        state = checkpoint['state']
+        if long_mode:
+            if (checkpoint['mode'] != 'long' or state.get('chunk_seconds') != self.chunk_seconds
+                    or state.get('chunk_overlap') != self.chunk_overlap):
+                return None
+        elif checkpoint['mode'] != 'window':
+            return None
+        return checkpoint
+
+    def checkpoint_info(self, audio_file, language="zh"):
+        """
+        查询音频文件是否有未完成的转录检查点
+
+        Args:
+            audio_file (str): 音频文件路径
+            language (str): 语言代码
+
+        Returns:
+            dict: {'segments': 已解码片段数, 'resume_at': 已解码到的时间（秒）}，没有检查点时返回None
+        """
+        if self.checkpoints is None or not os.path.exists(audio_file):
+            return None
+        checkpoint = self.checkpoints.load(self._transcript_cache_key(audio_file, language))
+        if checkpoint is None:
+            return None
+        segments = checkpoint['segments']
+        return {'segments': len(segments), 'resume_at': segments[-1]['end'] if segments else 0.0}
+
+    def _cache_segments(self, cache_key, segments):
+        """把转录片段写入转录缓存，只保留时间戳、文本和置信度"""
+        keys = ('start', 'end', 'text', 'avg_logprob', 'no_speech_prob', 'compression_ratio')
+        self.transcript_cache.put(cache_key, {
+            'segments': [{k: segment.get(k) for k in keys} for segment in segments]
+        })
+
+    def transcribe(self, audio_file, language="zh", verbose=False, progress_callback=None, status_callback=None,
+                   stats=None, segment_callback=None, prepared=None, cancel_token=None):
         """
         转录音频文件
         
         Args:
             audio_file (str): 音频文件路径
             language (str): 语言代码，默认为中文(zh)
-            verbose (bool): 是否显示详细进度信息，默认为True
+            verbose (bool): 是否在控制台打印每个片段，默认为False
             progress_callback (callable): 进度回调函数，接收当前进度百分比作为参数
             status_callback (callable): 状态回调函数，接收状态文本作为参数
+            stats (dict): 可选，用于接收本次转录的统计信息（如语音检测跳过的时长）
+            segment_callback (callable): 片段回调函数，每解码出一个片段调用一次，接收 (片段, 已解码比例)，
+                片段为包含 start, end, text, avg_logprob 等字段的字典，时间戳基于原始音频
+            prepared (dict): 可选，prepare() 提前准备好的输入
+            cancel_token (CancellationToken): 可选，取消后在当前窗口解码完时停止
             
         Returns:
             str: 转录的文本
         """
+        if stats is None:
+            stats = {}
+        
+        texts = []
+        for segment, fraction in self._iter_with_progress(audio_file, language, verbose, progress_callback,
+                                                          status_callback, stats, prepared, cancel_token):
+            texts.append(segment['text'])
+            if segment_callback is not None:
+                segment_callback(segment, fraction)
+        
+        if stats.get('stopped'):
+            return ""
+        return "".join(texts)
+    
+    def transcribe_iter(self, audio_file, language="zh", verbose=False, progress_callback=None, status_callback=None,
+                        stats=None, prepared=None, cancel_token=None):
+        """
+        流式转录音频文件，每解码完一个30秒窗口就产出其中的片段
+        
+        调用方可以边转录边写文件或显示结果，转录中途失败或被停止时已产出的片段仍然可用；
+        被停止时 stats['stopped'] 为True，stats['stopped_at'] 为最后一个片段的结束时间。
+        
+        Args:
+            audio_file (str): 音频文件路径
+            language (str): 语言代码，默认为中文(zh)
+            verbose (bool): 是否在控制台打印每个片段，默认为False
+            progress_callback (callable): 进度回调函数，接收当前进度百分比作为参数
+            status_callback (callable): 状态回调函数，接收状态文本作为参数
+            stats (dict): 可选，用于接收本次转录的统计信息
+            prepared (dict): 可选，prepare() 提前准备好的输入
+            cancel_token (CancellationToken): 可选，取消后在当前窗口解码完时停止
+            
+        Yields:
+            dict: 片段，包含 start, end, text, avg_logprob 等字段，时间戳基于原始音频
+        """
+        if stats is None:
+            stats = {}
+        for segment, _ in self._iter_with_progress(audio_file, language, verbose, progress_callback,
+                                                   status_callback, stats, prepared, cancel_token):
+            yield segment
+    
+    def prepare(self, audio_file, language="zh", status_callback=None):
+        """
+        准备转录输入：查询转录缓存、解码音频、语音检测并计算log-mel特征
+
+        这一步只涉及磁盘读取、ffmpeg解码和特征计算，不占用模型，
+        可以在后台线程中为后续文件提前执行（见 Prefetcher），结果传给 transcribe/transcribe_iter 的prepared参数。
+
+        Args:
+            audio_file (str): 音频文件路径
+            language (str): 语言代码
+            status_callback (callable): 状态回调函数，接收状态文本作为参数
+
+        Returns:
+            dict: 准备好的输入，包含 audio, mel, timeline, long_mode, cached_segments, stats 等字段
+        """
         if not os.path.exists(audio_file):
             raise FileNotFoundError(f"音频文件 '{audio_file}' 不存在")
-        
+
+        start_time = time.time()
+        prepared = {
+            'audio_file': audio_file,
+            'language': language,
+            'stats': {},
+            'cache_key': None,
+            'cached_segments': None,
+            'audio': None,
+            'mel': None,
+            'timeline': None,
+            'long_mode': False,
+            'no_speech': False
+        }
+        stats = prepared['stats']
+
+        # 相同内容的音频（如不同目录下的副本）直接使用缓存的转录结果
+        if self.transcript_cache is not None:
+            prepared['cache_key'] = self._transcript_cache_key(audio_file, language)
+            cached = self.transcript_cache.get(prepared['cache_key'])
+            if cached is not None:
+                prepared['cached_segments'] = cached['segments']
+                return prepared
+
+        # 语音活动检测：只把语音区间送入模型
+        audio = None
+        timeline = None
+        if self.use_vad:
+            audio, timeline = self._detect_speech(audio_file, stats)
+            prepared['timeline'] = timeline
+            if not timeline.regions:
+                prepared['no_speech'] = True
+                return prepared
+
+        # 长音频切块后由多个进程并行转录
+        if self.long_audio_threshold is not None:
+            if timeline is not None:
+                audio_duration = timeline.speech_duration
+            else:
+                audio_duration = self._get_audio_duration(audio_file)
+            if audio_duration is not None and audio_duration >= self.long_audio_threshold:
+                prepared['long_mode'] = True
+                prepared['audio'] = audio if audio is not None else self._load_audio(audio_file)
+                return prepared
+
         model = self.load_model(status_callback)
+        mel = None
+        if timeline is None:
+            mel = self._load_mel(audio_file, model)
+            if mel is None:
+                audio = self._load_audio(audio_file)
+        if mel is None:
+            # 末尾补30秒静音，便于切出完整窗口
+            mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels, padding=whisper.audio.N_SAMPLES)
+        prepared['mel'] = mel
+        if self.cascade_model is not None:
+            # 级联转录时大模型需要重新解码部分窗口的音频
+            prepared['audio'] = audio
+        stats['prepare_seconds'] = time.time() - start_time
+        return prepared
+
+    def _iter_with_progress(self, audio_file, language, verbose, progress_callback, status_callback, stats,
+                            prepared=None, cancel_token=None):
+        """转录的核心生成器，产出 (片段, 已解码比例)"""
+        should_stop = self._should_stop(cancel_token)
+        self.last_stats = stats
+        self.last_segments = SegmentStore()
         
         print(f"正在处理音频文件: {audio_file}")
         if status_callback:
             status_callback(f"正在处理音频文件: {os.path.basename(audio_file)}")
         start_time = time.time()
         
-        # 如果提供了进度回调函数，则使用自定义的verbose函数
-        if progress_callback is not None and callable(progress_callback):
-            # 获取音频时长，使用更健壮的方法
-            try:
-                # 尝试使用ffmpeg获取音频时长，避免librosa的兼容性问题
-                import subprocess
-                cmd = [
-                    'ffprobe', '-v', 'error', '-show_entries', 
-                    'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', 
-                    audio_file
-                ]
-                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=10)
-                if result.returncode == 0 and result.stdout.strip():
-                    audio_duration = float(result.stdout.strip())
-                    print(f"音频时长: {audio_duration:.2f}秒")
-                else:
-                    # 如果ffmpeg失败，尝试使用librosa
-                    audio_duration = librosa.get_duration(path=audio_file)
-                    print(f"音频时长: {audio_duration:.2f}秒")
-            except Exception as e:
-                print(f"无法获取音频时长: {e}")
-                audio_duration = None
-            
-            # 保存原始的print函数
-            original_print = print
-            
-            def custom_print(*args, **kwargs):
-                # 调用原始print函数以保持控制台输出
-                original_print(*args, **kwargs)
-                
-                # 尝试从输出中提取进度信息
-                if len(args) > 0 and isinstance(args[0], str):
-                    text = args[0]
-                    # Whisper的verbose输出格式通常是 "[00:00.000 --> 00:10.000] 文本内容"
-                    if "-->" in text and "[" in text and "]" in text:
-                        try:
-                            # 提取时间戳
-                            time_part = text.split("]")[0].split("[")[1]
-                            end_time = time_part.split(" --> ")[1]
-                            # 将时间戳转换为秒
-                            minutes, seconds = end_time.split(":")
-                            total_seconds = int(minutes) * 60 + float(seconds)
-                            
-                            # 计算进度百分比
-                            if audio_duration is not None:
-                                progress = min(95, int(total_seconds * 100 / audio_duration))
-                            else:
-                                # 如果无法获取音频时长，使用默认估计
-                                progress = min(95, int(total_seconds * 100 / 3600))  # 假设最大1小时
-                            
-                            progress_callback(progress)
-                        except:
-                            pass
-            
-            # 临时替换print函数
-            import builtins
-            builtins.print = custom_print
-            
-            try:
-                # 在转录前检查停止标志
-                if self._stop_flag:
-                    print("转录被用户中断")
-                    return ""
-                    
-                result = model.transcribe(
-                    audio_file,
-                    language=language,
-                    task="transcribe",
-                    fp16=torch.cuda.is_available(),
-                    initial_prompt="以下是简体中文：",
-                    verbose=verbose
-                )
-                
-                # 转录完成后检查是否被中断
-                if self._stop_flag:
-                    print("转录被用户中断")
-                    return ""
-                    
-            finally:
-                # 恢复原始print函数
-                builtins.print = original_print
+        if prepared is None:
+            prepared = self.prepare(audio_file, language, status_callback)
+        stats.update(prepared['stats'])
+        cache_key = prepared['cache_key']
+        timeline = prepared['timeline']
+        
+        if prepared['cached_segments'] is not None:
+            stats['transcript_cache_hit'] = True
+            print(f"转录缓存命中，跳过转录: {os.path.basename(audio_file)}")
+            if status_callback:
+                status_callback(f"转录缓存命中: {os.path.basename(audio_file)}")
+            segments = prepared['cached_segments']
+            self.last_segments = SegmentStore(segments)
+            for segment in segments:
+                yield segment, 1.0
+            if progress_callback is not None and callable(progress_callback):
+                progress_callback(100)
+            return
+        
+        if prepared['no_speech']:
+            print("未检测到语音，跳过该文件")
+            if progress_callback is not None and callable(progress_callback):
+                progress_callback(100)
+            return
+        
+        # 检查点：从上次中断的位置继续，解码过程中定期保存进度
+        checkpoint_key = None
+        checkpoint = None
+        if self.checkpoints is not None:
+            checkpoint_key = cache_key or self._transcript_cache_key(audio_file, language)
+            checkpoint = self._load_checkpoint(checkpoint_key, prepared['long_mode'])
+        mode = 'long' if prepared['long_mode'] else 'window'
+        segments = SegmentStore()
+        self.last_segments = segments
+        resume_state = None
+        if checkpoint is not None:
+            segments.extend(checkpoint['segments'])
+            resume_state = checkpoint['state']
+            stats['resumed_from'] = segments[-1]['end'] if segments else 0.0
+            print(f"从检查点继续: 已有{len(segments)}个片段（至{stats['resumed_from']:.1f}秒）")
+            if status_callback:
+                status_callback(f"从检查点继续: {os.path.basename(audio_file)}")
+            for segment in segments:
+                yield segment, 0.0
+        # 最近一次完整窗口（或分块）结束时的状态和片段数，出错或中断时据此写检查点
+        latest = {'state': None, 'count': len(segments), 'windows': 0, 'raw_segment': None}
+        
+        def save_checkpoint():
+            if checkpoint_key is not None and latest['state'] is not None:
+                self.checkpoints.save(checkpoint_key, audio_file, mode, latest['state'],
+                                      segments[:latest['count']])
+        
+        def on_window(state):
+            latest['state'] = state
+            latest['count'] = len(segments)
+            latest['windows'] += 1
+            if latest['windows'] % self.checkpoint_windows == 0:
+                save_checkpoint()
+        
+        def on_chunk(next_chunk):
+            latest['state'] = {'next_chunk': next_chunk, 'chunk_seconds': self.chunk_seconds,
+                               'chunk_overlap': self.chunk_overlap, 'previous_segment': latest['raw_segment']}
+            latest['count'] = len(segments)
+            save_checkpoint()
+        
+        progress = {'fraction': 0.0}
+        
+        def window_progress(fraction):
+            # 每解码完一个窗口（或分块）更新一次，按mel时间轴计算进度
+            progress['fraction'] = fraction
+            if progress_callback is not None and callable(progress_callback):
+                progress_callback(min(95, int(fraction * 100)))
+        
+        refiner = None
+        decoder = None
+        # 温度回退和重复循环中止的计数，长音频模式下由各分块汇总
+        decode_counters = {}
+        if prepared['long_mode']:
+            stats['long_audio_mode'] = True
+            if self.cascade_model is not None:
+                print("长音频分块模式不使用级联转录，只使用草稿模型")
+            segment_iter = self._iter_long(prepared['audio'], language, window_progress, status_callback, should_stop,
+                                           resume_state, on_chunk if checkpoint_key is not None else None,
+                                           decode_counters)
         else:
-            # 没有提供进度回调，使用标准方式
-            # 在转录前检查停止标志
-            if self._stop_flag:
-                print("转录被用户中断")
-                return ""
-                
-            result = model.transcribe(
-                audio_file,
-                language=language,
-                task="transcribe",
-                fp16=torch.cuda.is_available(),
-                initial_prompt="以下是简体中文：",
-                verbose=verbose
-            )
-            
-            # 转录完成后检查是否被中断
-            if self._stop_flag:
-                print("转录被用户中断")
-                return ""
+            model = self.load_model(status_callback)
+            decoder = self._create_decoder(model, language, verbose)
+            if self.cascade_model is not None:
+                audio = prepared['audio']
+                if audio is None:
+                    # 特征来自缓存时音频未解码
+                    audio = self._load_audio(audio_file)
+                    if timeline is not None:
+                        audio = timeline.extract(audio)
+                refiner = self._create_refiner(audio, language, status_callback)
+            # 解码器在每个窗口开始前检查停止请求
+            segment_iter = decoder.iter_segments(None, window_progress, mel=prepared['mel'], should_stop=should_stop,
+                                                 state=resume_state,
+                                                 window_callback=on_window if checkpoint_key is not None else None,
+                                                 refine=refiner.refine_window if refiner is not None else None)
+        
+        decode_start = time.time()
+        finished = False
+        try:
+            for segment in segment_iter:
+                latest['raw_segment'] = segment
+                # 语音检测时模型输出的是拼接音频上的时间，映射回原始时间轴
+                if timeline is not None:
+                    segment = timeline.map_segments([segment])[0]
+                segments.append(segment)
+                yield segment, progress['fraction']
+            finished = not should_stop()
+        finally:
+            # 出错、被停止或调用方提前结束迭代时保存最后一个完整窗口的检查点
+            if not finished:
+                save_checkpoint()
         
-        print(f"转录耗时: {time.time() - start_time:.2f}秒")
-        print(f"转录完成，文本长度: {len(result['text'])}字符")
+        # 转录结束后检查是否被中断，已解码的片段保留在 last_segments 中
+        if not finished:
+            stats['stopped'] = True
+            stats['stopped_at'] = segments[-1]['end'] if segments else 0.0
+            print(f"转录被用户中断，已保留{len(segments)}个片段（至{stats['stopped_at']:.1f}秒）")
+            return
+        if checkpoint_key is not None:
+            self.checkpoints.remove(checkpoint_key)
+        
+        text = segments.text()
+        elapsed = time.time() - start_time
+        stats['transcribe_seconds'] = elapsed
+        
+        if cache_key is not None:
+            self._cache_segments(cache_key, segments)
+        
+        print(f"转录耗时: {elapsed:.2f}秒")
+        self._record_performance(audio_file, stats, time.time() - decode_start)
+        if decoder is not None:
+            merge_decode_counters(decode_counters, decoder.counters)
+        self._record_decode_counters(stats, decode_counters)
+        if refiner is not None:
+            self._record_cascade(refiner, stats, time.time() - decode_start)
+        print(f"转录完成，文本长度: {len(text)}字符")
         
         # 如果提供了进度回调，通知完成
         if progress_callback is not None and callable(progress_callback):
             progress_callback(100)
         
-        if "duration" in result:
-            print(f"音频时长: {result['duration']:.2f}秒")
-            print(f"平均语速: {len(result['text'])/result['duration']:.2f}字/秒")
-        
-        return result["text"]
+        if segments and segments[-1]['end'] > 0:
+            print(f"平均语速: {len(text)/segments[-1]['end']:.2f}字/秒")
     
+    def _record_decode_counters(self, stats, counters):
+        """记录温度回退的重新解码次数和因重复循环中止的窗口数，以及花在这些窗口上的解码时间"""
+        if not counters:
+            return
+        stats.update(counters)
+        wasted = counters['fallback_seconds'] + counters['aborted_seconds']
+        if counters['fallback_decodes'] or counters['aborted_windows']:
+            line = (f"解码保护: 温度回退重新解码{counters['fallback_decodes']}次，"
+                    f"中止重复循环窗口{counters['aborted_windows']}个，耗时{wasted:.2f}秒")
+            if stats.get('decode_seconds'):
+                line += f"（占解码时间{wasted / stats['decode_seconds']:.1%}）"
+            print(line)
+
+    def _record_performance(self, audio_file, stats, decode_seconds):
+        """记录计算精度、模型加载耗时、内存占用和实时率(RTF)，便于比较不同精度模式"""
+        stats['compute_type'] = self.precision
+        stats['decode_seconds'] = decode_seconds
+        info = get_model_registry().model_info(self.model_name, self.device, self.precision)
+        if info is not None:
+            stats['model_load_seconds'] = info['load_time']
+            stats['model_memory_mb'] = info['size_mb']
+        duration = stats.get('duration')
+        if duration is None:
+            duration = get_audio_metadata().get_duration(audio_file)
+        if duration:
+            stats['rtf'] = decode_seconds / duration
+            line = f"计算精度: {self.precision}，实时率(RTF): {stats['rtf']:.3f}"
+            if info is not None:
+                line += f"，模型加载: {info['load_time']:.2f}秒，模型内存: {info['size_mb']:.0f}MB"
+            print(line)
+
+    def transcribe_batch(self, audio_files, language="zh", batch_size=16, status_callback=None, cancel_token=None):
+        """
+        跨文件批量转录，适合大量短音频
+
+        不超过30秒（启用语音检测时按语音时长计）的音频凑满一批后一起解码，
+        更长的音频仍按单个文件逐窗口转录。结果按完成顺序产出。
+
+        Args:
+            audio_files (list): 音频文件路径列表
+            language (str): 语言代码，默认为中文(zh)
+            batch_size (int): 每批解码的音频数
+            status_callback (callable): 状态回调函数，接收状态文本作为参数
+            cancel_token (CancellationToken): 可选，取消后不再开始新的批次或文件
+
+        Yields:
+            tuple: (音频文件, 片段列表, 统计信息)；转录失败时片段列表为None，错误信息在统计信息的error中
+        """
+        should_stop = self._should_stop(cancel_token)
+        model = self.load_model(status_callback)
+        batch_decoder = BatchDecoder(model, batch_size, language=language, task="transcribe",
+                                     **self._decoding_params())
+        pending = []  # [(音频文件, 音频, SpeechTimeline, 统计信息, 缓存键)]
+
+        def flush():
+            start_time = time.time()
+            if status_callback:
+                status_callback(f"批量解码 {len(pending)} 个音频...")
+            try:
+                batch_segments = batch_decoder.decode_batch([item[1] for item in pending])
+            except Exception as e:
+                for audio_file, _, _, stats, _ in pending:
+                    stats['error'] = str(e)
+                    yield audio_file, None, stats
+                return
+            elapsed = time.time() - start_time
+            print(f"批量解码 {len(pending)} 个音频耗时: {elapsed:.2f}秒")
+            for (audio_file, audio, timeline, stats, cache_key), segments, counters in zip(
+                pending, batch_segments, batch_decoder.last_counters
+            ):
+                self._record_decode_counters(stats, counters)
+                if self.cascade_model is not None:
+                    # 短音频只有一个窗口，置信度低时整段交给大模型重新解码
+                    refiner = self._create_refiner(audio, language, status_callback)
+                    segments = refiner.refine_window(segments, 0.0, len(audio) / SAMPLE_RATE)
+                    for segment_id, segment in enumerate(segments):
+                        segment['id'] = segment_id
+                    self._record_cascade(refiner, stats, elapsed / len(pending) + refiner.refine_seconds)
+                if timeline is not None:
+                    segments = timeline.map_segments(segments)
+                stats['batched'] = True
+                stats['transcribe_seconds'] = elapsed / len(pending)
+                if cache_key is not None:
+                    self._cache_segments(cache_key, segments)
+                yield audio_file, segments, stats
+
+        for audio_file in audio_files:
+            if should_stop():
+                break
+            stats = {}
+            try:
+                cache_key = None
+                if self.transcript_cache is not None:
+                    cache_key = self._transcript_cache_key(audio_file, language)
+                    cached = self.transcript_cache.get(cache_key)
+                    if cached is not None:
+                        stats['transcript_cache_hit'] = True
+                        yield audio_file, cached['segments'], stats
+                        continue
+
+                timeline = None
+                if self.use_vad:
+                    audio, timeline = self._detect_speech(audio_file, stats)
+                    if not timeline.regions:
+                        yield audio_file, [], stats
+                        continue
+                else:
+                    audio = self._load_audio(audio_file)
+            except Exception as e:
+                stats['error'] = str(e)
+                yield audio_file, None, stats
+                continue
+
+            if batch_decoder.fits(audio):
+                pending.append((audio_file, audio, timeline, stats, cache_key))
+                if len(pending) >= batch_size:
+                    yield from flush()
+                    pending.clear()
+                continue
+
+            # 超过一个窗口的音频按单个文件转录
+            try:
+                segments = list(self.transcribe_iter(audio_file, language, stats=stats, cancel_token=cancel_token))
+            except Exception as e:
+                stats['error'] = str(e)
+                segments = None
+            if not stats.get('stopped'):
+                yield audio_file, segments, stats
+
+        if pending and not should_stop():
+            yield from flush()
+
+    def _iter_long(self, audio, language, progress_callback, status_callback, should_stop=None, state=None,
+                   chunk_callback=None, counters=None):
+        """
+        长音频模式：分块并行转录，按时间顺序产出拼接后的片段
+
+        Args:
+            audio (np.ndarray): 待转录的音频（启用语音检测时为拼接后的语音）
+            language (str): 语言代码
+            progress_callback (callable): 进度回调，接收0-1之间的完成比例
+            status_callback (callable): 状态回调函数
+            should_stop (callable): 返回True时停止，正在转录的分块在当前窗口结束后返回
+            state (dict): 从检查点恢复时的状态，包含下一个分块的序号和已产出的最后一个片段
+            chunk_callback (callable): 每个分块完成后调用，接收下一个分块的序号
+            counters (dict): 可选，累加各分块的解码计数
+
+        Yields:
+            dict: 片段，时间相对于audio起点
+        """
+        if self._chunked_transcriber is None:
+            self._chunked_transcriber = ChunkedTranscriber(
+                self.model_name, self.device, self.chunk_seconds, self.chunk_overlap, self.chunk_workers,
+                precision=self.precision
+            )
+        chunked = self._chunked_transcriber
+        if status_callback:
+            status_callback(f"长音频分块并行转录中（{chunked.max_workers}个进程）...")
+
+        # 当前进程不能创建子进程时，由分块转录器用本进程的模型顺序处理
+        model = None if chunked.can_use_processes() else self.load_model(status_callback)
+        yield from chunked.iter_segments(
+            audio,
+            language=language,
+            decode_params=self._decoding_params(),
+            progress_callback=progress_callback,
+            should_stop=should_stop or self.cancel_token.is_cancelled,
+            model=model,
+            start_chunk=state['next_chunk'] if state else 0,
+            previous_segment=state.get('previous_segment') if state else None,
+            chunk_callback=chunk_callback,
+            counters=counters
+        )
+
     @staticmethod
     def get_model_options():
         """获取可用的模型选项"""
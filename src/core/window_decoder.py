@@ -0,0 +1,483 @@
+import contextlib
+import time
+
+import numpy as np
+import torch
+from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES, SAMPLE_RATE, log_mel_spectrogram, pad_or_trim
+from whisper.decoding import DecodingOptions, DecodingTask, LogitFilter
+from whisper.tokenizer import get_tokenizer
+from whisper.utils import exact_div, format_timestamp, make_safe
+
+# Whisper默认的温度回退序列
+DEFAULT_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+# 重复循环检测：最长的重复单元（token数），以及重复部分至少包含的token数
+MAX_LOOP_NGRAM = 32
+MIN_LOOP_TOKENS = 16
+
+# 每个解码器统计的计数，用于观察有多少计算花在了质量差的窗口上；
+# 中止的解码只计入 aborted_seconds，fallback_seconds 是未中止的回退解码的耗时，两者相加即浪费的解码时间
+DECODE_COUNTERS = ('decode_passes', 'fallback_decodes', 'fallback_seconds', 'aborted_windows', 'aborted_seconds')
+
+
+def merge_decode_counters(target, counters):
+    """把解码计数累加到target中"""
+    for key in DECODE_COUNTERS:
+        target[key] = target.get(key, 0) + counters.get(key, 0)
+    return target
+
+
+class RepetitionGuard(LogitFilter):
+    """解码过程中检测重复循环的logit过滤器
+
+    已生成的文本token（不含时间戳）末尾同一段token连续重复 repeats 次以上、且重复部分不少于
+    MIN_LOOP_TOKENS 个token时（如"谢谢观看"反复出现），强制该条目输出结束符提前结束解码，
+    并记录被中止的条目，调用方据此跳过整个窗口，不再为它尝试更高的温度。
+    """
+
+    def __init__(self, eot, sample_begin, repeats, max_ngram=MAX_LOOP_NGRAM, min_tokens=MIN_LOOP_TOKENS):
+        """
+        Args:
+            eot (int): 结束符token
+            sample_begin (int): 生成的token在序列中的起始位置（之前为提示和起始符）
+            repeats (int): 连续重复多少次视为循环
+            max_ngram (int): 最长的重复单元（token数）
+            min_tokens (int): 重复部分至少包含的token数，避免"对对对"之类的正常重复被中止
+        """
+        self.eot = eot
+        self.sample_begin = sample_begin
+        self.repeats = max(2, repeats)
+        self.max_ngram = max_ngram
+        self.min_tokens = min_tokens
+        self.aborted = set()
+
+    def _is_loop(self, tokens):
+        text = [token for token in tokens if token < self.eot]
+        for size in range(1, self.max_ngram + 1):
+            span = size * self.repeats
+            if span > len(text):
+                break
+            if span < self.min_tokens:
+                continue
+            block = text[-size:]
+            if all(text[len(text) - (k + 1) * size:len(text) - k * size] == block for k in range(1, self.repeats)):
+                return True
+        return False
+
+    def apply(self, logits, tokens):
+        for row in range(tokens.shape[0]):
+            if row not in self.aborted:
+                generated = tokens[row, self.sample_begin:]
+                # 只在刚生成文本token时检查
+                if len(generated) == 0 or generated[-1].item() >= self.eot:
+                    continue
+                if not self._is_loop(generated.tolist()):
+                    continue
+                self.aborted.add(row)
+            logits[row, :] = -np.inf
+            logits[row, self.eot] = 0
+
+
+def split_window_segments(result, tokenizer, window_seek, time_offset, segment_size, input_stride, time_precision):
+    """
+    按时间戳token把一个窗口的解码结果切分为片段
+
+    Args:
+        result (DecodingResult): 窗口的解码结果
+        tokenizer: Whisper分词器
+        window_seek (int): 窗口起始的mel帧位置
+        time_offset (float): 窗口起始时间（秒）
+        segment_size (int): 窗口包含的有效mel帧数
+        input_stride (int): 每个输出token对应的mel帧数
+        time_precision (float): 每个时间戳token对应的秒数
+
+    Returns:
+        tuple: (片段列表, 下一个窗口相对window_seek前进的帧数)
+    """
+    tokens = torch.tensor(result.tokens)
+    current_segments = []
+
+    def new_segment(start, end, segment_tokens):
+        segment_tokens = segment_tokens.tolist()
+        text_tokens = [token for token in segment_tokens if token < tokenizer.eot]
+        return {
+            'seek': window_seek,
+            'start': start,
+            'end': end,
+            'text': tokenizer.decode(text_tokens),
+            'tokens': segment_tokens,
+            'temperature': result.temperature,
+            'avg_logprob': result.avg_logprob,
+            'compression_ratio': result.compression_ratio,
+            'no_speech_prob': result.no_speech_prob
+        }
+
+    timestamp_tokens = tokens.ge(tokenizer.timestamp_begin)
+    single_timestamp_ending = timestamp_tokens[-2:].tolist() == [False, True]
+
+    consecutive = torch.where(timestamp_tokens[:-1] & timestamp_tokens[1:])[0]
+    consecutive.add_(1)
+    if len(consecutive) > 0:
+        # 输出中包含成对的时间戳token，按其切分片段
+        slices = consecutive.tolist()
+        if single_timestamp_ending:
+            slices.append(len(tokens))
+
+        last_slice = 0
+        for current_slice in slices:
+            sliced_tokens = tokens[last_slice:current_slice]
+            start_pos = sliced_tokens[0].item() - tokenizer.timestamp_begin
+            end_pos = sliced_tokens[-1].item() - tokenizer.timestamp_begin
+            current_segments.append(new_segment(
+                time_offset + start_pos * time_precision,
+                time_offset + end_pos * time_precision,
+                sliced_tokens
+            ))
+            last_slice = current_slice
+
+        if single_timestamp_ending:
+            # 以单个时间戳结尾表示之后没有语音
+            seek_delta = segment_size
+        else:
+            # 否则丢弃未完成的片段，从最后一个时间戳处继续
+            last_timestamp_pos = tokens[last_slice - 1].item() - tokenizer.timestamp_begin
+            seek_delta = last_timestamp_pos * input_stride
+    else:
+        duration = segment_size * HOP_LENGTH / SAMPLE_RATE
+        timestamps = tokens[timestamp_tokens.nonzero().flatten()]
+        if len(timestamps) > 0 and timestamps[-1].item() != tokenizer.timestamp_begin:
+            # 只有一个时间戳时以它作为片段结束
+            last_timestamp_pos = timestamps[-1].item() - tokenizer.timestamp_begin
+            duration = last_timestamp_pos * time_precision
+        current_segments.append(new_segment(time_offset, time_offset + duration, tokens))
+        seek_delta = segment_size
+
+    # 零时长或空文本的片段清空内容
+    for segment in current_segments:
+        if segment['start'] == segment['end'] or segment['text'].strip() == "":
+            segment['text'] = ""
+            segment['tokens'] = []
+
+    return current_segments, seek_delta
+
+
+
+class WindowDecoder:
+    """按30秒窗口驱动Whisper解码的生成器
+
+    逻辑与 whisper.transcribe 一致（温度回退、静音跳过、按时间戳切分片段、
+    以前文作为提示），但每解码完一个窗口就产出该窗口的片段，并且不依赖
+    verbose输出或任何全局状态，多个解码器可以在同一进程中并发运行。
+    """
+
+    def __init__(self, model, language="zh", task="transcribe", initial_prompt=None,
+                 temperature=DEFAULT_TEMPERATURES, compression_ratio_threshold=2.4,
+                 logprob_threshold=-1.0, no_speech_threshold=0.6, condition_on_previous_text=True,
+                 fp16=False, bf16=False, verbose=False, max_fallbacks=None, repetition_limit=None,
+                 **decode_options):
+        """
+        初始化窗口解码器
+
+        Args:
+            model: 已加载的Whisper模型
+            language (str): 语言代码，None表示自动检测
+            task (str): transcribe 或 translate
+            initial_prompt (str): 初始提示词
+            temperature (float|tuple): 解码温度或温度回退序列
+            compression_ratio_threshold (float): 压缩比高于此值时视为重复，触发回退
+            logprob_threshold (float): 平均对数概率低于此值时触发回退
+            no_speech_threshold (float): 无语音概率高于此值且置信度低时跳过窗口
+            condition_on_previous_text (bool): 是否以前文作为下一个窗口的提示
+            fp16 (bool): 是否使用半精度推理
+            bf16 (bool): 是否在autocast下以bfloat16推理，权重保持fp32，CPU上也可使用
+            verbose (bool): 是否在控制台打印每个片段
+            max_fallbacks (int): 温度回退最多重新解码的次数，None表示尝试完整的温度序列
+            repetition_limit (int): 解码中同一段文本连续重复该次数时中止并跳过窗口，None表示不检测
+            **decode_options: 传给 DecodingOptions 的其他参数，如 beam_size
+        """
+        self.model = model
+        self.language = language
+        self.task = task
+        self.initial_prompt = initial_prompt
+        self.temperature = temperature
+        self.compression_ratio_threshold = compression_ratio_threshold
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.condition_on_previous_text = condition_on_previous_text
+        self.verbose = verbose
+        self.max_fallbacks = max_fallbacks
+        self.repetition_limit = repetition_limit
+        self.counters = {key: 0 for key in DECODE_COUNTERS}
+        # 最近一次解码中因重复循环被中止的批次条目
+        self.last_aborted = set()
+
+        # CPU不支持半精度，与whisper.transcribe的处理保持一致
+        if model.device == torch.device("cpu"):
+            fp16 = False
+        self.dtype = torch.float16 if fp16 else torch.float32
+        self.bf16 = bf16 and not fp16
+        self.decode_options = dict(decode_options, task=task, fp16=fp16)
+
+    def _needs_fallback(self, decode_result):
+        """结果重复过多或置信度过低（且不是静音）时需要提高温度重新解码"""
+        needs_fallback = False
+        if (self.compression_ratio_threshold is not None
+                and decode_result.compression_ratio > self.compression_ratio_threshold):
+            needs_fallback = True  # 重复过多
+        if self.logprob_threshold is not None and decode_result.avg_logprob < self.logprob_threshold:
+            needs_fallback = True  # 平均对数概率过低
+        if (self.no_speech_threshold is not None and decode_result.no_speech_prob > self.no_speech_threshold
+                and self.logprob_threshold is not None and decode_result.avg_logprob < self.logprob_threshold):
+            needs_fallback = False  # 静音
+        return needs_fallback
+
+    def _temperatures(self):
+        """温度回退序列，按回退次数上限截断"""
+        temperatures = [self.temperature] if isinstance(self.temperature, (int, float)) else list(self.temperature)
+        if self.max_fallbacks is not None:
+            temperatures = temperatures[:self.max_fallbacks + 1]
+        return temperatures
+
+    def _decoding_options(self, temperature, prompt):
+        """构造指定温度下的解码选项"""
+        kwargs = dict(self.decode_options, language=self.language, prompt=prompt)
+        if temperature > 0:
+            # 采样解码时不使用束搜索参数
+            kwargs.pop("beam_size", None)
+            kwargs.pop("patience", None)
+        else:
+            kwargs.pop("best_of", None)
+        return DecodingOptions(**kwargs, temperature=temperature)
+
+    def _autocast(self):
+        """bf16模式下的autocast上下文"""
+        if not self.bf16:
+            return contextlib.nullcontext()
+        return torch.autocast(self.model.device.type, dtype=torch.bfloat16)
+
+    def _encode(self, mel_segment):
+        """
+        bf16模式下先在autocast中运行编码器，再把音频特征转回fp32
+
+        Whisper解码时要求音频特征为fp32（或fp16），传入已编码的特征会跳过其内部的编码步骤；
+        温度回退时各轮解码也因此复用同一份编码结果。
+        """
+        if not self.bf16:
+            return mel_segment
+        with self._autocast(), torch.no_grad():
+            single = mel_segment.ndim == 2
+            features = self.model.embed_audio(mel_segment.unsqueeze(0) if single else mel_segment).float()
+        return features[0] if single else features
+
+    def _decode(self, audio_features, options, fallback=False):
+        """
+        在当前精度下解码，启用重复检测时中止陷入循环的条目
+
+        被中止条目的批次下标记录在 last_aborted 中；fallback表示这是温度回退后的重新解码，计入回退统计
+        """
+        start_time = time.time()
+        self.last_aborted = set()
+        with self._autocast():
+            if self.repetition_limit is None:
+                results = self.model.decode(audio_features, options)
+            else:
+                single = audio_features.ndim == 2
+                task = DecodingTask(self.model, options)
+                guard = RepetitionGuard(task.tokenizer.eot, task.sample_begin, self.repetition_limit)
+                task.logit_filters.append(guard)
+                results = task.run(audio_features.unsqueeze(0) if single else audio_features)
+                if single:
+                    results = results[0]
+                self.last_aborted = {row // task.n_group for row in guard.aborted}
+        seconds = time.time() - start_time
+        self.counters['decode_passes'] += 1
+        if fallback:
+            self.counters['fallback_decodes'] += 1
+        # 每次解码的耗时只计入一项，中止的回退解码不再重复计入回退耗时
+        if self.last_aborted:
+            self.counters['aborted_windows'] += len(self.last_aborted)
+            self.counters['aborted_seconds'] += seconds
+        elif fallback:
+            self.counters['fallback_seconds'] += seconds
+        return results
+
+    def _decode_with_fallback(self, mel_segment, prompt, temperatures=None):
+        """依次尝试温度序列，直到结果不再重复且置信度足够；陷入重复循环时返回None"""
+        decode_result = None
+        audio_features = self._encode(mel_segment)
+        for i, t in enumerate(temperatures if temperatures is not None else self._temperatures()):
+            decode_result = self._decode(audio_features, self._decoding_options(t, prompt), fallback=i > 0)
+            if self.last_aborted:
+                return None
+            if not self._needs_fallback(decode_result):
+                break
+        return decode_result
+
+    def _should_skip(self, result):
+        """无语音检测：置信度不高且无语音概率高时跳过整个窗口"""
+        if self.no_speech_threshold is None:
+            return False
+        should_skip = result.no_speech_prob > self.no_speech_threshold
+        if self.logprob_threshold is not None and result.avg_logprob > self.logprob_threshold:
+            should_skip = False
+        return should_skip
+
+    def _get_tokenizer(self):
+        """当前语言和任务对应的分词器"""
+        return get_tokenizer(
+            self.model.is_multilingual, num_languages=self.model.num_languages, language=self.language, task=self.task
+        )
+
+    def _time_grid(self):
+        """返回 (每个输出token对应的mel帧数, 每个时间戳token对应的秒数)"""
+        input_stride = exact_div(N_FRAMES, self.model.dims.n_audio_ctx)
+        return input_stride, input_stride * HOP_LENGTH / SAMPLE_RATE
+
+    def _initial_prompt_tokens(self, tokenizer):
+        """初始提示词的token"""
+        if self.initial_prompt is None:
+            return []
+        return tokenizer.encode(" " + self.initial_prompt.strip())
+
+    @staticmethod
+    def _mel_window(mel, start, size):
+        """取出一个窗口的mel特征；内存映射的缓存数组只拷贝当前窗口"""
+        window = mel[:, start:start + size]
+        if isinstance(window, np.ndarray):
+            window = torch.from_numpy(np.array(window, dtype=np.float32))
+        return window
+
+    def iter_segments(self, audio, progress_callback=None, mel=None, should_stop=None, state=None,
+                      window_callback=None, refine=None):
+        """
+        逐窗口解码并产出片段
+
+        Args:
+            audio (str|np.ndarray): 音频文件路径或16kHz单声道音频，提供mel时可为None
+            progress_callback (callable): 每个窗口完成后调用，接收0-1之间的已解码比例
+            mel (np.ndarray|torch.Tensor): 预先计算的log-mel特征（末尾已补30秒静音），
+                如音频缓存中内存映射的特征
+            should_stop (callable): 每个窗口解码前调用，返回True时停止，已产出的片段不受影响
+            state (dict): 从检查点恢复时的解码器状态，由 window_callback 提供
+            window_callback (callable): 每个窗口的片段全部产出后调用，接收可序列化的解码器状态
+                （seek位置、片段编号、提示token和语言），用于写入检查点
+            refine (callable): 可选，接收 (窗口的片段, 窗口起始时间, 窗口结束时间)，返回替换后的片段，
+                如级联转录中用大模型重新解码低置信度的窗口；后续窗口的提示仍使用本模型的token
+
+        Yields:
+            dict: 片段，包含 start, end, text, tokens, avg_logprob, compression_ratio,
+                no_speech_prob, temperature 等字段
+        """
+        model = self.model
+        if mel is None:
+            # 末尾补30秒静音，便于切出完整窗口
+            mel = log_mel_spectrogram(audio, model.dims.n_mels, padding=N_SAMPLES)
+        content_frames = mel.shape[-1] - N_FRAMES
+        if content_frames <= 0:
+            if progress_callback:
+                progress_callback(1.0)
+            return
+
+        if self.language is None and state is not None:
+            # 从检查点恢复时沿用之前检测到的语言
+            self.language = state.get('language')
+        if self.language is None:
+            mel_segment = pad_or_trim(self._mel_window(mel, 0, N_FRAMES), N_FRAMES).to(model.device).to(self.dtype)
+            _, probs = model.detect_language(mel_segment)
+            self.language = max(probs, key=probs.get)
+            print(f"检测到语言: {self.language}")
+
+        tokenizer = self._get_tokenizer()
+        input_stride, time_precision = self._time_grid()
+
+        seek = 0
+        segment_id = 0
+        all_tokens = self._initial_prompt_tokens(tokenizer)
+        prompt_reset_since = 0
+        if state is not None:
+            seek = state['seek']
+            segment_id = state['segment_id']
+            all_tokens = list(state['tokens'])
+
+        def window_state():
+            # 解码时提示最多取最后 n_text_ctx/2 个token，检查点只需保存这些
+            prompt = all_tokens[prompt_reset_since:][-(model.dims.n_text_ctx // 2 - 1):]
+            return {'seek': seek, 'segment_id': segment_id, 'tokens': prompt, 'language': self.language}
+
+        while seek < content_frames:
+            if should_stop is not None and should_stop():
+                return
+            time_offset = float(seek * HOP_LENGTH / SAMPLE_RATE)
+            segment_size = min(N_FRAMES, content_frames - seek)
+            mel_segment = self._mel_window(mel, seek, segment_size)
+            mel_segment = pad_or_trim(mel_segment, N_FRAMES).to(model.device).to(self.dtype)
+
+            result = self._decode_with_fallback(mel_segment, all_tokens[prompt_reset_since:])
+
+            if result is None:
+                # 陷入重复循环：跳过该窗口，循环常由提示中的前文引起，之后的窗口不再以它为提示
+                prompt_reset_since = len(all_tokens)
+                if self.verbose:
+                    print(f"[{format_timestamp(time_offset)}] 检测到重复循环，跳过该窗口")
+                seek += segment_size
+                if progress_callback:
+                    progress_callback(min(content_frames, seek) / content_frames)
+                if window_callback:
+                    window_callback(window_state())
+                continue
+
+            if self._should_skip(result):
+                seek += segment_size
+                if progress_callback:
+                    progress_callback(min(content_frames, seek) / content_frames)
+                if window_callback:
+                    window_callback(window_state())
+                continue
+
+            current_segments, seek_delta = split_window_segments(
+                result, tokenizer, seek, time_offset, segment_size, input_stride, time_precision
+            )
+            seek += seek_delta
+
+            all_tokens.extend([token for segment in current_segments for token in segment['tokens']])
+            if not self.condition_on_previous_text or result.temperature > 0.5:
+                # 高温采样的结果不作为后续窗口的提示
+                prompt_reset_since = len(all_tokens)
+
+            if refine is not None:
+                current_segments = refine(current_segments, time_offset,
+                                          float(min(seek, content_frames) * HOP_LENGTH / SAMPLE_RATE))
+
+            if progress_callback:
+                progress_callback(min(content_frames, seek) / content_frames)
+
+            for segment in current_segments:
+                if not segment['text']:
+                    continue
+                segment['id'] = segment_id
+                segment_id += 1
+                if self.verbose:
+                    line = f"[{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}] {segment['text']}"
+                    print(make_safe(line))
+                yield segment
+
+            if window_callback:
+                window_callback(window_state())
+
+    def transcribe(self, audio, progress_callback=None):
+        """
+        解码整段音频
+
+        Args:
+            audio (str|np.ndarray): 音频文件路径或16kHz单声道音频
+            progress_callback (callable): 接收0-1之间的已解码比例
+
+        Returns:
+            dict: {'text': 文本, 'segments': 片段列表, 'language': 语言}
+        """
+        segments = list(self.iter_segments(audio, progress_callback))
+        return {
+            'text': "".join(segment['text'] for segment in segments),
+            'segments': segments,
+            'language': self.language
+        }
@@ -7,6 +7,7 @@ import os
 import sys
 import threading
 import queue
+import time
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 from tkinter.font import Font
@@ -18,8 +19,11 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
 from src.core.whisper_transcriber import WhisperTranscriber
+from src.core.model_registry import get_model_registry
+from src.core.prefetcher import Prefetcher
+from src.core.cancellation import CancellationToken
 from src.core.deepseek_summarizer import DeepSeekSummarizer
-from src.utils.file_utils import FileUtils
+from src.utils.file_utils import FileUtils, SummaryStreamWriter, NO_SPEECH_SUMMARY
 from src.config.config_manager import ConfigManager
 
 
@@ -66,6 +70,41 @@ class StreamRedirector:
         sys.stderr = self.original_stderr
 
 
+class SummaryLogStream:
+    """流式总结的文本增量回调：追加写入总结文件，并按行输出到GUI日志"""
+
+    def __init__(self, root, add_log, audio_file, writer):
+        """
+        root: Tk根窗口，日志通过 root.after 在界面线程中输出
+        add_log: GUI的add_log方法
+        audio_file: 音频文件路径，文件名作为日志前缀
+        writer: 总结文件的增量写入器
+        """
+        self.root = root
+        self.add_log = add_log
+        self.name = os.path.basename(audio_file)
+        self.writer = writer
+        self._pending = ""
+
+    def __call__(self, text):
+        """接收一段文本，凑满一行后输出到日志"""
+        self.writer.write(text)
+        self._pending += text
+        if "\n" in text:
+            *lines, self._pending = self._pending.split("\n")
+            for line in lines:
+                self._log(line)
+
+    def flush(self):
+        """输出最后不完整的一行"""
+        self._log(self._pending)
+        self._pending = ""
+
+    def _log(self, line):
+        if line.strip():
+            self.root.after(0, self.add_log, f"[{self.name}] {line}", "INFO")
+
+
 def sanitize_filename(filename):
     """清理文件名，移除或替换不安全的字符"""
     import re
@@ -91,6 +130,12 @@ class AudioTranscriberGUI:
         
         # 初始化配置管理器
         self.config = ConfigManager()
+
+        # 配置进程级模型注册表的淘汰策略
+        get_model_registry().configure(
+            idle_timeout=self.config.get_model_idle_timeout(),
+            memory_budget_mb=self.config.get_model_memory_budget()
+        )
         
         # 初始化变量
         self.audio_file = tk.StringVar()
@@ -103,10 +148,16 @@ class AudioTranscriberGUI:
         self.summary_result = tk.StringVar()
         self.is_folder_mode = tk.BooleanVar(value=False)
         self.enable_summary = tk.BooleanVar(value=True)
+        self.use_vad = tk.BooleanVar(value=False)
+        self.batch_size = tk.IntVar(value=1)
+        self.compute_type = tk.StringVar(value=self.config.get_compute_type() or "自动")
         
         # 初始化转录器和总结器
         self.transcriber = None
+        self.transcriber_key = None
+        self.transcriber_lock = threading.Lock()
         self.summarizer = None
+        self.model_state_var = tk.StringVar(value="模型: 未加载")
         
         # 文件列表和进度跟踪
         self.audio_files = []
@@ -115,16 +166,16 @@ class AudioTranscriberGUI:
         
         # 线程和队列管理
         self.transcription_queue = queue.Queue()
-        self.summary_queue = queue.Queue()
         self.transcription_thread = None
         self.summary_thread = None
         self.stop_threads = False
+        # 每次运行使用新的取消令牌，停止时转录在当前窗口解码完后退出
+        self.cancel_token = CancellationToken()
         
-        # 总结线程池
-        self.summary_threads = []
-        self.max_summary_threads = 20  # 最多支持5个并发总结线程
-        self.summary_thread_pool = queue.Queue(maxsize=self.max_summary_threads)  # 限制并发数
-        self.active_summary_threads = 0
+        # 已提交给总结器、尚未完成的总结 {Future: 音频文件}，总结在总结器的事件循环上并发进行
+        self.summary_futures = {}
+        self.summary_lock = threading.Lock()
+        self.max_summary_connections = 20  # 总结接口连接池大小
         self.summary_results = {}  # 存储总结结果 {文件名: 总结内容}
         
         # 计时相关变量
@@ -134,6 +185,11 @@ class AudioTranscriberGUI:
         self.setup_ui()
         self.load_config()
 
+        # 用户选择文件期间在后台加载并预热模型，之后每次切换模型或精度时重新预热（[model_warmup]关闭时都不加载）
+        self.model_var.trace_add("write", lambda *args: self.start_model_warmup())
+        self.compute_type.trace_add("write", lambda *args: self.start_model_warmup())
+        self.start_model_warmup()
+
         # 重定向控制台输出到日志区域
         self.stream_redirector = StreamRedirector(self.add_log)
         self.stream_redirector.redirect()
@@ -187,8 +243,12 @@ class AudioTranscriberGUI:
         # 状态栏
         self.status_var = tk.StringVar()
         self.status_var.set("就绪")
-        status_bar = ttk.Label(bottom_container, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.pack(fill=tk.X)
+        status_frame = ttk.Frame(bottom_container)
+        status_frame.pack(fill=tk.X)
+        model_state_bar = ttk.Label(status_frame, textvariable=self.model_state_var, relief=tk.SUNKEN, anchor=tk.W)
+        model_state_bar.pack(side=tk.RIGHT)
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
+        status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
     
     def setup_settings_tab(self, parent):
         """设置选项卡"""
@@ -259,6 +319,13 @@ class AudioTranscriberGUI:
         model_info = ttk.Label(model_frame, text="tiny(最快) ← → large(最准确),推荐使用small", foreground="gray")
         model_info.pack(side=tk.LEFT, padx=(10, 0))
 
+        ttk.Checkbutton(model_frame, text="跳过静音", variable=self.use_vad).pack(side=tk.RIGHT)
+        ttk.Combobox(model_frame, textvariable=self.compute_type, values=["自动", "fp32", "bf16", "int8", "fp16"],
+                     state="readonly", width=6).pack(side=tk.RIGHT, padx=(0, 10))
+        ttk.Label(model_frame, text="精度:").pack(side=tk.RIGHT)
+        ttk.Spinbox(model_frame, from_=1, to=64, textvariable=self.batch_size, width=4).pack(side=tk.RIGHT, padx=(0, 10))
+        ttk.Label(model_frame, text="批量解码:").pack(side=tk.RIGHT)
+
         # 是否总结选项（移到API密钥和模板上方）
         summary_frame = ttk.LabelFrame(self.settings_scrollable_frame, text="总结选项", padding="10")
         summary_frame.pack(fill=tk.X, pady=(0, 10), padx=10)
@@ -796,11 +863,36 @@ class AudioTranscriberGUI:
         status_text = f"文件状态: 转录{trans_status}, 总结{sum_status}"
         self.status_var.set(status_text)
         
+        # 没有完整的转录文件时检查是否有未完成的转录检查点；检查点按音频内容哈希查找，
+        # 长录音的哈希要读完整个文件，放到后台线程中计算，不阻塞界面
+        if trans_progress != '100%' and self.transcriber is not None:
+            threading.Thread(target=self._check_checkpoint_status,
+                             args=(self.transcriber, audio_file, sum_status), daemon=True).start()
+        
         # 如果转录和总结都已完成，提示用户
         if trans_progress == '100%' and sum_progress == '100%':
             # 尝试加载已存在的文件
             self.load_existing_files(audio_file, base_name, transcript_dir, summary_dir)
     
+    def _check_checkpoint_status(self, transcriber, audio_file, sum_status):
+        """在后台线程中查找转录检查点，找到时回到主线程更新状态显示"""
+        try:
+            checkpoint = transcriber.checkpoint_info(audio_file)
+        except Exception as e:
+            print(f"检查转录检查点失败: {str(e)}")
+            return
+        if checkpoint is None:
+            return
+        trans_status = f"未完成(已转录至{FileUtils.format_timestamp(checkpoint['resume_at'])}，将从检查点继续)"
+        self.root.after(0, self._show_checkpoint_status, audio_file, trans_status, sum_status)
+    
+    def _show_checkpoint_status(self, audio_file, trans_status, sum_status):
+        """显示检查点查询结果，查询期间已改选其他文件或开始处理时不再覆盖状态"""
+        if (self.is_folder_mode.get() or self.audio_file.get() != audio_file
+                or str(self.start_button['state']) == tk.DISABLED):
+            return
+        self.status_var.set(f"文件状态: 转录{trans_status}, 总结{sum_status}")
+    
     def load_existing_files(self, audio_file, base_name, transcript_dir, summary_dir):
         """加载已存在的转录和总结文件"""
         transcription = None
@@ -1263,23 +1355,39 @@ class AudioTranscriberGUI:
         try:
             # 重置停止标志
             self.stop_threads = False
+            self.cancel_token = CancellationToken()
             
             # 清空队列
             while not self.transcription_queue.empty():
                 self.transcription_queue.get()
-            while not self.summary_queue.empty():
-                self.summary_queue.get()
             
-            # 清空线程池
-            self.summary_threads.clear()
-            self.active_summary_threads = 0
+            # 清空未完成的总结
+            with self.summary_lock:
+                self.summary_futures.clear()
             
-            # 初始化转录器和总结器
-            self.transcriber = WhisperTranscriber(self.model_var.get())
+            # 初始化转录器和总结器，复用后台预热好的转录器（模型由注册表共享，重复运行不会重新加载）
+            self.transcriber = self._get_transcriber()
+            self.transcriber.reset_stop_flag()
+            if self.transcriber.model is not None:
+                self.root.after(0, self.add_log, "使用已预热的模型", "INFO")
+            else:
+                # 模型尚未加载完成（未预热或预热仍在进行），在这里等待加载
+                self.root.after(0, self.model_state_var.set, f"模型: {self.model_var.get()} 加载中(冷)")
+                self.transcriber.load_model()
+                self.root.after(0, self.model_state_var.set,
+                                f"模型: {self.model_var.get()} ({self.transcriber.precision}) 已加载")
             # 使用绝对路径指向prompts目录
             project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
             prompts_dir = os.path.join(project_root, "prompts")
-            self.summarizer = DeepSeekSummarizer(self.api_key.get(), prompts_dir)
+            # 总结器在多次运行之间复用，连接池中的长连接无需重新握手
+            if self.summarizer is None or self.summarizer.api_key != self.api_key.get():
+                if self.summarizer is not None:
+                    self.summarizer.close()
+                self.summarizer = DeepSeekSummarizer(self.api_key.get(), prompts_dir,
+                                                     max_connections=self.max_summary_connections,
+                                                     **self.config.get_summarizer_options())
+            else:
+                self.summarizer.reset_stop_flags()
             
             # 更新状态栏，表示模型初始化完成
             self.root.after(0, lambda: self.status_var.set("模型初始化完成，准备开始转录..."))
@@ -1293,14 +1401,13 @@ class AudioTranscriberGUI:
                 # 单文件模式
                 self.transcription_queue.put((self.audio_file.get(), os.path.basename(self.audio_file.get())))
             
-            # 启动转录线程（CPU密集型）
-            self.transcription_thread = threading.Thread(target=self.transcription_worker, daemon=True)
+            # 启动转录线程（CPU密集型），文件夹模式下可把多个短音频合并成批次解码
+            worker = self.transcription_worker
+            if self.is_folder_mode.get() and self._get_batch_size() > 1:
+                worker = self.batch_transcription_worker
+            self.transcription_thread = threading.Thread(target=worker, daemon=True)
             self.transcription_thread.start()
             
-            # 启动多个总结线程（I/O密集型）
-            # 不预先启动线程，而是在有任务时动态创建
-            self.active_summary_threads = 0
-            
             # 监控线程状态
             self.monitor_threads()
             
@@ -1310,28 +1417,247 @@ class AudioTranscriberGUI:
             self.root.after(0, lambda: self.status_var.set("错误"))
             self.root.after(0, lambda: self.start_button.config(state=tk.NORMAL))
     
-    def transcription_worker(self):
-        """转录工作线程 - 处理CPU密集型任务"""
-        while not self.stop_threads:
+    def _get_transcriber(self):
+        """
+        获取与当前界面设置一致的转录器，设置未变化时复用已有的（可能已在后台预热）实例
+
+        Returns:
+            WhisperTranscriber: 转录器
+        """
+        compute_type = None if self.compute_type.get() == "自动" else self.compute_type.get()
+        key = (self.model_var.get(), compute_type, self.use_vad.get())
+        with self.transcriber_lock:
+            if self.transcriber is not None and self.transcriber_key == key:
+                return self.transcriber
+            if self.transcriber is not None:
+                self.transcriber.close()
+            audio_cache_mb = self.config.get_audio_cache_size_mb()
+            transcript_cache_mb = self.config.get_transcript_cache_size_mb()
+            self.transcriber = WhisperTranscriber(
+                key[0],
+                use_vad=key[2],
+                audio_cache_dir=self.config.get_audio_cache_dir() if audio_cache_mb > 0 else None,
+                audio_cache_size_mb=audio_cache_mb,
+                cache_mel=self.config.get_cache_mel(),
+                metadata_index=self.config.get_metadata_index_file(),
+                transcript_cache_dir=self.config.get_transcript_cache_dir() if transcript_cache_mb > 0 else None,
+                transcript_cache_size_mb=transcript_cache_mb,
+                compute_type=compute_type,
+                quantized_model_dir=self.config.get_quantized_model_dir(),
+                checkpoint_dir=self.config.get_checkpoint_dir() if self.config.get_checkpoint_windows() > 0 else None,
+                checkpoint_windows=self.config.get_checkpoint_windows(),
+                cascade_model=self.config.get_cascade_model(),
+                max_fallbacks=self.config.get_max_fallbacks(),
+                repetition_limit=self.config.get_repetition_limit(),
+                **self.config.get_cascade_thresholds()
+            )
+            self.transcriber_key = key
+            return self.transcriber
+
+    def start_model_warmup(self):
+        """在后台线程中加载当前选择的模型并做一次预热推理，配置中关闭预热时启动和切换模型都不加载"""
+        if not self.model_var.get():
+            return
+        if not self.config.get_model_warmup():
+            self.model_state_var.set(f"模型: {self.model_var.get()} 将在开始时加载")
+            return
+        if self.transcription_thread is not None and self.transcription_thread.is_alive():
+            # 转录进行中不替换正在使用的转录器，新设置在下次开始时生效
+            self.model_state_var.set(f"模型: {self.model_var.get()} 将在下次开始时加载")
+            return
+        threading.Thread(target=self._warmup_worker, daemon=True).start()
+
+    def _warmup_worker(self):
+        """预热线程：结果只在转录器仍是当前设置对应的实例时才显示"""
+        model_name = self.model_var.get()
+        try:
+            transcriber = self._get_transcriber()
+            if transcriber.model is not None:
+                # 已经加载过（如切换回之前的模型），无需再次预热
+                self.root.after(0, self.model_state_var.set, f"模型: {model_name} ({transcriber.precision}) 已就绪")
+                return
+            self.root.after(0, self.model_state_var.set, f"模型: {model_name} 加载中(冷)")
+            load_start = time.time()
+            warmup_seconds = transcriber.warm_up()
+            load_seconds = time.time() - load_start - warmup_seconds
+        except Exception as e:
+            self.root.after(0, self.model_state_var.set, f"模型: {model_name} 加载失败")
+            print(f"预加载模型 {model_name} 失败: {str(e)}")
+            return
+
+        with self.transcriber_lock:
+            superseded = transcriber is not self.transcriber
+        if superseded:
+            # 预热期间设置又被修改，释放这次加载的模型引用
+            transcriber.close()
+        else:
+            self.root.after(0, self.model_state_var.set, f"模型: {model_name} ({transcriber.precision}) 已预热")
+            self.root.after(0, self.add_log,
+                            f"模型 {model_name} 已在后台加载({load_seconds:.1f}秒)并预热({warmup_seconds:.1f}秒)", "INFO")
+
+    def _transcript_dir(self, rel_path):
+        """转录文件目录，保持源文件夹的子目录结构"""
+        output_folder = self.output_folder.get() or self.config.get_output_folder()
+        transcript_dir = os.path.join(output_folder, 'transcripts')
+        # 如果有相对路径的目录部分，则在转录目录下创建相同的子目录结构
+        rel_dir = os.path.dirname(rel_path)
+        if rel_dir:
+            transcript_dir = os.path.join(transcript_dir, rel_dir)
+        return transcript_dir
+
+    def _find_existing_transcript(self, audio_file, rel_path):
+        """
+        查找已有的转录文件，用于断点续传
+
+        Returns:
+            tuple: (转录文件路径, 转录文本)，不存在时返回 (None, None)
+        """
+        base_name = os.path.splitext(os.path.basename(audio_file))[0]
+        transcript_dir = self._transcript_dir(rel_path)
+        if os.path.exists(transcript_dir):
+            # 查找匹配的转录文件
+            for filename in os.listdir(transcript_dir):
+                if filename.startswith(f"{base_name}_转录_") and filename.endswith(".txt"):
+                    potential_file = os.path.join(transcript_dir, filename)
+                    # 如果找到了文件，读取其内容
+                    try:
+                        with open(potential_file, 'r', encoding='utf-8') as f:
+                            transcription = f.read().strip()
+                        if transcription:  # 确保文件不为空
+                            return potential_file, transcription
+                    except Exception:
+                        continue
+        return None, None
+
+    def _new_transcript_file(self, audio_file, rel_path):
+        """为新的转录结果生成文件路径"""
+        transcript_dir = self._transcript_dir(rel_path)
+        os.makedirs(transcript_dir, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(audio_file))[0]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(transcript_dir, f"{sanitize_filename(base_name)}_转录_{timestamp}.txt")
+
+    def _queue_summary(self, audio_file, rel_path, transcription, transcript_file):
+        """转录完成后提交总结，未启用总结时直接标记完成"""
+        if self.enable_summary.get():
             try:
-                # 检查停止标志
+                self._start_summary(audio_file, rel_path, transcription, transcript_file)
+            except Exception as e:
+                self.root.after(0, self.update_file_progress, audio_file, f'错误: {str(e)}', 0, "summary")
+                print(f"总结文件 {audio_file} 时出错: {str(e)}")
+        else:
+            # 未启用总结，直接标记总结完成
+            self.root.after(0, self.update_file_progress, audio_file, '未启用', 100, "summary")
+
+    def _get_batch_size(self):
+        """批量解码的批大小，输入无效时按1处理"""
+        try:
+            return max(1, int(self.batch_size.get()))
+        except (tk.TclError, ValueError):
+            return 1
+
+    def batch_transcription_worker(self):
+        """批量转录工作线程 - 把多个短音频合并成批次解码"""
+        pending = []
+        while not self.transcription_queue.empty():
+            audio_file, rel_path = self.transcription_queue.get_nowait()
+            if audio_file not in self.file_start_times:
+                self.file_start_times[audio_file] = {}
+            self.file_start_times[audio_file]['transcription'] = datetime.now()
+
+            transcript_file, transcription = self._find_existing_transcript(audio_file, rel_path)
+            if transcript_file and transcription:
+                self.root.after(0, self.update_file_progress, audio_file, '转录完成(已存在)', 100, "transcription")
+                self._queue_summary(audio_file, rel_path, transcription, transcript_file)
+            else:
+                self.root.after(0, self.update_file_progress, audio_file, '等待批量解码', 0, "transcription")
+                pending.append((audio_file, rel_path))
+
+        if not pending:
+            return
+
+        rel_paths = dict(pending)
+        finished = set()
+
+        def status_callback(status):
+            self.root.after(0, self.status_var.set, status)
+
+        try:
+            for audio_file, segments, stats in self.transcriber.transcribe_batch(
+                [audio_file for audio_file, _ in pending],
+                batch_size=self._get_batch_size(),
+                status_callback=status_callback,
+                cancel_token=self.cancel_token
+            ):
                 if self.stop_threads:
                     self.add_log("转录工作线程收到停止信号", "WARNING")
                     break
+                rel_path = rel_paths[audio_file]
+                finished.add(audio_file)
+                if segments is None:
+                    self.root.after(0, self.update_file_progress, audio_file, f"错误: {stats.get('error')}", 0,
+                                    "transcription")
+                    continue
+
+                transcript_file = self._new_transcript_file(audio_file, rel_path)
+                writer = FileUtils.open_transcript_writer(transcript_file, self.config.get_segment_formats())
+                try:
+                    for segment in segments:
+                        writer.write_segment(segment)
+                finally:
+                    writer.close()
+                writer.finalize()
+
+                if stats.get('transcript_cache_hit'):
+                    self.root.after(0, self.add_log, f"{os.path.basename(audio_file)}: 转录缓存命中，跳过转录", "INFO")
+                self.root.after(0, self.update_file_progress, audio_file, '转录完成', 100, "transcription")
+                self._queue_summary(audio_file, rel_path, "".join(segment['text'] for segment in segments),
+                                    transcript_file)
+        except Exception as e:
+            self.root.after(0, self.add_log, f"批量转录出错: {str(e)}", "ERROR")
+            for audio_file, _ in pending:
+                if audio_file not in finished:
+                    self.root.after(0, self.update_file_progress, audio_file, f'错误: {str(e)}', 0, "transcription")
 
-                # 检查队列是否为空
-                if self.transcription_queue.empty():
-                    break
+    def _queued_transcriptions(self):
+        """依次取出转录队列中的文件，队列为空或收到停止信号时结束"""
+        while not self.stop_threads:
+            try:
+                yield self.transcription_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _prepare_transcription(self, audio_file_tuple):
+        """预取线程中执行：已有转录文件的跳过，其余提前解码音频并计算特征"""
+        audio_file, rel_path = audio_file_tuple
+        transcript_file, transcription = self._find_existing_transcript(audio_file, rel_path)
+        if transcript_file and transcription:
+            return None
+        return self.transcriber.prepare(audio_file)
 
-                # 从队列获取文件（现在是元组：(完整路径, 相对路径)）
-                audio_file_tuple = self.transcription_queue.get(timeout=0.5)
-                audio_file = audio_file_tuple[0]  # 完整路径
-                rel_path = audio_file_tuple[1]    # 相对路径
+    def transcription_worker(self):
+        """转录工作线程 - 处理CPU密集型任务"""
+        # 转录当前文件时，后续文件的解码和特征计算在后台提前进行
+        prefetch = self.config.get_prefetch_depth()
+        if prefetch > 0:
+            prefetcher = Prefetcher(self._queued_transcriptions(), self._prepare_transcription,
+                                    depth=prefetch, workers=min(prefetch, 2))
+            items = iter(prefetcher)
+        else:
+            prefetcher = None
+            items = ((item, None, None) for item in self._queued_transcriptions())
 
-                # 再次检查停止标志
+        for audio_file_tuple, prepared, prepare_error in items:
+            audio_file = audio_file_tuple[0]  # 完整路径
+            rel_path = audio_file_tuple[1]    # 相对路径
+            try:
+                # 检查停止标志
                 if self.stop_threads:
                     self.add_log("转录工作线程收到停止信号", "WARNING")
                     break
+                # 预取时的解码错误按单个文件失败处理
+                if prepare_error is not None:
+                    raise prepare_error
                 
                 # 记录转录开始时间
                 if audio_file not in self.file_start_times:
@@ -1339,61 +1665,22 @@ class AudioTranscriberGUI:
                 self.file_start_times[audio_file]['transcription'] = datetime.now()
                 
                 # 检查转录文件是否已存在
-                output_folder = self.output_folder.get() or self.config.get_output_folder()
-                base_name = os.path.splitext(os.path.basename(audio_file))[0]
-
-                # 查找最新的转录文件（考虑子目录结构）
-                transcript_dir = os.path.join(output_folder, 'transcripts')
-                # 如果有相对路径的目录部分，则在转录目录下创建相同的子目录结构
-                rel_dir = os.path.dirname(rel_path)
-                if rel_dir:
-                    transcript_dir = os.path.join(transcript_dir, rel_dir)
-
-                transcript_file = None
-                transcription = None
-
-                if os.path.exists(transcript_dir):
-                    # 查找匹配的转录文件
-                    for filename in os.listdir(transcript_dir):
-                        if filename.startswith(f"{base_name}_转录_") and filename.endswith(".txt"):
-                            potential_file = os.path.join(transcript_dir, filename)
-                            # 如果找到了文件，读取其内容
-                            try:
-                                with open(potential_file, 'r', encoding='utf-8') as f:
-                                    transcription = f.read().strip()
-                                if transcription:  # 确保文件不为空
-                                    transcript_file = potential_file
-                                    break
-                            except Exception:
-                                continue
+                transcript_file, transcription = self._find_existing_transcript(audio_file, rel_path)
                 
                 if transcript_file and transcription:
                     # 转录文件已存在，跳过转录步骤
                     self.root.after(0, self.update_file_progress, audio_file, '转录完成(已存在)', 100, "transcription")
-
-                    # 如果启用总结功能，将结果放入总结队列
-                    if self.enable_summary.get():
-                        self.summary_queue.put({
-                            'audio_file': audio_file,
-                            'rel_path': rel_path,
-                            'transcription': transcription,
-                            'transcript_file': transcript_file
-                        })
-
-                        # 动态创建总结线程（使用线程锁避免竞争条件）
-                        if self.active_summary_threads < self.max_summary_threads:
-                            self.summary_thread_pool.put_nowait(True)  # 标记线程槽位被占用
-                            summary_thread = threading.Thread(target=self.summary_worker, daemon=True)
-                            summary_thread.start()
-                            self.summary_threads.append(summary_thread)
-                            self.active_summary_threads += 1
-                    else:
-                        # 未启用总结，直接标记总结完成
-                        self.root.after(0, self.update_file_progress, audio_file, '未启用', 100, "summary")
+                    self._queue_summary(audio_file, rel_path, transcription, transcript_file)
                 else:
-                    # 需要进行转录
-                    # 更新状态
-                    self.root.after(0, self.update_file_progress, audio_file, '转录中', 0, "transcription")
+                    # 需要进行转录；有未完成的检查点时转录器会从检查点继续
+                    checkpoint = self.transcriber.checkpoint_info(audio_file)
+                    if checkpoint is not None:
+                        self.root.after(0, self.add_log,
+                                        f"{os.path.basename(audio_file)}: 发现未完成的转录，从 "
+                                        f"{FileUtils.format_timestamp(checkpoint['resume_at'])} 继续", "INFO")
+                        self.root.after(0, self.update_file_progress, audio_file, '从检查点继续', 0, "transcription")
+                    else:
+                        self.root.after(0, self.update_file_progress, audio_file, '转录中', 0, "transcription")
 
                     # 定义进度回调函数
                     def progress_callback(progress):
@@ -1405,179 +1692,192 @@ class AudioTranscriberGUI:
                         # 更新状态栏
                         self.root.after(0, self.status_var.set, status)
 
-                    transcription = self.transcriber.transcribe(
-                        audio_file,
-                        progress_callback=progress_callback,
-                        status_callback=status_callback
-                    )
-
-                    # 立即保存转录文件
-
-                    # 获取输出文件夹
-                    output_folder = self.output_folder.get() or self.config.get_output_folder()
-
-                    # 创建转录目录
-                    transcript_dir = os.path.join(output_folder, 'transcripts')
-
-                    # 获取相对路径的目录部分
-                    rel_dir = os.path.dirname(rel_path)
+                    transcript_file = self._new_transcript_file(audio_file, rel_path)
 
-                    # 如果有相对路径的目录部分，则在转录目录下创建相同的子目录结构
-                    if rel_dir:
-                        transcript_dir = os.path.join(transcript_dir, rel_dir)
-
-                    os.makedirs(transcript_dir, exist_ok=True)
-
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    safe_base_name = sanitize_filename(base_name)
-                    transcript_file = os.path.join(transcript_dir, f"{safe_base_name}_转录_{timestamp}.txt")
+                    # 边转录边保存：每个片段解码后立即追加到转录文件，并在日志中实时显示
+                    stats = {}
+                    texts = []
+                    writer = FileUtils.open_transcript_writer(transcript_file, self.config.get_segment_formats())
+                    try:
+                        for segment in self.transcriber.transcribe_iter(
+                            audio_file,
+                            progress_callback=progress_callback,
+                            status_callback=status_callback,
+                            stats=stats,
+                            prepared=prepared,
+                            cancel_token=self.cancel_token
+                        ):
+                            writer.write_segment(segment)
+                            texts.append(segment['text'])
+                            line = (f"[{FileUtils.format_timestamp(segment['start'])} --> "
+                                    f"{FileUtils.format_timestamp(segment['end'])}] {segment['text'].strip()}")
+                            self.root.after(0, self.add_log, line, "INFO")
+                    finally:
+                        writer.close()
+
+                    if stats.get('stopped'):
+                        # 被用户中断，保留 .part 文件中的部分结果
+                        self.root.after(0, self.add_log,
+                                        f"{os.path.basename(audio_file)}: 已停止，保留至 "
+                                        f"{FileUtils.format_timestamp(stats['stopped_at'])} 的部分转录", "WARNING")
+                        continue
 
-                    # 保存转录文本
-                    with open(transcript_file, 'w', encoding='utf-8') as f:
-                        f.write(transcription)
+                    transcription = "".join(texts)
+                    writer.finalize()
+                    if 'resumed_from' in stats:
+                        # 检查点中的片段已写入新的转录文件，之前中断留下的 .part 文件不再需要
+                        FileUtils.remove_stale_parts(transcript_file)
+                    if stats.get('transcript_cache_hit'):
+                        self.root.after(0, self.add_log, f"{os.path.basename(audio_file)}: 转录缓存命中，跳过转录", "INFO")
+                    if 'rtf' in stats:
+                        self.root.after(0, self.add_log,
+                                        f"{os.path.basename(audio_file)}: 计算精度 {stats['compute_type']}，"
+                                        f"实时率(RTF) {stats['rtf']:.3f}", "INFO")
+                    if 'skipped_seconds' in stats:
+                        self.root.after(0, self.add_log,
+                                        f"{os.path.basename(audio_file)}: 语音检测跳过 {stats['skipped_seconds']:.1f}秒 "
+                                        f"({stats['skipped_ratio']:.1%})", "INFO")
+                    if stats.get('fallback_decodes') or stats.get('aborted_windows'):
+                        self.root.after(0, self.add_log,
+                                        f"{os.path.basename(audio_file)}: 温度回退重新解码 {stats['fallback_decodes']} 次，"
+                                        f"中止重复循环窗口 {stats['aborted_windows']} 个", "INFO")
+                    if 'cascade_windows' in stats:
+                        line = (f"{os.path.basename(audio_file)}: 级联转录 {stats['cascade_escalated_ratio']:.1%} "
+                                f"的音频升级到 {stats['cascade_model']}")
+                        if 'cascade_speedup' in stats:
+                            line += f"，相对全程使用大模型约加速 {stats['cascade_speedup']:.2f} 倍"
+                        self.root.after(0, self.add_log, line, "INFO")
 
                     # 更新状态为转录完成
                     self.root.after(0, self.update_file_progress, audio_file, '转录完成', 100, "transcription")
+                    self._queue_summary(audio_file, rel_path, transcription, transcript_file)
 
-                    # 如果启用总结功能，将结果放入总结队列
-                    if self.enable_summary.get():
-                        self.summary_queue.put({
-                            'audio_file': audio_file,
-                            'rel_path': rel_path,
-                            'transcription': transcription,
-                            'transcript_file': transcript_file
-                        })
-
-                        # 动态创建总结线程（使用线程锁避免竞争条件）
-                        if self.active_summary_threads < self.max_summary_threads:
-                            self.summary_thread_pool.put_nowait(True)  # 标记线程槽位被占用
-                            summary_thread = threading.Thread(target=self.summary_worker, daemon=True)
-                            summary_thread.start()
-                            self.summary_threads.append(summary_thread)
-                            self.active_summary_threads += 1
-                    else:
-                        # 未启用总结，直接标记总结完成
-                        self.root.after(0, self.update_file_progress, audio_file, '未启用', 100, "summary")
-
-            except queue.Empty:
-                continue
             except Exception as e:
                 # 更新状态为错误
                 self.root.after(0, self.update_file_progress, audio_file, f'错误: {str(e)}', 0, "transcription")
                 print(f"转录文件 {audio_file} 时出错: {str(e)}")
-    
-    def summary_worker(self):
-        """总结工作线程 - 处理I/O密集型任务"""
-        while not self.stop_threads:
-            try:
-                # 如果未启用总结功能，直接退出
-                if not self.enable_summary.get():
-                    break
-
-                # 检查停止标志
-                if self.stop_threads:
-                    self.add_log("总结工作线程收到停止信号", "WARNING")
-                    break
-
-                # 从队列获取转录结果
-                item = self.summary_queue.get(timeout=0.5)
-                audio_file = item['audio_file']
-                rel_path = item['rel_path']  # 获取相对路径
-                transcription = item['transcription']
-                transcript_file = item.get('transcript_file', '')
-                
-                # 记录总结开始时间
-                if audio_file not in self.file_start_times:
-                    self.file_start_times[audio_file] = {}
-                self.file_start_times[audio_file]['summary'] = datetime.now()
-                
-                # 检查总结文件是否已存在
-                output_folder = self.output_folder.get() or self.config.get_output_folder()
-                base_name = os.path.splitext(os.path.basename(audio_file))[0]
-                
-                # 获取输出文件夹
-                output_folder = self.output_folder.get() or self.config.get_output_folder()
-                
-                # 创建总结目录
-                summary_dir = os.path.join(output_folder, 'summaries')
-                
-                # 获取相对路径的目录部分
-                rel_dir = os.path.dirname(rel_path)
-                
-                # 如果有相对路径的目录部分，则在总结目录下创建相同的子目录结构
-                if rel_dir:
-                    summary_dir = os.path.join(summary_dir, rel_dir)
-                
-                summary_file = None
-                summary = None
-                
-                if os.path.exists(summary_dir):
-                    # 查找匹配的总结文件
-                    for filename in os.listdir(summary_dir):
-                        if filename.startswith(f"{base_name}_总结") and filename.endswith(".md"):
-                            potential_file = os.path.join(summary_dir, filename)
-                            try:
-                                with open(potential_file, 'r', encoding='utf-8') as f:
-                                    summary = f.read().strip()
-                                if summary:  # 确保文件不为空
-                                    summary_file = potential_file
-                                    break
-                            except Exception:
-                                continue
-                
-                if summary_file and summary:
-                    # 总结文件已存在，跳过总结步骤
-                    self.root.after(0, self.update_file_progress, audio_file, '总结完成(已存在)', 100, "summary")
-
-                    # 处理结果
-                    if self.is_folder_mode.get():
-                        self._save_batch_result(audio_file, rel_path, transcription, summary, transcript_file)
-                    else:
-                        self._display_single_result(audio_file, transcription, summary, transcript_file, rel_path)
-                else:
-                    # 需要进行总结
-                    # 更新状态
-                    status_text = f'总结中 ({os.path.basename(transcript_file) if transcript_file else ""})'
-                    self.root.after(0, self.update_file_progress, audio_file, status_text, 0, "summary")
-
-                    # 生成总结
-                    audio_title = FileUtils.get_audio_title(audio_file)
-                    summary = self.summarizer.summarize(transcription, audio_title, self.template_var.get())
-
-                    # 处理结果
-                    if self.is_folder_mode.get():
-                        self._save_batch_result(audio_file, rel_path, transcription, summary, transcript_file)
-                    else:
-                        self._display_single_result(audio_file, transcription, summary, transcript_file, rel_path)
-
-                # 标记任务完成，从线程池中释放槽位
-                try:
-                    self.summary_thread_pool.get_nowait()
-                except queue.Empty:
-                    pass
-
-            except queue.Empty:
-                # 队列为空，检查是否应该退出
-                # 如果转录队列也为空且转录线程已完成，则退出
-                if self.transcription_queue.empty() and (not self.transcription_thread or not self.transcription_thread.is_alive()):
-                    # 队列为空且没有更多转录任务，线程退出
-                    break
-                continue
-
-            except Exception as e:
-                self.root.after(0, self.update_file_progress, audio_file, f'错误: {str(e)}', 0, "summary")
-                print(f"总结文件 {audio_file} 时出错: {str(e)}")
 
-                # 标记任务完成，从线程池中释放槽位
-                try:
-                    self.summary_thread_pool.get_nowait()
-                except queue.Empty:
-                    pass
-
-        # 线程退出时减少活跃线程计数
-        self.active_summary_threads -= 1
+        if prefetcher is not None:
+            prefetcher.close()
+            prefetch_stats = prefetcher.stats()
+            if prefetch_stats['items']:
+                self.root.after(0, self.add_log,
+                                f"后台预取: {prefetch_stats['items']}个文件，模型累计等待数据 "
+                                f"{prefetch_stats['stall_seconds']:.1f}秒，平均就绪 "
+                                f"{prefetch_stats['avg_queue_depth']:.1f}个", "INFO")
+    
+    def _find_existing_summary(self, audio_file, rel_path):
+        """查找已存在的非空总结文件，返回 (文件路径, 总结内容)，不存在时返回 (None, None)"""
+        base_name = os.path.splitext(os.path.basename(audio_file))[0]
+        
+        # 获取输出文件夹
+        output_folder = self.output_folder.get() or self.config.get_output_folder()
+        
+        # 创建总结目录
+        summary_dir = os.path.join(output_folder, 'summaries')
+        
+        # 获取相对路径的目录部分
+        rel_dir = os.path.dirname(rel_path)
+        
+        # 如果有相对路径的目录部分，则在总结目录下创建相同的子目录结构
+        if rel_dir:
+            summary_dir = os.path.join(summary_dir, rel_dir)
+        
+        if os.path.exists(summary_dir):
+            # 查找匹配的总结文件
+            for filename in os.listdir(summary_dir):
+                if filename.startswith(f"{base_name}_总结") and filename.endswith(".md"):
+                    potential_file = os.path.join(summary_dir, filename)
+                    try:
+                        with open(potential_file, 'r', encoding='utf-8') as f:
+                            summary = f.read().strip()
+                        if summary:  # 确保文件不为空
+                            return potential_file, summary
+                    except Exception:
+                        continue
+        return None, None
+
+    def _start_summary(self, audio_file, rel_path, transcription, transcript_file):
+        """开始总结一个文件：总结已存在时直接使用，否则提交给总结器，不等待结果"""
+        # 记录总结开始时间
+        if audio_file not in self.file_start_times:
+            self.file_start_times[audio_file] = {}
+        self.file_start_times[audio_file]['summary'] = datetime.now()
+        
+        if not transcription.strip():
+            # 没有检测到语音的文件不调用总结接口，总结文件中写明未检测到语音
+            self.root.after(0, self.add_log, f"{os.path.basename(audio_file)} 未检测到语音，跳过总结", "INFO")
+            self._handle_summary_result(audio_file, rel_path, transcription, NO_SPEECH_SUMMARY, transcript_file)
+            return
+        
+        summary_file, summary = self._find_existing_summary(audio_file, rel_path)
+        if summary_file and summary:
+            # 总结文件已存在，跳过总结步骤
+            self.root.after(0, self.update_file_progress, audio_file, '总结完成(已存在)', 100, "summary")
+            self._handle_summary_result(audio_file, rel_path, transcription, summary, transcript_file)
+            return
+        
+        # 需要进行总结
+        # 更新状态
+        status_text = f'总结中 ({os.path.basename(transcript_file) if transcript_file else ""})'
+        self.root.after(0, self.update_file_progress, audio_file, status_text, 0, "summary")
+        
+        # 流式总结时边生成边写入总结文件，并按行输出到日志
+        summary_writer = None
+        log_stream = None
+        if self.summarizer.stream:
+            output_folder = self.output_folder.get() or self.config.get_output_folder()
+            summary_writer = SummaryStreamWriter(self._summary_file_path(audio_file, output_folder, rel_path),
+                                                 audio_file)
+            log_stream = SummaryLogStream(self.root, self.add_log, audio_file, summary_writer)
+        
+        audio_title = FileUtils.get_audio_title(audio_file)
+        metrics = {}
+        future = self.summarizer.submit(transcription, audio_title, self.template_var.get(),
+                                        on_token=log_stream, metrics=metrics)
+        with self.summary_lock:
+            self.summary_futures[future] = audio_file
+        future.add_done_callback(
+            lambda done: self._on_summary_done(done, audio_file, rel_path, transcription, transcript_file,
+                                               summary_writer, log_stream, metrics))
+    
+    def _on_summary_done(self, future, audio_file, rel_path, transcription, transcript_file,
+                         summary_writer=None, log_stream=None, metrics=None):
+        """总结完成的回调，在总结器的事件循环线程中执行，只保存结果和更新界面"""
+        with self.summary_lock:
+            # 停止时已被清空的总结不再处理，流式写入的部分总结保留在 .part 文件中
+            if self.summary_futures.pop(future, None) is None or future.cancelled():
+                if summary_writer is not None:
+                    summary_writer.close()
+                return
+        try:
+            summary = future.result()
+            if log_stream is not None:
+                log_stream.flush()
+            if metrics and metrics.get('summary_cache_hit'):
+                self.root.after(0, self.add_log, f"{os.path.basename(audio_file)} 总结缓存命中", "INFO")
+            elif metrics and 'summary_ttft_seconds' in metrics:
+                self.root.after(0, self.add_log,
+                                f"{os.path.basename(audio_file)} 总结: 首个token {metrics['summary_ttft_seconds']:.2f}秒，"
+                                f"{metrics['summary_tokens']}个token，{metrics['summary_tokens_per_second']:.1f} token/秒",
+                                "INFO")
+            self._handle_summary_result(audio_file, rel_path, transcription, summary, transcript_file, summary_writer)
+        except Exception as e:
+            if summary_writer is not None:
+                summary_writer.close()
+            self.root.after(0, self.update_file_progress, audio_file, f'错误: {str(e)}', 0, "summary")
+            print(f"总结文件 {audio_file} 时出错: {str(e)}")
+    
+    def _handle_summary_result(self, audio_file, rel_path, transcription, summary, transcript_file,
+                               summary_writer=None):
+        """处理总结结果：文件夹模式保存文件，单文件模式显示结果"""
+        if self.is_folder_mode.get():
+            self._save_batch_result(audio_file, rel_path, transcription, summary, transcript_file, summary_writer)
+        else:
+            self._display_single_result(audio_file, transcription, summary, transcript_file, rel_path,
+                                        summary_writer)
     
-    def _save_batch_result(self, audio_file, rel_path, transcription, summary, transcript_file):
+    def _save_batch_result(self, audio_file, rel_path, transcription, summary, transcript_file, summary_writer=None):
         """保存批量处理结果 - 保持源文件夹结构"""
         # 创建保持源文件夹结构的输出路径
         # 获取相对路径的目录部分
@@ -1603,18 +1903,19 @@ class AudioTranscriberGUI:
         
         if not summary_exists:
             # 只保存总结文件
-            summary_file = self._save_summary_only(audio_file, summary, output_folder, rel_path)
+            summary_file = self._save_summary_only(audio_file, summary, output_folder, rel_path, summary_writer)
             status_text = f'完成 (转录:{os.path.basename(transcript_file) if transcript_file else "无"}, 总结:{os.path.basename(summary_file)})'
         else:
             # 总结文件已存在
+            if summary_writer is not None:
+                summary_writer.close()
             status_text = f'完成 (转录:{os.path.basename(transcript_file) if transcript_file else "无"}, 总结:已存在)'
         
         self.root.after(0, self.update_file_progress, audio_file, '总结完成', 100, "summary")
     
-    def _save_summary_only(self, audio_file, summary, output_folder, rel_path=None):
-        """只保存总结文件 - 保持源文件夹结构"""
+    def _summary_file_path(self, audio_file, output_folder, rel_path=None):
+        """总结文件路径 - 保持源文件夹结构"""
         base_name = os.path.splitext(os.path.basename(audio_file))[0]
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # 创建保持源文件夹结构的输出路径
         summary_dir = os.path.normpath(os.path.join(output_folder, 'summaries'))
@@ -1628,16 +1929,16 @@ class AudioTranscriberGUI:
         # 确保目录存在
         os.makedirs(summary_dir, exist_ok=True)
         
-        # 保存总结文本 - 修改为.md格式
+        # 总结文本使用.md格式
         safe_base_name = sanitize_filename(base_name)
-        summary_file = os.path.normpath(os.path.join(summary_dir, f"{safe_base_name}_总结.md"))
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            # 使用Markdown格式
-            f.write(f"# {base_name}\n\n")
-            f.write(f"**音频文件:** {audio_file}\n\n")
-            f.write(f"**处理时间:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write("## 总结内容\n\n")
-            f.write(summary)
+        return os.path.normpath(os.path.join(summary_dir, f"{safe_base_name}_总结.md"))
+    
+    def _save_summary_only(self, audio_file, summary, output_folder, rel_path=None, summary_writer=None):
+        """只保存总结文件 - 保持源文件夹结构，流式总结时完成已增量写入的文件"""
+        if summary_writer is None:
+            summary_writer = SummaryStreamWriter(self._summary_file_path(audio_file, output_folder, rel_path),
+                                                 audio_file)
+        summary_file = summary_writer.finalize(summary)
         
         # 更新进度字典中的文件状态
         if audio_file in self.file_progress:
@@ -1655,7 +1956,8 @@ class AudioTranscriberGUI:
         
         return summary_file
     
-    def _display_single_result(self, audio_file, transcription, summary, transcript_file, rel_path=None):
+    def _display_single_result(self, audio_file, transcription, summary, transcript_file, rel_path=None,
+                               summary_writer=None):
         """显示单文件结果"""
         # 在日志中显示结果摘要
         audio_name = os.path.basename(audio_file)
@@ -1681,9 +1983,11 @@ class AudioTranscriberGUI:
 
         if not summary_exists:
             # 保存总结文件
-            self._save_summary_only(audio_file, summary, output_folder, rel_path)
+            self._save_summary_only(audio_file, summary, output_folder, rel_path, summary_writer)
             self.root.after(0, lambda: self.add_log(f"  总结文件已保存", "SUCCESS"))
         else:
+            if summary_writer is not None:
+                summary_writer.close()
             self.root.after(0, lambda: self.add_log(f"  总结文件已存在", "WARNING"))
 
         self.root.after(0, self.update_file_progress, audio_file, '总结完成', 100, "summary")
@@ -1699,18 +2003,14 @@ class AudioTranscriberGUI:
             if self.transcription_thread and not self.transcription_thread.is_alive():
                 self.transcription_thread = None
 
-            # 检查总结线程
-            active_threads = []
-            for thread in self.summary_threads:
-                if thread.is_alive():
-                    active_threads.append(thread)
-            self.summary_threads = active_threads
+            # 检查未完成的总结
+            with self.summary_lock:
+                pending_summaries = len(self.summary_futures)
 
-            # 如果所有线程都完成，更新状态
+            # 如果转录和总结都完成，更新状态
             if (self.transcription_thread is None and
-                len(self.summary_threads) == 0 and
-                self.transcription_queue.empty() and
-                self.summary_queue.empty()):
+                pending_summaries == 0 and
+                self.transcription_queue.empty()):
 
                 self.status_var.set("处理完成")
                 self.start_button.config(state=tk.NORMAL)
@@ -1742,22 +2042,35 @@ class AudioTranscriberGUI:
         self.status_var.set("正在停止...")
         self.stop_button.config(state=tk.DISABLED)
 
-        # 通知转录器停止（如果支持）
-        if self.transcriber and hasattr(self.transcriber, 'stop'):
-            self.transcriber.stop()
+        # 取消本次运行的令牌，转录在当前窗口解码完后停止
+        self.cancel_token.cancel()
 
         # 通知总结器停止（如果支持）
         if self.summarizer and hasattr(self.summarizer, 'stop'):
             self.summarizer.stop()
 
-        # 等待转录线程结束（短超时，快速响应）
+        # 转录线程最多再解码一个窗口，不阻塞界面，轮询等待它退出后再重置状态
+        if self.transcription_thread and self.transcription_thread.is_alive():
+            self.status_var.set("正在停止，等待当前窗口解码完成...")
+            self.root.after(200, self._wait_for_transcription_stop)
+            return
+        self._finish_stop()
+
+    def _wait_for_transcription_stop(self):
+        """轮询转录线程，退出后完成停止流程"""
         if self.transcription_thread and self.transcription_thread.is_alive():
-            self.transcription_thread.join(timeout=1)
+            self.root.after(200, self._wait_for_transcription_stop)
+            return
+        self._finish_stop()
 
-        # 等待所有总结线程结束（短超时，快速响应）
-        for thread in self.summary_threads:
-            if thread.is_alive():
-                thread.join(timeout=1)
+    def _finish_stop(self):
+        """转录线程退出后清理队列和状态"""
+        # 丢弃未完成的总结，总结器已通过取消令牌中断了它们的请求，无需等待
+        with self.summary_lock:
+            pending = list(self.summary_futures)
+            self.summary_futures.clear()
+        for future in pending:
+            future.cancel()
 
         # 清空队列
         while not self.transcription_queue.empty():
@@ -1766,22 +2079,11 @@ class AudioTranscriberGUI:
             except queue.Empty:
                 break
 
-        while not self.summary_queue.empty():
-            try:
-                self.summary_queue.get_nowait()
-            except queue.Empty:
-                break
-
         # 重置状态
         self.stop_threads = False
         self.transcription_thread = None
-        self.summary_threads = []
-        self.active_summary_threads = 0
-
-        # 重置转录器和总结器的停止标志
-        if self.transcriber and hasattr(self.transcriber, 'reset_stop_flag'):
-            self.transcriber.reset_stop_flag()
 
+        # 重置总结器的停止标志，转录器的令牌在下次开始时重新创建
         if self.summarizer and hasattr(self.summarizer, 'reset_stop_flags'):
             self.summarizer.reset_stop_flags()
 
@@ -1799,8 +2101,6 @@ class AudioTranscriberGUI:
 
         # 重置线程相关变量
         self.transcription_thread = None
-        self.summary_threads = []
-        self.active_summary_threads = 0
 
         # 重置计时变量
         self.file_start_times = {}
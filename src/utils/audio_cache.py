@@ -0,0 +1,177 @@
+import os
+import threading
+import uuid
+
+import numpy as np
+
+from src.utils.file_utils import FileUtils
+
+
+class AudioCache:
+    """按内容哈希索引的解码音频缓存
+
+    把ffmpeg解码得到的16kHz单声道float32 PCM（以及可选的log-mel特征）保存为 .npy 文件，
+    读取时通过 np.load(mmap_mode='r') 内存映射，重复处理同一音频时既不必重新解码，
+    也不会在内存中再保留一份副本。缓存总大小超过上限时按最近访问时间淘汰。
+    """
+
+    def __init__(self, cache_dir, max_size_mb=4096, cache_mel=False):
+        """
+        初始化音频缓存
+
+        Args:
+            cache_dir (str): 缓存目录
+            max_size_mb (float): 缓存大小上限（MB）
+            cache_mel (bool): 是否同时缓存log-mel特征
+        """
+        self.cache_dir = cache_dir
+        self.max_size_mb = max_size_mb
+        self.cache_mel = cache_mel
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def file_key(self, audio_file):
+        """
+        获取音频文件的内容哈希
+
+        Args:
+            audio_file (str): 音频文件路径
+
+        Returns:
+            str: 内容哈希
+        """
+        return FileUtils.get_content_hash(audio_file)
+
+    def _entry_path(self, key, kind):
+        return os.path.join(self.cache_dir, f"{key}.{kind}.npy")
+
+    def _load(self, path):
+        """内存映射读取缓存项，并刷新其访问时间用于LRU淘汰"""
+        try:
+            array = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return array
+
+    def _store(self, path, array):
+        """原子写入缓存项后以内存映射方式重新打开，缓存项已被其他进程淘汰时直接返回内存中的数组"""
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+        try:
+            return np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return array
+
+    def _count(self, hit):
+        """记录一次命中或未命中，预取线程会同时访问缓存"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_audio(self, audio_file, decode):
+        """
+        获取解码后的音频，未命中时调用decode解码并写入缓存
+
+        Args:
+            audio_file (str): 音频文件路径
+            decode (callable): 解码函数，接收文件路径返回16kHz float32数组
+
+        Returns:
+            np.ndarray: 只读的内存映射数组
+        """
+        path = self._entry_path(self.file_key(audio_file), "pcm")
+        array = self._load(path) if os.path.exists(path) else None
+        if array is not None:
+            self._count(hit=True)
+            print(f"音频缓存命中: {os.path.basename(audio_file)}")
+            return array
+
+        self._count(hit=False)
+        return self._store(path, decode(audio_file))
+
+    def get_mel(self, audio_file, n_mels, compute):
+        """
+        获取log-mel特征，未命中时调用compute计算并写入缓存
+
+        Args:
+            audio_file (str): 音频文件路径
+            n_mels (int): mel通道数，不同模型可能不同
+            compute (callable): 计算函数，无参数，返回形如 (n_mels, 帧数) 的数组
+
+        Returns:
+            np.ndarray: 只读的内存映射数组
+        """
+        path = self._entry_path(self.file_key(audio_file), f"mel{n_mels}")
+        array = self._load(path) if os.path.exists(path) else None
+        if array is not None:
+            self._count(hit=True)
+            return array
+
+        self._count(hit=False)
+        return self._store(path, compute())
+
+    def size_mb(self):
+        """当前缓存占用的磁盘空间（MB）"""
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                total += entry.stat().st_size
+        return total / (1024 * 1024)
+
+    def _evict(self, keep=None):
+        """
+        按最近访问时间淘汰缓存项，直到总大小不超过上限
+
+        Args:
+            keep (str): 刚写入的缓存项，即使单独超出上限或最久未访问也不淘汰，调用方还要打开它
+        """
+        if self.max_size_mb is None:
+            return
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith(".npy"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # 其他进程同时在淘汰
+                    continue
+                total += stat.st_size
+                if entry.path != keep:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            limit = self.max_size_mb * 1024 * 1024
+            for _, size, path in sorted(entries):
+                if total <= limit:
+                    break
+                try:
+                    # Windows上正被内存映射的文件无法删除，跳过即可
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    continue
+
+    def stats(self):
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 命中/未命中次数和磁盘占用
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {'hits': hits, 'misses': misses, 'size_mb': round(self.size_mb(), 1)}
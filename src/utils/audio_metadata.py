@@ -0,0 +1,419 @@
+import os
+import json
+import struct
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# MPEG音频帧头中的比特率表（kbps），按 (版本类别, 层) 索引，版本类别1为MPEG-1，2为MPEG-2/2.5
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# 采样率表，按帧头中的版本位索引：0为MPEG-2.5，2为MPEG-2，3为MPEG-1
+_MP3_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+# 在文件开头搜索第一个MP3帧的最大字节数
+_MP3_SYNC_SEARCH = 64 * 1024
+
+
+def _skip_id3v2(f):
+    """跳过文件开头的ID3v2标签，返回音频数据的起始偏移"""
+    f.seek(0)
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b'ID3':
+        # 标签大小为4个7位的synchsafe整数
+        size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        footer = 10 if header[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _parse_wav(f, file_size):
+    """解析RIFF/WAVE文件头"""
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+
+    fmt = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+        if chunk_id == b'fmt ':
+            data = f.read(chunk_size)
+            if len(data) < 16:
+                return None
+            fmt = struct.unpack('<HHIIHH', data[:16])
+            if chunk_size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            audio_format, channels, sample_rate, byte_rate, _, bits = fmt
+            if byte_rate == 0:
+                return None
+            # 流式写入的文件可能没有回填data块大小，按实际文件长度估算
+            if chunk_size in (0, 0xFFFFFFFF):
+                chunk_size = file_size - f.tell()
+            chunk_size = min(chunk_size, file_size - f.tell())
+            if audio_format == 3:
+                codec = f"pcm_f{bits}le"
+            elif bits == 8:
+                codec = "pcm_u8"
+            else:
+                codec = f"pcm_s{bits}le"
+            return {
+                'duration': chunk_size / byte_rate,
+                'sample_rate': sample_rate,
+                'channels': channels,
+                'codec': codec
+            }
+        else:
+            # 块按2字节对齐
+            f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+
+def _parse_flac(f):
+    """解析FLAC的STREAMINFO元数据块"""
+    f.seek(_skip_id3v2(f))
+    if f.read(4) != b'fLaC':
+        return None
+    block_header = f.read(4)
+    if len(block_header) < 4 or block_header[0] & 0x7F != 0:
+        return None  # 第一个元数据块必须是STREAMINFO
+    info = f.read(34)
+    if len(info) < 18:
+        return None
+    # 字节10起：采样率20位、声道数-1 3位、位深-1 5位、总采样数36位
+    packed = int.from_bytes(info[10:18], 'big')
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x07) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if sample_rate == 0 or total_samples == 0:
+        return None
+    return {
+        'duration': total_samples / sample_rate,
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'codec': 'flac'
+    }
+
+
+def _parse_mp3_header(header):
+    """解析4字节MPEG音频帧头，无效时返回None"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits
+    version_class = 1 if version_bits == 3 else 2
+    bitrate = _MP3_BITRATES[(version_class, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (header[2] >> 1) & 0x01
+    mono = (header[3] >> 6) == 3
+
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or version_class == 1:
+        samples_per_frame = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    else:
+        samples_per_frame = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+
+    return {
+        'version_class': version_class,
+        'layer': layer,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'channels': 1 if mono else 2,
+        'samples_per_frame': samples_per_frame,
+        'frame_length': frame_length
+    }
+
+
+def _parse_mp3(f, file_size):
+    """解析MP3：优先读取Xing/Info/VBRI头中的帧数，否则按恒定比特率估算"""
+    audio_start = _skip_id3v2(f)
+    f.seek(audio_start)
+    data = f.read(_MP3_SYNC_SEARCH)
+
+    frame = None
+    offset = 0
+    while offset < len(data) - 4:
+        offset = data.find(b'\xFF', offset)
+        if offset < 0 or offset > len(data) - 4:
+            return None
+        frame = _parse_mp3_header(data[offset:offset + 4])
+        if frame is not None:
+            # 用下一帧的同步字确认不是误匹配
+            next_offset = offset + frame['frame_length']
+            if next_offset + 4 > len(data) or _parse_mp3_header(data[next_offset:next_offset + 4]) is not None:
+                break
+        frame = None
+        offset += 1
+    if frame is None:
+        return None
+
+    # Xing/Info头位于边信息之后，VBRI头固定在帧头后32字节
+    if frame['version_class'] == 1:
+        side_info = 17 if frame['channels'] == 1 else 32
+    else:
+        side_info = 9 if frame['channels'] == 1 else 17
+    frame_data = data[offset:offset + frame['frame_length']]
+    frame_count = None
+    xing = frame_data[4 + side_info:4 + side_info + 12]
+    if xing[:4] in (b'Xing', b'Info') and len(xing) >= 12 and struct.unpack('>I', xing[4:8])[0] & 0x01:
+        frame_count = struct.unpack('>I', xing[8:12])[0]
+    elif frame_data[36:40] == b'VBRI' and len(frame_data) >= 54:
+        frame_count = struct.unpack('>I', frame_data[50:54])[0]
+
+    if frame_count:
+        duration = frame_count * frame['samples_per_frame'] / frame['sample_rate']
+    else:
+        audio_bytes = file_size - audio_start - offset
+        f.seek(max(0, file_size - 128))
+        if f.read(3) == b'TAG':
+            audio_bytes -= 128
+        duration = audio_bytes * 8 / frame['bitrate']
+
+    return {
+        'duration': duration,
+        'sample_rate': frame['sample_rate'],
+        'channels': frame['channels'],
+        'codec': 'mp3' if frame['layer'] == 3 else f"mp{frame['layer']}"
+    }
+
+
+def _probe_ffprobe(audio_file):
+    """用ffprobe获取元数据，作为原生解析失败时的后备"""
+    cmd = [
+        'ffprobe', '-v', 'error', '-select_streams', 'a:0',
+        '-show_entries', 'format=duration:stream=codec_name,sample_rate,channels',
+        '-of', 'json', audio_file
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=10)
+    if result.returncode != 0 or not result.stdout.strip():
+        return None
+    info = json.loads(result.stdout)
+    duration = info.get('format', {}).get('duration')
+    if duration is None:
+        return None
+    streams = info.get('streams') or [{}]
+    stream = streams[0]
+    return {
+        'duration': float(duration),
+        'sample_rate': int(stream['sample_rate']) if stream.get('sample_rate') else None,
+        'channels': stream.get('channels'),
+        'codec': stream.get('codec_name')
+    }
+
+
+def parse_audio_header(audio_file):
+    """
+    在当前进程中直接解析WAV/FLAC/MP3文件头
+
+    Args:
+        audio_file (str): 音频文件路径
+
+    Returns:
+        dict: {'duration', 'sample_rate', 'channels', 'codec'}，无法解析时返回None
+    """
+    file_size = os.path.getsize(audio_file)
+    ext = os.path.splitext(audio_file)[1].lower()
+    try:
+        with open(audio_file, 'rb') as f:
+            if ext == '.wav':
+                return _parse_wav(f, file_size)
+            if ext == '.flac':
+                return _parse_flac(f)
+            if ext == '.mp3':
+                return _parse_mp3(f, file_size)
+    except (OSError, struct.error, KeyError, ZeroDivisionError):
+        return None
+    return None
+
+
+class AudioMetadata:
+    """音频元数据服务
+
+    能解析文件头的格式（WAV/FLAC/MP3）在进程内直接读取，其余格式才调用ffprobe。
+    结果按 路径+大小+修改时间 缓存，并可保存到旁路JSON索引，后续运行无需再次探测。
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, index_file=None):
+        """
+        初始化元数据服务
+
+        Args:
+            index_file (str): 旁路索引文件路径，None表示只在内存中缓存
+        """
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        self.index_file = None
+        # 按获取方式统计探测到的文件数，probe_folder 在多个线程中探测，只在锁内更新
+        self.native_count = 0
+        self.ffprobe_count = 0
+        self.librosa_count = 0
+        if index_file:
+            self.configure(index_file)
+
+    @classmethod
+    def instance(cls):
+        """获取进程级共享的元数据服务"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def configure(self, index_file):
+        """
+        设置旁路索引文件并加载其中的记录
+
+        Args:
+            index_file (str): 索引文件路径
+        """
+        with self._lock:
+            if index_file == self.index_file:
+                return
+            self.index_file = index_file
+            if index_file and os.path.exists(index_file):
+                try:
+                    with open(index_file, 'r', encoding='utf-8') as f:
+                        self._entries.update(json.load(f))
+                except (OSError, ValueError) as e:
+                    print(f"读取音频元数据索引失败: {e}")
+
+    def probe(self, audio_file):
+        """
+        获取音频元数据
+
+        Args:
+            audio_file (str): 音频文件路径
+
+        Returns:
+            dict: {'duration', 'sample_rate', 'channels', 'codec'}，无法获取时返回None
+        """
+        path = os.path.abspath(audio_file)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['info']
+
+        info = parse_audio_header(path)
+        counter = 'native_count'
+        if info is None:
+            counter = 'ffprobe_count'
+            try:
+                info = _probe_ffprobe(path)
+            except Exception as e:
+                print(f"ffprobe获取音频信息失败: {e}")
+                info = None
+            if info is None:
+                counter = 'librosa_count'
+                info = self._probe_librosa(path)
+        if info is None:
+            return None
+
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            self._entries[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'info': info}
+            self._dirty = True
+        return info
+
+    @staticmethod
+    def _probe_librosa(audio_file):
+        """ffprobe不可用时的最后手段，只能得到时长"""
+        try:
+            import librosa
+            return {
+                'duration': librosa.get_duration(path=audio_file),
+                'sample_rate': None,
+                'channels': None,
+                'codec': None
+            }
+        except Exception as e:
+            print(f"无法获取音频时长: {e}")
+            return None
+
+    def get_duration(self, audio_file):
+        """
+        获取音频时长
+
+        Args:
+            audio_file (str): 音频文件路径
+
+        Returns:
+            float: 时长（秒），无法获取时返回None
+        """
+        info = self.probe(audio_file)
+        return info['duration'] if info else None
+
+    def probe_folder(self, audio_files, max_workers=8):
+        """
+        并行探测一批文件的元数据并保存索引
+
+        Args:
+            audio_files (list): 音频文件路径列表
+            max_workers (int): 探测线程数，ffprobe子进程和磁盘读取都会释放GIL
+
+        Returns:
+            dict: {文件路径: 元数据或None}
+        """
+        def safe_probe(audio_file):
+            try:
+                return self.probe(audio_file)
+            except OSError as e:
+                print(f"无法读取音频文件 {audio_file}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = dict(zip(audio_files, executor.map(safe_probe, audio_files)))
+        self.save()
+        return results
+
+    def save(self):
+        """把新探测到的记录写入旁路索引"""
+        with self._lock:
+            if not self.index_file or not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+
+        index_dir = os.path.dirname(self.index_file)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        tmp_file = f"{self.index_file}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            print(f"保存音频元数据索引失败: {e}")
+
+
+def get_audio_metadata():
+    """获取进程级共享的音频元数据服务"""
+    return AudioMetadata.instance()
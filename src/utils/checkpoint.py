@@ -0,0 +1,79 @@
+import os
+import json
+import time
+import uuid
+
+
+class CheckpointStore:
+    """转录检查点
+
+    长音频转录时每隔若干个窗口（长音频模式下为每个分块）把已解码的片段和解码器状态
+    （seek位置、提示token等）写入以转录键命名的JSON文件。进程意外退出或被用户停止后，
+    重新转录同一文件时从最后一个检查点继续；转录完成后删除检查点。
+    """
+
+    def __init__(self, checkpoint_dir):
+        """
+        初始化检查点存储
+
+        Args:
+            checkpoint_dir (str): 检查点目录
+        """
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.checkpoint_dir, f"{key}.json")
+
+    def load(self, key):
+        """
+        读取检查点
+
+        Args:
+            key (str): 转录键
+
+        Returns:
+            dict: 检查点，包含 mode, state, segments 等字段；不存在或已损坏时返回None
+        """
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(checkpoint, dict) or 'state' not in checkpoint or 'segments' not in checkpoint:
+            return None
+        return checkpoint
+
+    def save(self, key, audio_file, mode, state, segments):
+        """
+        原子写入检查点
+
+        Args:
+            key (str): 转录键
+            audio_file (str): 音频文件路径，仅用于排查
+            mode (str): window（逐窗口解码）或 long（分块转录）
+            state (dict): 恢复解码所需的状态
+            segments (list): 到检查点为止已解码的片段，时间戳基于原始音频
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        checkpoint = {
+            'audio_file': audio_file,
+            'mode': mode,
+            'state': state,
+            'segments': segments,
+            'updated': time.time()
+        }
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(checkpoint, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"写入检查点失败: {e}")
+
+    def remove(self, key):
+        """转录完成后删除检查点"""
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
@@ -1,24 +1,214 @@
 import os
+import json
+import hashlib
 from datetime import datetime
 
-class FileUtils:
-    """文件操作工具类"""
-    
-    @staticmethod
-    def save_results(transcription, summary, audio_file, output_folder=None, rel_path=None):
+# 文件内容哈希的进程内缓存 {(路径, 大小, 修改时间): 哈希}
+_content_hash_memo = {}
+
+# 转录为空（静音或未检测到语音）时写入总结文件的内容，这类文件不调用总结接口
+NO_SPEECH_SUMMARY = "未检测到语音，未生成总结。"
+
+class TranscriptStreamWriter:
+    """转录文本的增量写入器
+
+    每收到一个片段就追加写入并刷新到磁盘。写入过程中使用 .part 临时文件，
+    调用 finalize() 后才重命名为正式文件，因此中途崩溃留下的部分结果可以查看，
+    但不会被误认为已完成的转录。
+    """
+
+    def __init__(self, transcript_file, header=None):
         """
-        保存转录和总结结果到文件 - 支持保持源文件夹结构
-        
         Args:
-            transcription (str): 语音识别的文本
-            summary (str): AI生成的总结
-            audio_file (str): 音频文件路径
-            output_folder (str, optional): 输出文件夹路径，默认为None（使用默认路径）
-            rel_path (str, optional): 相对路径，用于保持源文件夹结构
-            
+            transcript_file (str): 最终的转录文件路径
+            header (str): 写在文件开头的说明文字，None表示不写
+        """
+        self.path = transcript_file
+        self.part_path = transcript_file + ".part"
+        self.segment_count = 0
+        self._file = open(self.part_path, 'w', encoding='utf-8')
+        if header:
+            self._file.write(header)
+            self._file.flush()
+
+    def write_segment(self, segment):
+        """
+        追加一个片段
+
+        Args:
+            segment (dict): 转录片段，至少包含text字段
+        """
+        self._file.write(segment['text'])
+        self._file.flush()
+        self.segment_count += 1
+
+    def finalize(self):
+        """
+        完成写入并重命名为正式文件
+
         Returns:
-            tuple: (转录文件路径, 总结文件路径)
+            str: 转录文件路径
         """
+        self._file.close()
+        os.replace(self.part_path, self.path)
+        return self.path
+
+    def close(self):
+        """关闭文件但保留 .part 临时文件（用于出错或中断时）"""
+        if not self._file.closed:
+            self._file.close()
+
+
+class SrtStreamWriter(TranscriptStreamWriter):
+    """SRT字幕的增量写入器"""
+
+    def write_segment(self, segment):
+        start = FileUtils.subtitle_timestamp(segment['start'], ',')
+        end = FileUtils.subtitle_timestamp(segment['end'], ',')
+        self._file.write(f"{self.segment_count + 1}\n{start} --> {end}\n{segment['text'].strip()}\n\n")
+        self._file.flush()
+        self.segment_count += 1
+
+
+class VttStreamWriter(TranscriptStreamWriter):
+    """WebVTT字幕的增量写入器"""
+
+    def __init__(self, transcript_file, header=None):
+        super().__init__(transcript_file, "WEBVTT\n\n")
+
+    def write_segment(self, segment):
+        start = FileUtils.subtitle_timestamp(segment['start'], '.')
+        end = FileUtils.subtitle_timestamp(segment['end'], '.')
+        self._file.write(f"{start} --> {end}\n{segment['text'].strip()}\n\n")
+        self._file.flush()
+        self.segment_count += 1
+
+
+class JsonlStreamWriter(TranscriptStreamWriter):
+    """JSONL片段的增量写入器，每行一个片段，保留时间戳和置信度，可随时转换为其他字幕格式"""
+
+    FIELDS = ('start', 'end', 'text', 'avg_logprob', 'no_speech_prob', 'compression_ratio')
+
+    def __init__(self, transcript_file, header=None):
+        super().__init__(transcript_file)
+
+    def write_segment(self, segment):
+        record = {field: segment.get(field) for field in self.FIELDS}
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.segment_count += 1
+
+
+class SummaryStreamWriter(TranscriptStreamWriter):
+    """总结的增量写入器
+
+    流式总结时每收到一段文本就追加到 .part 临时文件，遇到换行时刷新到磁盘，
+    完成后重命名为正式的 .md 文件。最终结果与流式写入的内容不一致时
+    （非流式响应、中途重试或出错）以最终结果为准重写。
+    """
+
+    def __init__(self, summary_file, audio_file):
+        """
+        Args:
+            summary_file (str): 最终的总结文件路径
+            audio_file (str): 音频文件路径，写在文件开头
+        """
+        audio_name = os.path.splitext(os.path.basename(audio_file))[0]
+        self.header = (f"# {audio_name}\n\n"
+                       f"**音频文件:** {audio_file}\n\n"
+                       f"**处理时间:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+                       "## 总结内容\n\n")
+        super().__init__(summary_file, self.header)
+        self._chunks = []
+
+    def write(self, text):
+        """
+        追加一段总结文本
+
+        Args:
+            text (str): 流式响应中的文本增量
+        """
+        self._file.write(text)
+        self._chunks.append(text)
+        if "\n" in text:
+            self._file.flush()
+
+    def finalize(self, summary=None):
+        """
+        完成写入并重命名为正式文件
+
+        Args:
+            summary (str): 最终的总结，与已写入的内容不一致时重写文件
+
+        Returns:
+            str: 总结文件路径
+        """
+        if summary is not None and summary != "".join(self._chunks):
+            self._file.seek(0)
+            self._file.truncate()
+            self._file.write(self.header + summary)
+        return super().finalize()
+
+
+# 片段输出格式与对应的写入器
+SEGMENT_WRITERS = {
+    'srt': SrtStreamWriter,
+    'vtt': VttStreamWriter,
+    'jsonl': JsonlStreamWriter
+}
+
+
+class SegmentOutputWriter:
+    """同时写入转录文本和若干种带时间戳格式的写入器
+
+    对外与 TranscriptStreamWriter 接口一致，path/part_path 指向转录文本文件，
+    其他格式的文件与转录文本同名、扩展名不同。
+    """
+
+    def __init__(self, transcript_writer, extra_writers):
+        """
+        Args:
+            transcript_writer (TranscriptStreamWriter): 转录文本写入器
+            extra_writers (dict): {格式: 写入器}
+        """
+        self.transcript_writer = transcript_writer
+        self.extra_writers = extra_writers
+        self.path = transcript_writer.path
+        self.part_path = transcript_writer.part_path
+
+    @property
+    def segment_count(self):
+        return self.transcript_writer.segment_count
+
+    @property
+    def paths(self):
+        """各格式的最终文件路径 {格式: 路径}"""
+        paths = {'txt': self.path}
+        paths.update({fmt: writer.path for fmt, writer in self.extra_writers.items()})
+        return paths
+
+    def write_segment(self, segment):
+        self.transcript_writer.write_segment(segment)
+        for writer in self.extra_writers.values():
+            writer.write_segment(segment)
+
+    def finalize(self):
+        for writer in self.extra_writers.values():
+            writer.finalize()
+        return self.transcript_writer.finalize()
+
+    def close(self):
+        self.transcript_writer.close()
+        for writer in self.extra_writers.values():
+            writer.close()
+
+
+class FileUtils:
+    """文件操作工具类"""
+    
+    @staticmethod
+    def _resolve_output_folder(output_folder=None):
+        """将输出文件夹解析为绝对路径，默认为项目根目录下的output"""
         # 获取项目根目录
         project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         
@@ -32,69 +222,263 @@ class FileUtils:
         
         # 确保输出文件夹存在
         os.makedirs(output_folder, exist_ok=True)
+        return output_folder
+    
+    @staticmethod
+    def _prepare_output_dir(output_folder, kind, rel_path=None):
+        """
+        创建转录或总结的输出子目录，保持源文件夹结构
         
-        # 生成输出文件名
-        audio_name = os.path.splitext(os.path.basename(audio_file))[0]
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # 转录文件路径和名称
-        transcript_dir = os.path.join(output_folder, 'transcripts')
-        # 如果有相对路径，则在转录目录下创建相同的子目录结构
+        Args:
+            output_folder (str): 输出文件夹（绝对路径）
+            kind (str): 子目录名称，如 transcripts 或 summaries
+            rel_path (str, optional): 相对路径，用于保持源文件夹结构
+            
+        Returns:
+            str: 输出子目录路径
+        """
+        target_dir = os.path.join(output_folder, kind)
+        # 如果有相对路径，则在子目录下创建相同的子目录结构
         if rel_path:
             rel_dir = os.path.dirname(rel_path)
             if rel_dir:
-                transcript_dir = os.path.join(transcript_dir, rel_dir)
+                target_dir = os.path.join(target_dir, rel_dir)
         
-        # 确保转录目录存在
         try:
-            os.makedirs(transcript_dir, exist_ok=True)
+            os.makedirs(target_dir, exist_ok=True)
         except Exception as e:
-            print(f"创建转录目录失败: {transcript_dir}, 错误: {e}")
+            print(f"创建目录失败: {target_dir}, 错误: {e}")
             # 如果创建子目录失败，回退到基础目录
-            transcript_dir = os.path.join(output_folder, 'transcripts')
-            os.makedirs(transcript_dir, exist_ok=True)
+            target_dir = os.path.join(output_folder, kind)
+            os.makedirs(target_dir, exist_ok=True)
+        return target_dir
+    
+    @staticmethod
+    def create_transcript_writer(audio_file, output_folder=None, rel_path=None, formats=()):
+        """
+        创建转录文本的增量写入器，文件位置与save_results一致
+        
+        Args:
+            audio_file (str): 音频文件路径
+            output_folder (str, optional): 输出文件夹路径，默认为None（使用默认路径）
+            rel_path (str, optional): 相对路径，用于保持源文件夹结构
+            formats (iterable): 同时增量写入的片段格式，可选 srt, vtt, jsonl
             
+        Returns:
+            TranscriptStreamWriter: 写入器
+        """
+        output_folder = FileUtils._resolve_output_folder(output_folder)
+        audio_name = os.path.splitext(os.path.basename(audio_file))[0]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        transcript_dir = FileUtils._prepare_output_dir(output_folder, 'transcripts', rel_path)
         transcript_file = os.path.join(transcript_dir, f"{audio_name}_转录_{timestamp}.txt")
+        return FileUtils.open_transcript_writer(transcript_file, formats, FileUtils._transcript_header(audio_file))
+    
+    @staticmethod
+    def create_summary_writer(audio_file, output_folder=None, rel_path=None):
+        """
+        创建总结的增量写入器，文件位置与save_results一致
         
-        # 总结文件路径和名称
-        summary_dir = os.path.join(output_folder, 'summaries')
-        # 如果有相对路径，则在总结目录下创建相同的子目录结构
-        if rel_path:
-            rel_dir = os.path.dirname(rel_path)
-            if rel_dir:
-                summary_dir = os.path.join(summary_dir, rel_dir)
+        Args:
+            audio_file (str): 音频文件路径
+            output_folder (str, optional): 输出文件夹路径，默认为None（使用默认路径）
+            rel_path (str, optional): 相对路径，用于保持源文件夹结构
+            
+        Returns:
+            SummaryStreamWriter: 写入器
+        """
+        output_folder = FileUtils._resolve_output_folder(output_folder)
+        audio_name = os.path.splitext(os.path.basename(audio_file))[0]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        summary_dir = FileUtils._prepare_output_dir(output_folder, 'summaries', rel_path)
+        return SummaryStreamWriter(os.path.join(summary_dir, f"{audio_name}_总结{timestamp}.md"), audio_file)
+    
+    @staticmethod
+    def open_transcript_writer(transcript_file, formats=(), header=None):
+        """
+        打开转录文本写入器，需要时同时写入SRT/VTT/JSONL等带时间戳的格式
+        
+        Args:
+            transcript_file (str): 转录文本文件路径，其他格式使用相同的文件名和对应的扩展名
+            formats (iterable): 片段格式，可选 srt, vtt, jsonl
+            header (str): 转录文本开头的说明文字
+            
+        Returns:
+            TranscriptStreamWriter|SegmentOutputWriter: 写入器
+        """
+        writer = TranscriptStreamWriter(transcript_file, header)
+        if not formats:
+            return writer
+        base_path = os.path.splitext(transcript_file)[0]
+        extra_writers = {fmt: SEGMENT_WRITERS[fmt](f"{base_path}.{fmt}") for fmt in formats}
+        return SegmentOutputWriter(writer, extra_writers)
+    
+    @staticmethod
+    def export_segments(segments, output_file, fmt):
+        """
+        把已有的片段（如 SegmentStore 或从JSONL加载的片段）导出为字幕文件，无需重新转录
         
-        # 确保总结目录存在
+        Args:
+            segments (iterable): 片段
+            output_file (str): 输出文件路径
+            fmt (str): srt, vtt 或 jsonl
+            
+        Returns:
+            str: 输出文件路径
+        """
+        writer = SEGMENT_WRITERS[fmt](output_file)
         try:
-            os.makedirs(summary_dir, exist_ok=True)
-        except Exception as e:
-            print(f"创建总结目录失败: {summary_dir}, 错误: {e}")
-            # 如果创建子目录失败，回退到基础目录
-            summary_dir = os.path.join(output_folder, 'summaries')
-            os.makedirs(summary_dir, exist_ok=True)
+            for segment in segments:
+                writer.write_segment(segment)
+        finally:
+            writer.close()
+        return writer.finalize()
+    
+    @staticmethod
+    def remove_stale_parts(transcript_file):
+        """
+        删除同一音频之前中断时留下的 .part 转录文件（从检查点继续转录并完成后调用）
+        
+        Args:
+            transcript_file (str): 本次完成的转录文件路径
+        """
+        transcript_dir = os.path.dirname(transcript_file)
+        prefix = os.path.basename(transcript_file).rsplit("_转录_", 1)[0] + "_转录_"
+        for filename in os.listdir(transcript_dir):
+            if filename.startswith(prefix) and filename.endswith(".part"):
+                try:
+                    os.remove(os.path.join(transcript_dir, filename))
+                except OSError:
+                    pass
+    
+    @staticmethod
+    def _transcript_header(audio_file):
+        """转录文件开头的说明文字"""
+        return ("=" * 50 + "\n"
+                f"音频文件: {audio_file}\n"
+                f"处理时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                + "=" * 50 + "\n\n")
+    
+    @staticmethod
+    def save_results(transcription, summary, audio_file, output_folder=None, rel_path=None, transcript_file=None,
+                     summary_writer=None):
+        """
+        保存转录和总结结果到文件 - 支持保持源文件夹结构
+        
+        Args:
+            transcription (str): 语音识别的文本
+            summary (str): AI生成的总结
+            audio_file (str): 音频文件路径
+            output_folder (str, optional): 输出文件夹路径，默认为None（使用默认路径）
+            rel_path (str, optional): 相对路径，用于保持源文件夹结构
+            transcript_file (str, optional): 已通过增量写入器保存的转录文件，提供时不再重复写入
+            summary_writer (SummaryStreamWriter, optional): 流式写入总结的写入器，提供时在其中完成总结文件
             
-        summary_file = os.path.join(summary_dir, f"{audio_name}_总结{timestamp}.md")
-        
-        # 保存转录文本到txt文件
-        with open(transcript_file, 'w', encoding='utf-8') as f:
-            f.write("=" * 50 + "\n")
-            f.write(f"音频文件: {audio_file}\n")
-            f.write(f"处理时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(transcription)
-        
-        # 保存总结到md文件
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            f.write(f"# {audio_name}\n\n")
-            f.write(f"**音频文件:** {audio_file}\n\n")
-            f.write(f"**处理时间:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write("## 总结内容\n\n")
-            f.write(summary)
+        Returns:
+            tuple: (转录文件路径, 总结文件路径)
+        """
+        output_folder = FileUtils._resolve_output_folder(output_folder)
+        
+        # 生成输出文件名
+        audio_name = os.path.splitext(os.path.basename(audio_file))[0]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        if transcript_file is None:
+            # 转录文件路径和名称
+            transcript_dir = FileUtils._prepare_output_dir(output_folder, 'transcripts', rel_path)
+            transcript_file = os.path.join(transcript_dir, f"{audio_name}_转录_{timestamp}.txt")
+            
+            # 保存转录文本到txt文件
+            with open(transcript_file, 'w', encoding='utf-8') as f:
+                f.write(FileUtils._transcript_header(audio_file))
+                f.write(transcription)
+        
+        # 保存总结到md文件，流式总结时已增量写入，这里只需完成写入
+        if summary_writer is None:
+            summary_writer = FileUtils.create_summary_writer(audio_file, output_folder, rel_path)
+        summary_file = summary_writer.finalize(summary)
         
         print(f"转录文本已保存到: {transcript_file}")
         print(f"总结内容已保存到: {summary_file}")
         return transcript_file, summary_file
     
+    @staticmethod
+    def format_timestamp(seconds):
+        """
+        将秒数格式化为 [时:]分:秒.毫秒
+        
+        Args:
+            seconds (float): 秒数
+            
+        Returns:
+            str: 格式化的时间戳，如 01:02.345 或 1:02:03.456
+        """
+        milliseconds = int(round(seconds * 1000))
+        hours, milliseconds = divmod(milliseconds, 3600000)
+        minutes, milliseconds = divmod(milliseconds, 60000)
+        secs, milliseconds = divmod(milliseconds, 1000)
+        if hours:
+            return f"{hours}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
+        return f"{minutes:02d}:{secs:02d}.{milliseconds:03d}"
+    
+    @staticmethod
+    def subtitle_timestamp(seconds, separator=','):
+        """
+        将秒数格式化为字幕时间戳 时:分:秒,毫秒
+        
+        Args:
+            seconds (float): 秒数
+            separator (str): 秒与毫秒之间的分隔符，SRT为逗号，VTT为点
+            
+        Returns:
+            str: 如 00:01:02,345
+        """
+        milliseconds = int(round(max(0.0, seconds) * 1000))
+        hours, milliseconds = divmod(milliseconds, 3600000)
+        minutes, milliseconds = divmod(milliseconds, 60000)
+        secs, milliseconds = divmod(milliseconds, 1000)
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{milliseconds:03d}"
+    
+    @staticmethod
+    def compute_file_hash(file_path, chunk_size=1024 * 1024):
+        """
+        计算文件内容的哈希值，用于按内容而不是路径识别同一个音频
+        
+        Args:
+            file_path (str): 文件路径
+            chunk_size (int): 每次读取的字节数
+            
+        Returns:
+            str: 40位十六进制哈希值
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def get_content_hash(file_path):
+        """
+        获取文件内容哈希，同一进程内未修改的文件只计算一次
+        
+        Args:
+            file_path (str): 文件路径
+            
+        Returns:
+            str: 40位十六进制哈希值
+        """
+        stat = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        content_hash = _content_hash_memo.get(memo_key)
+        if content_hash is None:
+            content_hash = FileUtils.compute_file_hash(file_path)
+            _content_hash_memo[memo_key] = content_hash
+        return content_hash
+    
     @staticmethod
     def check_file_exists(file_path):
         """
@@ -0,0 +1,65 @@
+import builtins
+import sys
+import threading
+import time
+
+
+class ImportTimer:
+    """统计模块的导入耗时
+
+    替换内置的 __import__，记录每个模块第一次被导入时的累计耗时（包含它引入的依赖），
+    用于找出拖慢启动的模块。嵌套导入的模块同样会被记录，总耗时只计算最外层的导入。
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.timings = {}
+        self.total_seconds = 0.0
+        self._original_import = None
+        self._local = threading.local()
+
+    def install(self):
+        """开始统计"""
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        """停止统计"""
+        if self._original_import is None:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # 相对导入和已加载的模块直接放行
+        if level or not name or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            seconds = time.perf_counter() - start
+            self._local.depth = depth
+            # 导入失败的模块（如可选依赖）不计入
+            if name in sys.modules:
+                self.timings.setdefault(name, seconds)
+            if depth == 0:
+                self.total_seconds += seconds
+
+    def report(self, limit=15):
+        """
+        输出导入耗时报告
+
+        Args:
+            limit (int): 最多列出的模块数量
+        """
+        elapsed = time.perf_counter() - self.start_time
+        print("\n=== 导入耗时报告 ===")
+        print(f"启动至今: {elapsed:.3f}秒，其中导入模块: {self.total_seconds:.3f}秒")
+        for module, seconds in sorted(self.timings.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            print(f"  {module:<36}{seconds:.3f}秒")
@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import uuid
+
+# 超出上限时淘汰到上限的这个比例，之后的若干次写入无需再次淘汰
+EVICT_TARGET_RATIO = 0.9
+
+
+class ResultCache:
+    """基于磁盘的结果缓存
+
+    每个条目保存为以键命名的JSON文件，键由调用方把决定结果的所有参数
+    （内容哈希、模型、语言、解码参数等）交给 make_key 计算得到。
+    总大小超过上限时按最近访问时间淘汰，可选按存活时间过期。
+    条目大小记录在内存索引中，写入时只更新总大小，超出上限时才扫描目录；
+    目录被其他进程或实例修改过（修改时间变化）时重新扫描索引。
+    """
+
+    def __init__(self, cache_dir, max_size_mb=256, ttl=None):
+        """
+        初始化结果缓存
+
+        Args:
+            cache_dir (str): 缓存目录
+            max_size_mb (float): 缓存大小上限（MB），None表示不限制
+            ttl (float): 条目的存活时间（秒），None表示永不过期
+        """
+        self.cache_dir = cache_dir
+        self.max_size_mb = max_size_mb
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        # 内存索引 {路径: 大小}、总大小，以及索引对应的目录修改时间
+        self._sizes = {}
+        self._total_size = 0
+        self._dir_mtime_ns = None
+        with self._lock:
+            self._scan()
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        由任意可JSON序列化的参数计算缓存键
+
+        Returns:
+            str: 40位十六进制哈希值
+        """
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """
+        读取缓存
+
+        Args:
+            key (str): 缓存键
+
+        Returns:
+            缓存的值，未命中或已过期时返回None
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if self.ttl is not None and time.time() - entry['created'] > self.ttl:
+                with self._lock:
+                    self._refresh()
+                    os.remove(path)
+                    self._forget(path)
+                    self._dir_mtime_ns = self._dir_mtime()
+                raise FileNotFoundError(path)
+            # 刷新访问时间，用于LRU淘汰
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry['value']
+
+    def put(self, key, value):
+        """
+        写入缓存
+
+        Args:
+            key (str): 缓存键
+            value: 可JSON序列化的值
+        """
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with self._lock:
+            self._refresh()
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'created': time.time(), 'value': value}, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+                size = os.path.getsize(path)
+            except OSError as e:
+                print(f"写入结果缓存失败: {e}")
+                return
+            self._total_size += size - self._sizes.get(path, 0)
+            self._sizes[path] = size
+            if self.max_size_mb is not None and self._total_size > self.max_size_mb * 1024 * 1024:
+                self._evict()
+            self._dir_mtime_ns = self._dir_mtime()
+
+    def size_mb(self):
+        """当前缓存占用的磁盘空间（MB）"""
+        with self._lock:
+            self._refresh()
+            return self._total_size / (1024 * 1024)
+
+    def entry_count(self):
+        """当前缓存的条目数"""
+        with self._lock:
+            self._refresh()
+            return len(self._sizes)
+
+    def _dir_mtime(self):
+        try:
+            return os.stat(self.cache_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def _scan(self):
+        """
+        扫描目录重建索引，调用方需持有锁
+
+        Returns:
+            list: [(访问时间, 大小, 路径), ...]
+        """
+        self._dir_mtime_ns = self._dir_mtime()
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # 其他进程同时在淘汰
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        self._sizes = {path: size for _, size, path in entries}
+        self._total_size = sum(self._sizes.values())
+        return entries
+
+    def _refresh(self):
+        """目录在本实例之外被修改过时重新扫描索引，调用方需持有锁"""
+        if self._dir_mtime() != self._dir_mtime_ns:
+            self._scan()
+
+    def _forget(self, path):
+        self._total_size -= self._sizes.pop(path, 0)
+
+    def _evict(self):
+        """按最近访问时间淘汰条目，直到总大小不超过上限的 EVICT_TARGET_RATIO，调用方需持有锁"""
+        # 访问时间只记录在文件上，淘汰时重新扫描一次目录
+        entries = self._scan()
+        limit = self.max_size_mb * 1024 * 1024
+        if self._total_size <= limit:
+            return
+        target = limit * EVICT_TARGET_RATIO
+        for _, _, path in sorted(entries):
+            if self._total_size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            self._forget(path)
+
+    def stats(self):
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 命中/未命中次数、命中率和磁盘占用
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+            'size_mb': round(self.size_mb(), 2),
+            'entries': self.entry_count()
+        }
@@ -0,0 +1,102 @@
+import io
+import json
+import math
+from array import array
+
+# 除文本外随片段保存的数值字段
+SEGMENT_FIELDS = ('start', 'end', 'avg_logprob', 'no_speech_prob', 'compression_ratio')
+
+
+class SegmentStore:
+    """紧凑的转录片段存储
+
+    每个数值字段保存在一个 array('d') 中，所有片段的文本拼接在同一个缓冲区里，
+    只记录每个片段文本的结束偏移。与片段字典列表相比，多小时的音频只占用很少的内存，
+    且可以随时导出SRT/VTT/JSONL，无需重新转录。
+    按下标访问时返回新构造的片段字典。
+    """
+
+    def __init__(self, segments=None):
+        """
+        Args:
+            segments (iterable): 可选，初始片段
+        """
+        self._columns = {field: array('d') for field in SEGMENT_FIELDS}
+        self._offsets = array('q')
+        self._buffer = io.StringIO()
+        self._text = None  # 缓冲区内容的缓存，追加时失效
+        if segments is not None:
+            self.extend(segments)
+
+    def append(self, segment):
+        """
+        追加一个片段
+
+        Args:
+            segment (dict): 至少包含 start, end, text 字段
+        """
+        for field in SEGMENT_FIELDS:
+            value = segment.get(field)
+            self._columns[field].append(math.nan if value is None else float(value))
+        self._buffer.write(segment['text'])
+        self._offsets.append(self._buffer.tell())
+        self._text = None
+
+    def extend(self, segments):
+        """追加多个片段"""
+        for segment in segments:
+            self.append(segment)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _full_text(self):
+        if self._text is None:
+            self._text = self._buffer.getvalue()
+        return self._text
+
+    def text(self):
+        """全部片段拼接后的文本"""
+        return self._full_text()
+
+    def _segment(self, index, text):
+        start = self._offsets[index - 1] if index > 0 else 0
+        segment = {'id': index, 'text': text[start:self._offsets[index]]}
+        for field in SEGMENT_FIELDS:
+            value = self._columns[field][index]
+            segment[field] = None if math.isnan(value) else value
+        return segment
+
+    def __getitem__(self, index):
+        """按下标或切片取出片段字典"""
+        if isinstance(index, slice):
+            text = self._full_text()
+            return [self._segment(i, text) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("片段下标越界")
+        return self._segment(index, self._full_text())
+
+    def __iter__(self):
+        text = self._full_text()
+        for index in range(len(self)):
+            yield self._segment(index, text)
+
+    @classmethod
+    def from_jsonl(cls, jsonl_file):
+        """
+        从JSONL片段文件加载，用于导出字幕而无需重新转录
+
+        Args:
+            jsonl_file (str): JSONL文件路径
+
+        Returns:
+            SegmentStore: 片段存储
+        """
+        store = cls()
+        with open(jsonl_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    store.append(json.loads(line))
+        return store
@@ -0,0 +1,117 @@
+import math
+import re
+import threading
+
+# tiktoken的编码与DeepSeek的分词器不完全一致，中文文本上计数偏多，用于判断长度时偏保守
+ENCODING_NAME = "cl100k_base"
+
+# 句末标点（中英文）和换行之后切分；英文句点后需有空白，避免切开小数和缩写
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[。！？!?；;…\n])|(?<=[.])(?=\s)')
+# 单句超出预算时退而在逗号、顿号和空白处切分
+_CLAUSE_BOUNDARY = re.compile(r'(?<=[，,、：:\s])')
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """加载tiktoken编码，未安装或无法下载编码文件时返回None"""
+    global _encoding, _encoding_failed
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(ENCODING_NAME)
+            except Exception as e:
+                print(f"无法加载tiktoken编码，按字符数估算token数: {e}")
+                _encoding_failed = True
+        return _encoding
+
+
+def count_tokens(text):
+    """
+    计算文本的token数
+
+    Args:
+        text (str): 文本
+
+    Returns:
+        int: token数，tiktoken不可用时按字符数估算（中英文都偏多）
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _hard_split(text, max_tokens):
+    """没有任何可用边界的长文本按token数硬切"""
+    pieces = []
+    while text:
+        tokens = count_tokens(text)
+        if tokens <= max_tokens:
+            pieces.append(text)
+            break
+        cut = max(1, len(text) * max_tokens // tokens)
+        while cut > 1 and count_tokens(text[:cut]) > max_tokens:
+            cut = cut * 9 // 10
+        pieces.append(text[:cut])
+        text = text[cut:]
+    return pieces
+
+
+def _iter_sentences(text, max_tokens):
+    """按句子切分，生成 (句子, token数)，超出预算的句子再按分句或硬切"""
+    for sentence in _SENTENCE_BOUNDARY.split(text):
+        if not sentence:
+            continue
+        tokens = count_tokens(sentence)
+        if tokens <= max_tokens:
+            yield sentence, tokens
+            continue
+        for clause in _CLAUSE_BOUNDARY.split(sentence):
+            if not clause:
+                continue
+            tokens = count_tokens(clause)
+            if tokens <= max_tokens:
+                yield clause, tokens
+            else:
+                for piece in _hard_split(clause, max_tokens):
+                    yield piece, count_tokens(piece)
+
+
+def split_by_tokens(text, max_tokens):
+    """
+    在句子边界把文本切成token数不超过预算的块
+
+    块的大小尽量均匀：先按总token数算出需要的块数，再以平均大小为目标依次装入句子，
+    避免最后剩下一个很小的块，并发处理时总耗时取决于最大的那一块。
+
+    Args:
+        text (str): 文本
+        max_tokens (int): 每块的token预算
+
+    Returns:
+        list: 文本块，按原文顺序
+    """
+    sentences = list(_iter_sentences(text, max_tokens))
+    total = sum(tokens for _, tokens in sentences)
+    if total <= max_tokens:
+        return [text] if text else []
+    target = min(max_tokens, math.ceil(total / math.ceil(total / max_tokens)))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence, tokens in sentences:
+        if current and (current_tokens + tokens > max_tokens
+                        or current_tokens >= target):
+            chunks.append("".join(current))
+            current = []
+            current_tokens = 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
@@ -0,0 +1,211 @@
+import numpy as np
+
+# Whisper解码后的音频采样率
+SAMPLE_RATE = 16000
+
+
+class EnergyVAD:
+    """基于短时能量和过零率的语音活动检测
+
+    全部计算在NumPy上向量化完成，对一小时的16kHz音频也只需几十毫秒，
+    用于在送入Whisper之前剔除静音和非语音片段。
+    """
+
+    def __init__(self, frame_ms=30, energy_margin_db=12.0, min_energy_db=-50.0,
+                 max_zcr=0.35, min_speech_ms=250, min_silence_ms=600, padding_ms=200):
+        """
+        初始化检测器
+
+        Args:
+            frame_ms (int): 分析帧长度（毫秒）
+            energy_margin_db (float): 语音帧能量需高出噪声底的分贝数
+            min_energy_db (float): 语音帧能量的绝对下限（dBFS）
+            max_zcr (float): 语音帧过零率上限，过零率更高的低能量帧视为噪声
+            min_speech_ms (int): 短于此长度的语音片段被丢弃
+            min_silence_ms (int): 短于此长度的静音间隙被并入相邻语音
+            padding_ms (int): 每个语音片段前后额外保留的长度
+        """
+        self.frame_ms = frame_ms
+        self.energy_margin_db = energy_margin_db
+        self.min_energy_db = min_energy_db
+        self.max_zcr = max_zcr
+        self.min_speech_ms = min_speech_ms
+        self.min_silence_ms = min_silence_ms
+        self.padding_ms = padding_ms
+
+    @property
+    def frame_length(self):
+        """每帧的采样点数"""
+        return int(SAMPLE_RATE * self.frame_ms / 1000)
+
+    def frame_features(self, audio):
+        """
+        计算每帧的能量和过零率
+
+        Args:
+            audio (np.ndarray): 16kHz单声道float32音频
+
+        Returns:
+            tuple: (能量dB数组, 过零率数组)
+        """
+        frame_length = self.frame_length
+        n_frames = len(audio) // frame_length
+        if n_frames == 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+        frames = audio[:n_frames * frame_length].reshape(n_frames, frame_length)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        energy_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / float(frame_length - 1)
+        return energy_db.astype(np.float32), zcr.astype(np.float32)
+
+    def speech_mask(self, audio):
+        """
+        逐帧判断是否为语音
+
+        Args:
+            audio (np.ndarray): 16kHz单声道float32音频
+
+        Returns:
+            np.ndarray: 布尔数组，每个元素对应一帧；有声音但能量起伏太小、无法区分语音和背景时全部为True
+        """
+        energy_db, zcr = self.frame_features(audio)
+        if len(energy_db) == 0:
+            return np.zeros(0, dtype=bool)
+
+        # 以能量较低的10%帧估计噪声底，阈值随录音环境自适应
+        noise_floor, loud_level = np.percentile(energy_db, [10, 90])
+        if loud_level >= self.min_energy_db and loud_level - noise_floor < self.energy_margin_db:
+            # 持续的背景声（音乐、空调声）上的语音或整体很轻的录音，能量分不出语音，整段保留；
+            # 数字静音和低于下限的底噪不在此列，按下面的阈值判断，没有语音时整个文件被跳过
+            return np.ones(len(energy_db), dtype=bool)
+        threshold = max(noise_floor + self.energy_margin_db, self.min_energy_db)
+
+        loud = energy_db > threshold
+        # 能量刚过阈值且过零率很高的帧多为嘶声等噪声，明显更响的帧则直接视为语音
+        mask = (loud & (zcr < self.max_zcr)) | (energy_db > threshold + self.energy_margin_db)
+        return mask
+
+    @staticmethod
+    def _runs(mask):
+        """返回布尔数组中连续True区间的 (起始, 结束) 索引数组"""
+        padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+        edges = np.diff(padded)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        return starts, ends
+
+    def detect(self, audio):
+        """
+        检测语音区间
+
+        Args:
+            audio (np.ndarray): 16kHz单声道float32音频
+
+        Returns:
+            list: [(起始采样点, 结束采样点), ...]，按时间排序且互不重叠；静音或空音频返回空列表，
+                有达到语音电平的声音但都短于最短语音长度时返回整段音频，由Whisper判断是否有语音
+        """
+        mask = self.speech_mask(audio)
+        if not mask.any():
+            return []
+
+        frame_length = self.frame_length
+        min_silence_frames = max(1, int(self.min_silence_ms / self.frame_ms))
+        min_speech_frames = max(1, int(self.min_speech_ms / self.frame_ms))
+
+        # 填平短静音间隙
+        starts, ends = self._runs(~mask)
+        for start, end in zip(starts, ends):
+            if start > 0 and end < len(mask) and end - start < min_silence_frames:
+                mask[start:end] = True
+
+        # 丢弃过短的语音片段
+        starts, ends = self._runs(mask)
+        keep = (ends - starts) >= min_speech_frames
+        starts, ends = starts[keep], ends[keep]
+        if len(starts) == 0:
+            return [(0, len(audio))]
+
+        padding = int(SAMPLE_RATE * self.padding_ms / 1000)
+        sample_starts = np.maximum(starts * frame_length - padding, 0)
+        sample_ends = np.minimum(ends * frame_length + padding, len(audio))
+
+        # 加上前后留白后可能重叠，合并重叠区间
+        regions = []
+        for start, end in zip(sample_starts.tolist(), sample_ends.tolist()):
+            if regions and start <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+            else:
+                regions.append((start, end))
+        return regions
+
+
+class SpeechTimeline:
+    """把只包含语音区间的拼接音频上的时间映射回原始音频的时间轴"""
+
+    def __init__(self, regions, sample_rate=SAMPLE_RATE):
+        """
+        Args:
+            regions (list): [(起始采样点, 结束采样点), ...]
+            sample_rate (int): 采样率
+        """
+        self.regions = list(regions)
+        self.sample_rate = sample_rate
+        lengths = np.array([end - start for start, end in self.regions], dtype=np.int64)
+        # 每个区间在拼接音频中的起点（秒）以及在原始音频中的起点（秒）
+        self.compact_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) / sample_rate if len(lengths) else np.zeros(0)
+        self.original_starts = np.array([start for start, _ in self.regions], dtype=np.float64) / sample_rate
+        self.speech_duration = float(lengths.sum()) / sample_rate if len(lengths) else 0.0
+
+    def extract(self, audio):
+        """
+        拼接所有语音区间
+
+        Args:
+            audio (np.ndarray): 原始音频
+
+        Returns:
+            np.ndarray: 只包含语音的音频
+        """
+        if not self.regions:
+            return np.zeros(0, dtype=audio.dtype)
+        return np.concatenate([audio[start:end] for start, end in self.regions])
+
+    def to_original(self, t, is_end=False):
+        """
+        将拼接音频上的时间转换为原始时间
+
+        Args:
+            t (float): 拼接音频上的时间（秒）
+            is_end (bool): 是否为片段结束时间；结束时间恰好落在区间边界时归属前一个区间
+
+        Returns:
+            float: 原始音频上的时间（秒）
+        """
+        if len(self.compact_starts) == 0:
+            return t
+        side = 'left' if is_end else 'right'
+        index = int(np.searchsorted(self.compact_starts, t, side=side)) - 1
+        index = min(max(index, 0), len(self.compact_starts) - 1)
+        return float(self.original_starts[index] + (t - self.compact_starts[index]))
+
+    def map_segments(self, segments):
+        """
+        将Whisper输出片段的时间戳映射回原始时间轴
+
+        Args:
+            segments (list): Whisper返回的片段列表
+
+        Returns:
+            list: 时间戳已修正的新片段列表
+        """
+        mapped = []
+        for segment in segments:
+            segment = dict(segment)
+            segment['start'] = self.to_original(segment['start'])
+            segment['end'] = self.to_original(segment['end'], is_end=True)
+            mapped.append(segment)
+        return mapped
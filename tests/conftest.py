@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ChatServer(ThreadingHTTPServer):
+    """本地的对话补全接口，按请求中的stream字段返回JSON或服务端事件流（SSE）
+
+    reply(提示词) 返回回答文本，返回 (状态码, 文本) 时按该状态码响应；
+    每个请求的JSON记录在 requests 中，delay 秒后才开始响应。
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ChatHandler)
+        self.requests = []
+        self.reply = lambda prompt: f"总结:{prompt}"
+        self.delay = 0.0
+        self.chunk_size = 4
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/chat/completions"
+
+    def prompts(self):
+        with self._lock:
+            return [payload['messages'][0]['content'] for payload in self.requests]
+
+    def record(self, payload):
+        with self._lock:
+            self.requests.append(payload)
+
+
+class ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.record(payload)
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        reply = self.server.reply(payload['messages'][0]['content'])
+        status, text = reply if isinstance(reply, tuple) else (200, reply)
+        if status != 200:
+            self._send(status, 'application/json', json.dumps({'error': {'message': text}}).encode())
+        elif payload.get('stream'):
+            self._send_events(text)
+        else:
+            body = {
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}}],
+                'usage': {'completion_tokens': len(text)}
+            }
+            self._send(200, 'application/json', json.dumps(body, ensure_ascii=False).encode())
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_events(self, text):
+        # 不带Content-Length，关闭连接表示响应结束
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        size = self.server.chunk_size
+        events = [{'choices': [{'index': 0, 'delta': {'content': text[i:i + size]}}]}
+                  for i in range(0, len(text), size)]
+        events.append({'choices': [], 'usage': {'completion_tokens': len(events)}})
+        self.wfile.write(b": keep-alive\n\n")
+        for event in events:
+            self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+@pytest.fixture
+def chat_server():
+    server = ChatServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def prompts_dir(tmp_path):
+    folder = tmp_path / "prompts"
+    folder.mkdir()
+    (folder / "plain.txt").write_text("{audio_title}|{content}", encoding='utf-8')
+    return str(folder)
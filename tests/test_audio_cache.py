@@ -0,0 +1,66 @@
+import os
+import threading
+
+import numpy as np
+
+from src.utils.audio_cache import AudioCache
+
+
+def make_audio_files(folder, count):
+    files = []
+    for i in range(count):
+        path = folder / f"{i}.mp3"
+        path.write_bytes(f"音频{i}".encode('utf-8'))
+        files.append(str(path))
+    return files
+
+
+def decode(samples):
+    return lambda audio_file: np.full(samples, 0.5, dtype=np.float32)
+
+
+def test_new_entry_larger_than_limit_is_kept(tmp_path):
+    old_file, new_file = make_audio_files(tmp_path, 2)
+    cache = AudioCache(str(tmp_path / "cache"), max_size_mb=0.1)
+    cache.get_audio(old_file, decode(1000))
+
+    # 新的缓存项单独就超出上限，淘汰时跳过它，只淘汰其他缓存项
+    audio = cache.get_audio(new_file, decode(100000))
+
+    assert len(audio) == 100000
+    assert os.path.exists(cache._entry_path(cache.file_key(new_file), "pcm"))
+    assert not os.path.exists(cache._entry_path(cache.file_key(old_file), "pcm"))
+
+
+def test_entry_evicted_by_another_process_returns_decoded_audio(tmp_path, monkeypatch):
+    audio_file, = make_audio_files(tmp_path, 1)
+    cache = AudioCache(str(tmp_path / "cache"))
+    path = cache._entry_path(cache.file_key(audio_file), "pcm")
+    # 模拟另一个进程在写入后立即淘汰了这个缓存项
+    monkeypatch.setattr(cache, '_evict', lambda keep=None: os.remove(path))
+
+    audio = cache.get_audio(audio_file, decode(1000))
+
+    assert np.array_equal(audio, np.full(1000, 0.5, dtype=np.float32))
+
+
+def test_hit_and_miss_counters_across_threads(tmp_path):
+    audio_files = make_audio_files(tmp_path, 4)
+    cache = AudioCache(str(tmp_path / "cache"))
+    for audio_file in audio_files:
+        cache.get_audio(audio_file, decode(100))
+
+    def read():
+        for _ in range(50):
+            for audio_file in audio_files:
+                cache.get_audio(audio_file, decode(100))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats['misses'] == 4
+    assert stats['hits'] == 8 * 50 * 4
@@ -0,0 +1,40 @@
+import os
+import struct
+
+from src.utils import audio_metadata
+from src.utils.audio_metadata import AudioMetadata
+
+
+def write_wav(path, seconds, sample_rate=16000):
+    data = b"\x00\x00" * int(seconds * sample_rate)
+    fmt = struct.pack('<HHIIHH', 1, 1, sample_rate, sample_rate * 2, 2, 16)
+    with open(path, 'wb') as f:
+        f.write(b'RIFF' + struct.pack('<I', 36 + len(data)) + b'WAVE')
+        f.write(b'fmt ' + struct.pack('<I', len(fmt)) + fmt)
+        f.write(b'data' + struct.pack('<I', len(data)) + data)
+
+
+def test_counters_by_source_across_threads(tmp_path, monkeypatch):
+    wav_files = []
+    for i in range(40):
+        path = tmp_path / f"{i}.wav"
+        write_wav(path, 0.1)
+        wav_files.append(str(path))
+    other_files = []
+    for i in range(20):
+        path = tmp_path / f"{i}.m4a"
+        path.write_bytes(b"\x00" * 16)
+        other_files.append(str(path))
+    # 偶数编号的文件ffprobe能解析，奇数编号的只能由librosa得到时长
+    monkeypatch.setattr(audio_metadata, '_probe_ffprobe', lambda path: (
+        {'duration': 1.0, 'sample_rate': 44100, 'channels': 2, 'codec': 'aac'}
+        if int(os.path.splitext(os.path.basename(path))[0]) % 2 == 0 else None))
+    monkeypatch.setattr(AudioMetadata, '_probe_librosa', staticmethod(lambda path: {
+        'duration': 2.0, 'sample_rate': None, 'channels': None, 'codec': None}))
+    metadata = AudioMetadata()
+
+    results = metadata.probe_folder(wav_files + other_files, max_workers=8)
+
+    assert all(results.values())
+    assert results[wav_files[0]]['duration'] == 0.1
+    assert (metadata.native_count, metadata.ffprobe_count, metadata.librosa_count) == (40, 10, 10)
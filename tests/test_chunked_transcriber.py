@@ -0,0 +1,126 @@
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+from src.core.chunked_transcriber import ChunkedTranscriber, plan_chunks, select_chunk_segments, stitch_chunks
+from src.utils.vad_utils import SAMPLE_RATE
+
+
+class PendingFuture(Future):
+    """未开始的分块；与真实的进程池一样，取消后通知等待者"""
+
+    def cancel(self):
+        cancelled = super().cancel()
+        if cancelled:
+            self.set_running_or_notify_cancel()
+        return cancelled
+
+
+class FakeExecutor:
+    """按提交顺序返回已完成、未开始或进程池已损坏的分块结果"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.shutdown_called = False
+
+    def submit(self, fn, audio, offset, language, decode_params):
+        outcome = self.outcomes.pop(0)
+        future = PendingFuture() if outcome == 'pending' else Future()
+        if outcome == 'broken':
+            future.set_exception(BrokenProcessPool("工作进程被终止"))
+        elif outcome == 'done':
+            future.set_result(([{'start': offset + 0.5, 'end': offset + 1.0, 'text': f"{offset:.0f}秒"}], {}))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdown_called = True
+
+
+def make_transcriber(executor):
+    transcriber = ChunkedTranscriber("tiny", "cpu", chunk_seconds=2, overlap_seconds=0)
+    transcriber._executor = executor
+    transcriber._cancel_event = threading.Event()
+    return transcriber
+
+
+def test_broken_pool_fails_current_file_and_is_recreated():
+    executor = FakeExecutor(['done', 'broken', 'pending'])
+    transcriber = make_transcriber(executor)
+
+    with pytest.raises(RuntimeError, match="工作进程异常退出"):
+        list(transcriber.iter_segments(np.zeros(6 * SAMPLE_RATE, dtype=np.float32)))
+
+    assert executor.shutdown_called
+    assert transcriber._executor is None
+
+
+def test_stop_yields_completed_chunks_before_returning():
+    transcriber = make_transcriber(FakeExecutor(['done', 'done', 'pending']))
+    completed = []
+
+    segments = list(transcriber.iter_segments(np.zeros(6 * SAMPLE_RATE, dtype=np.float32),
+                                              should_stop=lambda: True, chunk_callback=completed.append))
+
+    assert [segment['text'] for segment in segments] == ["0秒", "2秒"]
+    assert completed == [1, 2]
+
+
+# 3秒恰好是100个30毫秒的能量帧，静音时切点正好落在目标位置
+CHUNK_SECONDS = 3
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def seconds(chunks):
+    return [tuple(sample / SAMPLE_RATE for sample in chunk) for chunk in chunks]
+
+
+def transcribe_range(segments, chunk):
+    """模拟一个分块的转录结果：解码范围内的全部片段"""
+    _, end, decode_start = chunk
+    return [segment for segment in segments
+            if segment['end'] > decode_start / SAMPLE_RATE and segment['start'] < end / SAMPLE_RATE]
+
+
+def test_plan_chunks_at_exact_multiples():
+    chunks = plan_chunks(silence(3 * CHUNK_SECONDS), CHUNK_SECONDS, overlap_seconds=1, search_seconds=0)
+
+    assert seconds(chunks) == [(0, 3, 0), (3, 6, 2), (6, 9, 5)]
+    assert plan_chunks(silence(CHUNK_SECONDS), CHUNK_SECONDS, overlap_seconds=1) == [
+        (0, CHUNK_SECONDS * SAMPLE_RATE, 0)]
+
+
+def test_final_chunk_shorter_than_overlap():
+    audio = silence(2 * CHUNK_SECONDS + 1)
+    chunks = plan_chunks(audio, CHUNK_SECONDS, overlap_seconds=5, search_seconds=0)
+
+    # 解码起点不早于音频开头
+    assert seconds(chunks) == [(0, 3, 0), (3, 6, 0), (6, 7, 1)]
+    segments = [{'start': float(i), 'end': i + 1.0, 'text': f"第{i}句"} for i in range(7)]
+    stitched = stitch_chunks([transcribe_range(segments, chunk) for chunk in chunks], chunks)
+    assert stitched == segments
+
+
+def test_segment_straddling_cut_is_emitted_once():
+    chunks = plan_chunks(silence(2 * CHUNK_SECONDS), CHUNK_SECONDS, overlap_seconds=1, search_seconds=0)
+    assert seconds(chunks) == [(0, 3, 0), (3, 6, 2)]
+    # 中点恰好在3秒切点上，两个分块各转录出措辞不同的一次，文本去重无法合并
+    first = [{'start': 0.0, 'end': 2.5, 'text': "开头"}, {'start': 2.5, 'end': 3.5, 'text': "跨越切点的句子"}]
+    second = [{'start': 2.5, 'end': 3.5, 'text': "越过切点的句子"}, {'start': 3.5, 'end': 6.0, 'text': "结尾"}]
+
+    stitched = stitch_chunks([first, second], chunks)
+
+    assert [segment['text'] for segment in stitched] == ["开头", "越过切点的句子", "结尾"]
+
+
+def test_last_chunk_keeps_segment_ending_at_audio_end():
+    chunk = (0, CHUNK_SECONDS * SAMPLE_RATE, 0)
+    segments = [{'start': 2.0, 'end': 4.0, 'text': "结尾"}]
+
+    assert select_chunk_segments(chunk, segments) == []
+    assert select_chunk_segments(chunk, segments, last=True) == segments
@@ -0,0 +1,192 @@
+import queue
+import re
+
+import pytest
+
+from src.core.batch_process import process_audio_file
+from src.core.deepseek_summarizer import DeepSeekSummarizer, SummaryRequestError
+from src.utils.file_utils import NO_SPEECH_SUMMARY
+
+
+@pytest.fixture
+def make_summarizer(chat_server, prompts_dir):
+    summarizers = []
+
+    def make(**options):
+        summarizer = DeepSeekSummarizer("test-key", prompts_dir, api_url=chat_server.url, **options)
+        summarizers.append(summarizer)
+        return summarizer
+
+    yield make
+    for summarizer in summarizers:
+        summarizer.close()
+
+
+class FakeTranscriber:
+    """按给定文本返回一个片段的转录器"""
+
+    def __init__(self, text):
+        self.text = text
+
+    def transcribe_iter(self, audio_file, stats=None, prepared=None, cancel_token=None):
+        yield {'start': 0.0, 'end': 1.0, 'text': self.text}
+
+
+def test_summarize_over_local_server(chat_server, make_summarizer):
+    summarizer = make_summarizer()
+    metrics = {}
+
+    summary = summarizer.summarize("转录内容", "标题", "plain", metrics=metrics)
+
+    assert summary == "总结:标题|转录内容"
+    assert chat_server.prompts() == ["标题|转录内容"]
+    assert summarizer.connection_stats()['requests'] == 1
+    assert summarizer.connection_stats()['new_connections'] == 1
+    assert metrics['summary_tokens'] == len(summary)
+
+
+def test_failed_request_raises(chat_server, make_summarizer):
+    chat_server.reply = lambda prompt: (500, "服务端错误")
+    summarizer = make_summarizer()
+
+    with pytest.raises(SummaryRequestError):
+        summarizer.summarize("转录内容", "标题", "plain")
+
+
+def test_failed_summary_marks_file_as_error(chat_server, make_summarizer, tmp_path):
+    chat_server.reply = lambda prompt: (500, "服务端错误")
+    summarizer = make_summarizer()
+    progress_queue = queue.Queue()
+    audio_file = str(tmp_path / "讲座.mp3")
+    output_folder = tmp_path / "output"
+
+    process_audio_file((audio_file, "讲座.mp3"), FakeTranscriber("转录内容"), summarizer, str(output_folder),
+                       "plain", str(tmp_path), progress_queue)
+
+    updates = []
+    while not progress_queue.empty():
+        updates.append(progress_queue.get())
+    assert updates[-1]['status'].startswith('错误')
+    assert '完成' not in [update['status'] for update in updates]
+    assert not list((output_folder / "summaries").glob("*.md"))
+
+
+def test_no_speech_transcript_is_not_summarized(chat_server, make_summarizer, tmp_path):
+    summarizer = make_summarizer()
+    progress_queue = queue.Queue()
+    audio_file = str(tmp_path / "静音.mp3")
+    output_folder = tmp_path / "output"
+
+    stats = process_audio_file((audio_file, "静音.mp3"), FakeTranscriber(" "), summarizer, str(output_folder),
+                               "plain", str(tmp_path), progress_queue)
+
+    assert chat_server.requests == []
+    assert stats['no_speech'] is True
+    update = progress_queue.queue[-1]
+    assert update['status'] == '完成'
+    with open(update['summary_file'], encoding='utf-8') as f:
+        assert f.read().endswith(NO_SPEECH_SUMMARY)
+
+def test_streamed_summary_records_ttft_and_tokens(chat_server, make_summarizer):
+    chat_server.reply = lambda prompt: "第一点：流式总结。\n第二点：逐段到达。\n"
+    summarizer = make_summarizer(stream=True)
+    received = []
+    metrics = {}
+
+    summary = summarizer.summarize("转录内容", "标题", "plain", on_token=received.append, metrics=metrics)
+
+    assert summary == "第一点：流式总结。\n第二点：逐段到达。\n"
+    assert "".join(received) == summary
+    assert len(received) > 1
+    assert chat_server.requests[0]['stream'] is True
+    assert metrics['summary_streamed'] is True
+    assert 0 < metrics['summary_ttft_seconds'] <= metrics['summary_seconds']
+    # 服务端在最后一个事件中返回用量，每个文本增量计一个token
+    assert metrics['summary_tokens'] == len(received)
+    assert summarizer.summary_stats()['tokens'] == len(received)
+
+
+def map_reply(failed_index=None):
+    """分段提示词返回该段的要点，failed_index 段返回错误，其余提示词返回最终总结"""
+    def reply(prompt):
+        if not prompt.startswith("你正在分段处理"):
+            return "最终总结"
+        match = re.search(r"下面是其中的第(\d+)部分", prompt)
+        if int(match.group(1)) == failed_index:
+            return 500, "服务端错误"
+        return f"要点{match.group(1)}"
+    return reply
+
+
+def long_transcript():
+    return "".join(f"第{i}句话讲的是分段总结的测试内容。" for i in range(400))
+
+
+def test_transcript_over_budget_is_summarized_in_chunks(chat_server, make_summarizer):
+    chat_server.reply = map_reply()
+    summarizer = make_summarizer(max_input_tokens=3000, chunk_tokens=1000)
+    metrics = {}
+
+    summary = summarizer.summarize(long_transcript(), "标题", "plain", metrics=metrics)
+
+    assert summary == "最终总结"
+    prompts = chat_server.prompts()
+    map_prompts = [prompt for prompt in prompts if prompt.startswith("你正在分段处理")]
+    chunks = metrics['summary_chunks']
+    assert chunks > 1 and len(map_prompts) == chunks
+    # 各段并发提取，合并后的要点按顺序交给所选模板做最终总结
+    assert prompts[-1] == "标题|" + "\n\n".join(
+        f"【第{index}部分（共{chunks}部分）要点】\n要点{index}" for index in range(1, chunks + 1))
+
+
+def test_failed_chunk_aborts_reduce(chat_server, make_summarizer):
+    chat_server.reply = map_reply(failed_index=2)
+    summarizer = make_summarizer(max_input_tokens=3000, chunk_tokens=1000)
+
+    with pytest.raises(SummaryRequestError, match="第2段"):
+        summarizer.summarize(long_transcript(), "标题", "plain")
+
+    assert all(prompt.startswith("你正在分段处理") for prompt in chat_server.prompts())
+
+
+def test_empty_chunk_note_aborts_reduce(chat_server, make_summarizer):
+    chat_server.reply = lambda prompt: "" if "下面是其中的第1部分" in prompt else "要点"
+    summarizer = make_summarizer(max_input_tokens=3000, chunk_tokens=1000)
+
+    with pytest.raises(SummaryRequestError, match="回答为空"):
+        summarizer.summarize(long_transcript(), "标题", "plain")
+
+
+def test_concurrent_identical_requests_are_sent_once(chat_server, make_summarizer, tmp_path):
+    chat_server.delay = 0.3
+    summarizer = make_summarizer(cache_dir=str(tmp_path / "cache"))
+    metrics = [{} for _ in range(5)]
+
+    futures = [summarizer.submit("转录内容", "标题", "plain", metrics=item) for item in metrics]
+    summaries = [future.result(timeout=30) for future in futures]
+
+    assert summaries == ["总结:标题|转录内容"] * 5
+    assert len(chat_server.requests) == 1
+    assert summarizer.cache_stats()['coalesced'] == 4
+    assert sum(1 for item in metrics if item.get('summary_coalesced')) == 4
+    # 之后的相同请求直接读取缓存
+    assert summarizer.summarize("转录内容", "标题", "plain") == "总结:标题|转录内容"
+    assert len(chat_server.requests) == 1
+
+
+def test_coalesced_callers_all_see_failure(chat_server, make_summarizer, tmp_path):
+    chat_server.delay = 0.3
+    chat_server.reply = lambda prompt: (500, "服务端错误")
+    summarizer = make_summarizer(cache_dir=str(tmp_path / "cache"))
+
+    futures = [summarizer.submit("转录内容", "标题", "plain") for _ in range(5)]
+
+    for future in futures:
+        with pytest.raises(SummaryRequestError):
+            future.result(timeout=30)
+    assert len(chat_server.requests) == 1
+    # 失败的回答不写入缓存，之后的请求重新发送
+    chat_server.delay = 0
+    chat_server.reply = lambda prompt: "恢复后的总结"
+    assert summarizer.summarize("转录内容", "标题", "plain") == "恢复后的总结"
+    assert len(chat_server.requests) == 2
@@ -0,0 +1,61 @@
+import os
+import time
+
+from src.utils.result_cache import ResultCache
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = ResultCache.make_key('summary', "提示词")
+
+    assert cache.get(key) is None
+    cache.put(key, {'text': "总结"})
+
+    assert cache.get(key) == {'text': "总结"}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_put_does_not_scan_directory(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path), max_size_mb=64)
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or scandir(path))
+
+    for i in range(200):
+        cache.put(f"key{i}", "内容" * 10)
+
+    assert scans == []
+    assert cache.entry_count() == 200
+    assert cache.size_mb() * 1024 * 1024 == sum(entry.stat().st_size for entry in scandir(str(tmp_path)))
+
+
+def test_evicts_least_recently_used_below_limit(tmp_path):
+    cache = ResultCache(str(tmp_path), max_size_mb=0.01)
+    value = "x" * 1000
+    for i in range(8):
+        cache.put(f"key{i}", value)
+        os.utime(cache._entry_path(f"key{i}"), (1000 + i, 1000 + i))
+    # key0 最近被访问过，key1 最久未访问
+    recent = time.time() + 3600
+    os.utime(cache._entry_path("key0"), (recent, recent))
+
+    for i in range(8, 20):
+        cache.put(f"key{i}", value)
+
+    assert cache.size_mb() <= 0.01
+    assert cache.get("key0") == value
+    assert cache.get("key1") is None
+    assert cache.get("key19") == value
+
+
+def test_rescans_after_changes_by_another_instance(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put("key0", "内容")
+    other = ResultCache(str(tmp_path))
+    for i in range(1, 5):
+        other.put(f"key{i}", "内容")
+    os.remove(other._entry_path("key0"))
+
+    assert cache.entry_count() == 4
+    assert cache.size_mb() == other.size_mb()
@@ -0,0 +1,109 @@
+import json
+import os
+
+import pytest
+
+from src.utils.file_utils import FileUtils
+from src.utils.segment_store import SegmentStore
+
+SEGMENTS = [
+    {'start': 0.0, 'end': 1.5, 'text': "大家好，", 'avg_logprob': -0.2, 'no_speech_prob': 0.01,
+     'compression_ratio': 1.1},
+    {'start': 1.5, 'end': 3.25, 'text': " hello world", 'avg_logprob': -0.4},
+    {'start': 3.25, 'end': 3661.0, 'text': "今天讲 😀 表情与 naïve café。"},
+]
+
+
+def test_append_and_iterate_round_trip():
+    store = SegmentStore()
+    for segment in SEGMENTS:
+        store.append(segment)
+
+    assert len(store) == len(SEGMENTS)
+    for index, (stored, segment) in enumerate(zip(store, SEGMENTS)):
+        assert stored['id'] == index
+        assert stored['text'] == segment['text']
+        # 缺少的数值字段原样取回为None
+        for field in ('start', 'end', 'avg_logprob', 'no_speech_prob', 'compression_ratio'):
+            assert stored[field] == segment.get(field)
+    assert store[1]['text'] == " hello world"
+    assert store[-1]['end'] == 3661.0
+    assert [segment['id'] for segment in store[1:]] == [1, 2]
+    with pytest.raises(IndexError):
+        store[len(SEGMENTS)]
+
+
+def test_non_ascii_text_offsets():
+    store = SegmentStore(SEGMENTS)
+
+    assert store.text() == "".join(segment['text'] for segment in SEGMENTS)
+    assert [segment['text'] for segment in store] == [segment['text'] for segment in SEGMENTS]
+    # 读取后继续追加，缓存的全文失效，之前的偏移不变
+    store.append({'start': 3661.0, 'end': 3662.0, 'text': "结束🎉"})
+    assert store[2]['text'] == SEGMENTS[2]['text']
+    assert store[3]['text'] == "结束🎉"
+    assert store.text().endswith("。结束🎉")
+
+
+def test_from_jsonl_round_trip(tmp_path):
+    jsonl_file = str(tmp_path / "讲座.jsonl")
+    FileUtils.export_segments(SegmentStore(SEGMENTS), jsonl_file, 'jsonl')
+
+    store = SegmentStore.from_jsonl(jsonl_file)
+
+    assert [{key: value for key, value in segment.items() if key != 'id'} for segment in store] == [
+        dict({'avg_logprob': None, 'no_speech_prob': None, 'compression_ratio': None}, **segment)
+        for segment in SEGMENTS
+    ]
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_writers_rename_part_files_on_finalize(tmp_path):
+    transcript_file = str(tmp_path / "讲座.txt")
+    writer = FileUtils.open_transcript_writer(transcript_file, formats=('srt', 'vtt', 'jsonl'), header="标题\n")
+    paths = writer.paths
+
+    for segment in SegmentStore(SEGMENTS):
+        writer.write_segment(segment)
+
+    # 完成前只有 .part 临时文件，且已写入全部片段
+    for path in paths.values():
+        assert not os.path.exists(path)
+        assert os.path.exists(path + ".part")
+    assert read(paths['txt'] + ".part") == "标题\n" + "".join(segment['text'] for segment in SEGMENTS)
+    assert writer.segment_count == len(SEGMENTS)
+
+    assert writer.finalize() == transcript_file
+    assert sorted(os.listdir(tmp_path)) == ["讲座.jsonl", "讲座.srt", "讲座.txt", "讲座.vtt"]
+    assert read(paths['txt']) == "标题\n" + "".join(segment['text'] for segment in SEGMENTS)
+    assert read(paths['srt']) == (
+        "1\n00:00:00,000 --> 00:00:01,500\n大家好，\n\n"
+        "2\n00:00:01,500 --> 00:00:03,250\nhello world\n\n"
+        "3\n00:00:03,250 --> 01:01:01,000\n今天讲 😀 表情与 naïve café。\n\n"
+    )
+    assert read(paths['vtt']) == (
+        "WEBVTT\n\n"
+        "00:00:00.000 --> 00:00:01.500\n大家好，\n\n"
+        "00:00:01.500 --> 00:00:03.250\nhello world\n\n"
+        "00:00:03.250 --> 01:01:01.000\n今天讲 😀 表情与 naïve café。\n\n"
+    )
+    records = [json.loads(line) for line in read(paths['jsonl']).splitlines()]
+    assert [record['text'] for record in records] == [segment['text'] for segment in SEGMENTS]
+    assert records[0]['compression_ratio'] == 1.1 and records[1]['no_speech_prob'] is None
+    # 非ASCII文本不转义
+    assert "😀" in read(paths['jsonl'])
+
+
+def test_closed_writer_keeps_part_files(tmp_path):
+    transcript_file = str(tmp_path / "讲座.txt")
+    writer = FileUtils.open_transcript_writer(transcript_file, formats=('srt',))
+    writer.write_segment(SEGMENTS[0])
+
+    writer.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["讲座.srt.part", "讲座.txt.part"]
+    assert read(transcript_file + ".part") == SEGMENTS[0]['text']
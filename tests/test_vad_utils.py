@@ -0,0 +1,104 @@
+import wave
+
+import numpy as np
+import pytest
+
+from src.utils.vad_utils import EnergyVAD, SpeechTimeline, SAMPLE_RATE
+
+
+def tone(seconds, level_db, frequency=220.0):
+    """指定电平（dBFS，按RMS计）的正弦波，近似浊音"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (np.sqrt(2) * 10 ** (level_db / 20) * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def bed(seconds, level_db, seed=0):
+    """指定电平的持续白噪声背景"""
+    rng = np.random.default_rng(seed)
+    return (10 ** (level_db / 20) * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+
+def speech_bursts(level_db, seconds=10):
+    """每2秒中前1秒说话、后1秒停顿"""
+    audio = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    for start in range(0, seconds, 2):
+        audio[start * SAMPLE_RATE:(start + 1) * SAMPLE_RATE] = tone(1, level_db)
+    return audio
+
+
+def test_speech_over_constant_bed_keeps_whole_file():
+    audio = speech_bursts(-40) + bed(10, -45)
+
+    regions = EnergyVAD().detect(audio)
+
+    assert regions == [(0, len(audio))]
+
+
+def test_speech_over_quiet_background_is_separated():
+    audio = speech_bursts(-20) + bed(10, -70)
+
+    regions = EnergyVAD().detect(audio)
+
+    assert len(regions) == 5
+    speech = sum(end - start for start, end in regions) / SAMPLE_RATE
+    assert 5 <= speech < 8
+
+
+def test_no_detected_region_falls_back_to_whole_file():
+    audio = bed(5, -70)
+    # 能量起伏足够大，但每段声音都短于最短语音长度
+    for start in range(5):
+        audio[start * SAMPLE_RATE:start * SAMPLE_RATE + 2400] += tone(0.15, -20)
+    vad = EnergyVAD()
+    assert vad.speech_mask(audio).any() and not vad.speech_mask(audio).all()
+
+    assert vad.detect(audio) == [(0, len(audio))]
+    assert vad.detect(np.zeros(0, dtype=np.float32)) == []
+
+
+@pytest.mark.parametrize('audio', [np.zeros(10 * SAMPLE_RATE, dtype=np.float32), bed(10, -80)],
+                         ids=['digital_silence', 'quiet_hiss'])
+def test_silent_file_has_no_speech(audio):
+    vad = EnergyVAD()
+
+    assert not vad.speech_mask(audio).any()
+    assert vad.detect(audio) == []
+    assert SpeechTimeline(vad.detect(audio)).speech_duration == 0.0
+
+
+def test_sparse_speech_in_long_silence_is_kept():
+    # 语音不到10%的帧，噪声底和第90百分位都是静音
+    audio = bed(30, -80)
+    audio[10 * SAMPLE_RATE:12 * SAMPLE_RATE] += tone(2, -25)
+
+    regions = EnergyVAD().detect(audio)
+
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert start <= 10 * SAMPLE_RATE and end >= 12 * SAMPLE_RATE and end - start < 3 * SAMPLE_RATE
+
+
+def read_wav(path):
+    with wave.open(path, 'rb') as f:
+        return np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).astype(np.float32) / 32768
+
+
+def test_silent_file_is_reported_as_no_speech(tmp_path):
+    pytest.importorskip('whisper')
+    from src.core.whisper_transcriber import WhisperTranscriber
+
+    audio_file = str(tmp_path / "silence.wav")
+    with wave.open(audio_file, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(b"\x00\x00" * 5 * SAMPLE_RATE)
+
+    transcriber = WhisperTranscriber(use_vad=True, long_audio_threshold=None)
+    # 不依赖ffmpeg解码，直接读取写入的PCM
+    transcriber._load_audio = lambda path: read_wav(path)
+
+    prepared = transcriber.prepare(audio_file)
+
+    assert prepared['no_speech'] is True
+    assert prepared['stats']['speech_regions'] == 0
@@ -0,0 +1,129 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+from src.core import window_decoder
+from src.core.window_decoder import RepetitionGuard, WindowDecoder
+
+EOT = 50257
+SOT = 50258
+# 普通文本token均小于eot，时间戳token大于eot
+TIMESTAMP = 50364
+
+
+def normal_text(length=64):
+    """不重复的token序列"""
+    return [100 + i * 7 for i in range(length)]
+
+
+def looping_text(unit, repeats, prefix=()):
+    """前缀之后把重复单元连续重复若干次"""
+    return list(prefix) + list(unit) * repeats
+
+
+def test_repeated_ngram_is_a_loop():
+    guard = RepetitionGuard(EOT, sample_begin=1, repeats=4)
+
+    assert guard._is_loop(looping_text([11, 12, 13, 14], 4, prefix=normal_text(10)))
+    # 单个token的重复同样识别
+    assert guard._is_loop(looping_text([42], 16))
+
+
+def test_normal_text_is_not_a_loop():
+    guard = RepetitionGuard(EOT, sample_begin=1, repeats=4)
+
+    assert not guard._is_loop(normal_text())
+    # 只重复了三次，未达到重复次数
+    assert not guard._is_loop(looping_text([11, 12, 13, 14], 3, prefix=normal_text(10)))
+    # 重复部分少于 MIN_LOOP_TOKENS 时视为正常的语气词重复
+    assert not guard._is_loop(looping_text([42], 6, prefix=normal_text(10)))
+
+
+def test_timestamp_tokens_are_ignored():
+    guard = RepetitionGuard(EOT, sample_begin=1, repeats=4)
+    unit = [11, 12, 13, 14]
+    tokens = normal_text(10)
+    for i in range(4):
+        tokens += [TIMESTAMP + i * 2] + unit + [TIMESTAMP + i * 2 + 1]
+
+    assert guard._is_loop(tokens)
+
+
+def test_apply_forces_eot_for_looping_rows():
+    guard = RepetitionGuard(EOT, sample_begin=1, repeats=4)
+    tokens = torch.tensor([
+        [SOT] + looping_text([11, 12, 13, 14], 4),
+        [SOT] + normal_text(16),
+    ])
+    logits = torch.zeros(2, EOT + 10)
+
+    guard.apply(logits, tokens)
+
+    assert guard.aborted == {0}
+    assert logits[0].argmax().item() == EOT
+    assert torch.isinf(logits[0, :EOT]).all()
+    assert (logits[1] == 0).all()
+
+
+class FakeDecodingTask:
+    """用给定的已生成token运行一步logit过滤，代替真实模型的解码"""
+
+    generated = []
+
+    def __init__(self, model, options):
+        self.tokenizer = SimpleNamespace(eot=EOT)
+        self.sample_begin = 1
+        self.n_group = 1
+        self.logit_filters = []
+
+    def run(self, audio_features):
+        time.sleep(0.01)
+        tokens = torch.tensor([[SOT] + self.generated] * audio_features.shape[0])
+        logits = torch.zeros(tokens.shape[0], EOT + 10)
+        for logit_filter in self.logit_filters:
+            logit_filter.apply(logits, tokens)
+        return [SimpleNamespace(text="") for _ in range(tokens.shape[0])]
+
+
+@pytest.fixture
+def make_decoder(monkeypatch):
+    monkeypatch.setattr(window_decoder, "DecodingTask", FakeDecodingTask)
+
+    def make(generated):
+        monkeypatch.setattr(FakeDecodingTask, "generated", generated)
+        return WindowDecoder(SimpleNamespace(device=torch.device("cpu")), repetition_limit=4)
+
+    return make
+
+
+def test_aborted_fallback_pass_is_counted_once(make_decoder):
+    decoder = make_decoder(looping_text([11, 12, 13, 14], 4))
+
+    decoder._decode(torch.zeros(1500, 384), None, fallback=True)
+
+    assert decoder.last_aborted == {0}
+    counters = decoder.counters
+    assert counters['decode_passes'] == 1
+    assert counters['fallback_decodes'] == 1
+    assert counters['aborted_windows'] == 1
+    assert counters['aborted_seconds'] > 0
+    # 中止的回退解码只计入中止耗时
+    assert counters['fallback_seconds'] == 0
+
+
+def test_completed_fallback_pass_counts_fallback_seconds(make_decoder):
+    decoder = make_decoder(normal_text(32))
+
+    decoder._decode(torch.zeros(2, 1500, 384), None, fallback=True)
+
+    assert decoder.last_aborted == set()
+    counters = decoder.counters
+    assert counters['decode_passes'] == 1
+    assert counters['fallback_decodes'] == 1
+    assert counters['aborted_windows'] == 0
+    assert counters['aborted_seconds'] == 0
+    assert counters['fallback_seconds'] > 0